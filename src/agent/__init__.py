@@ -1 +1,8 @@
-from .agent import run_query
+# `run_query` pulls in pandas and the tool stack, so it is resolved lazily:
+# importing `src.agent.cli` (e.g. for `--help`) then stays cheap.
+def __getattr__(name):
+    if name == "run_query":
+        from .agent import run_query
+        return run_query
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,26 +1,49 @@
 import json
+import threading
 import time
 
-from .llm import LLMEngine, SYSTEM_PROMPT
+from .llm import LLMEngine, ReplayEngine, SYSTEM_PROMPT
 from .tools import TOOLS, load_data
+from .tools.serialize import dumps_result
 from .logger import setup_logger
+from .session import Session
 
-from src.config import MODEL_ID
+from src.config import ANALYSIS_BACKEND, MODEL_ID, LLM_RECORD_PATH, PROFILE_WORKERS, STREAM_MEMORY_LIMIT_MB
 
 
-engine = LLMEngine(MODEL_ID)
+# The model is loaded on first use rather than at import time, so that
+# `--help` and runs with a substituted engine never touch torch.
+engine: LLMEngine | ReplayEngine | None = None
+
+_engine_lock = threading.Lock()
+
+
+# Concurrent sessions must not each load a copy of the model.
+def get_engine() -> LLMEngine | ReplayEngine:
+    global engine
+    with _engine_lock:
+        if engine is None:
+            engine = LLMEngine(MODEL_ID, record_path=LLM_RECORD_PATH)
+    return engine
+
+
+# Replaces the engine used by the phases, e.g. with a ReplayEngine.
+def set_engine(new_engine: LLMEngine | ReplayEngine | None):
+    global engine
+    engine = new_engine
 
 
 # Returns llm response from the system and raw user prompt.
 # Extracts the execution plan from it.
 def plan_phase(
+        session: Session,
         messages: list[dict],
         max_new_tokens: int,
         step: int,
         phase: str
         ) -> tuple[str, list]:
 
-    llm_output = engine.generate(messages, max_new_tokens)
+    llm_output = (session.engine or get_engine()).generate(messages, max_new_tokens)
 
     # JSON-only
     try:
@@ -61,6 +84,7 @@ def plan_phase(
 # and the modified messages.
 # Else returns False, the list of completed steps, and the unmodified message.
 def tool_phase(
+        session: Session,
         messages: list[dict], 
         max_new_tokens: int, 
         completed_steps: list[str], 
@@ -112,7 +136,7 @@ def tool_phase(
         })
 
 
-    llm_output = engine.generate(messages, max_new_tokens)
+    llm_output = (session.engine or get_engine()).generate(messages, max_new_tokens)
 
     # JSON-only
     try:
@@ -141,9 +165,9 @@ def tool_phase(
     args = response.get("arguments", {})
 
     try:
-        result = TOOLS[tool_name](**args)
+        result = TOOLS[tool_name](session.data, **args)
     except Exception as e:
-        logger.error("Tool %s failed: %s", tool_name, e)
+        session.logger.error("Tool %s failed: %s", tool_name, e)
         return False, completed_steps, messages
 
     completed_steps.append(tool_name)
@@ -158,7 +182,7 @@ def tool_phase(
     messages.append({
         "role": "tool",
         "tool_name": tool_name,
-        "content": json.dumps(result)
+        "content": dumps_result(result)
     })
     
     return True, completed_steps, messages
@@ -166,6 +190,7 @@ def tool_phase(
 
 # Returns final llm response
 def final_phase(
+        session: Session,
         messages: list[dict],
         max_new_tokens: int,
         step: int,
@@ -187,7 +212,7 @@ def final_phase(
     })
 
 
-    llm_output = engine.generate(messages, max_new_tokens)
+    llm_output = (session.engine or get_engine()).generate(messages, max_new_tokens)
     
     # JSON-only
     try:
@@ -213,18 +238,65 @@ def run_query(
         max_new_tokens_final=512,
         max_steps=7,
         max_tool_failures=3,
-        verbose=False
+        verbose=False,
+        use_cache=True,
+        streaming=False,
+        memory_limit_mb=STREAM_MEMORY_LIMIT_MB,
+        sample=None,
+        stratify=None,
+        workers=PROFILE_WORKERS,
+        backend=ANALYSIS_BACKEND,
+        compact=None,
+        incremental=False,
+        session=None
         ) -> str:
-    
-    global logger
-    logger = setup_logger(verbose)
-    
+
+    # Without a session, the call gets its own data context and logger and
+    # uses the process-wide engine.
+    if session is None:
+        session = Session(logger=setup_logger(verbose))
+    logger = session.logger
+
     try:
-        data_shape = load_data(dataset_path)
+        data_shape = load_data(
+                session.data,
+                dataset_path,
+                use_cache=use_cache,
+                streaming=streaming,
+                memory_limit_mb=memory_limit_mb,
+                sample=sample,
+                stratify=stratify,
+                workers=workers,
+                backend=backend,
+                compact=compact,
+                incremental=incremental
+        )
     except Exception as e:
         logger.error("Loading data failed: %s", e)
         raise
 
+    logger.info(
+            "Loaded %s (%d rows, %d columns) in %.2f s, %s MB/s, "
+            "peak RSS %s MB, cache %s",
+            data_shape["format"], data_shape["rows"], data_shape["columns"],
+            data_shape["load"]["seconds"], data_shape["load"]["mb_per_s"],
+            data_shape["load"]["peak_rss_mb"], data_shape["load"]["cache"]
+    )
+    if "incremental" in data_shape["load"]:
+        report = data_shape["load"]["incremental"]
+        logger.info(
+                "Incremental load (%s): %d new rows from %d new bytes, %d rows before",
+                report["mode"], report["new_rows"], report["parsed_bytes"],
+                report["previous_rows"]
+        )
+    if "compaction" in data_shape:
+        compaction = data_shape["compaction"]
+        logger.info(
+                "Compacted %d columns: %d -> %d bytes (%.2f%% saved)",
+                len(compaction["columns"]), compaction["before_bytes"],
+                compaction["after_bytes"], compaction["saved_pct"]
+        )
+
     messages = [
         {"role": "system", "content": [{"type": "text", "text": SYSTEM_PROMPT}]},
         {"role": "user", "content": [{"type": "text", "text": user_query}]}
@@ -250,6 +322,7 @@ def run_query(
         if phase == "plan":
             
             llm_output, plan = plan_phase(
+                    session,
                     messages,
                     max_new_tokens_plan,
                     step,
@@ -277,6 +350,7 @@ def run_query(
         if phase == "tool":
 
             tool_response, completed_steps, messages = tool_phase(
+                    session,
                     messages,
                     max_new_tokens_tool,
                     completed_steps,
@@ -311,6 +385,7 @@ def run_query(
         if phase == "final":
             
             llm_final_output = final_phase(
+                    session,
                     messages,
                     max_new_tokens_final,
                     step,
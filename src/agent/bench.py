@@ -0,0 +1,1312 @@
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+from src.config import BASE_DIR, DATASET_MEMORY_BUDGET_MB
+
+
+# Modules that importing the agent (or running `--help`) must never pull in.
+HEAVY_MODULES = ("torch", "transformers", "matplotlib", "seaborn")
+
+IMPORT_TIME_BUDGET_S = 1.0
+
+
+# Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+# returns the total import time, the modules with the largest self time and
+# any heavy modules that were loaded.
+def import_time_report(module: str, top: int = 10) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=BASE_DIR,
+    )
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((name.rstrip(), int(self_us), int(cumulative)))
+
+    # Top-level entries are the ones without indentation in the name column.
+    total_us = sum(cum for n, _, cum in entries if not n.startswith("  "))
+
+    loaded = {n.strip() for n, _, _ in entries}
+    heavy = sorted(
+        m for m in HEAVY_MODULES
+        if m in loaded or any(n.startswith(m + ".") for n in loaded)
+    )
+
+    slowest = sorted(entries, key=lambda e: e[1], reverse=True)[:top]
+
+    return {
+        "module": module,
+        "total_s": round(total_us / 1e6, 4),
+        "heavy_modules": heavy,
+        "slowest": [
+            {"module": n.strip(), "self_s": round(us / 1e6, 4)}
+            for n, us, _ in slowest
+        ],
+    }
+
+
+# Wall time of `python -m src.agent.cli --help`, interpreter start included.
+def cli_help_time() -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "src.agent.cli", "--help"],
+        capture_output=True,
+        check=True,
+        cwd=BASE_DIR,
+    )
+    return time.perf_counter() - start
+
+
+# Reports the import time and heavy imports of each module and the time of
+# `cli --help`; tests/test_imports.py holds them to IMPORT_TIME_BUDGET_S.
+def run_importtime(args) -> int:
+    reports = [import_time_report(module) for module in args.modules]
+    help_s = cli_help_time()
+
+    print(json.dumps({"imports": reports, "cli_help_s": round(help_s, 4)}, indent=2))
+    return 0
+
+
+# Writes a CSV with `rows` rows resampled (with replacement) from `base_path`.
+def scaled_dataset(base_path: str, rows: int, out_dir: str) -> str:
+    import pandas as pd
+
+    df = pd.read_csv(base_path)
+    out_path = Path(out_dir) / f"{Path(base_path).stem}_{rows}.csv"
+    df.sample(n=rows, replace=True, random_state=0).to_csv(out_path, index=False)
+
+    return str(out_path)
+
+
+# Replays recorded sessions end to end against each dataset. `llm_s` is the
+# time spent inside the replay engine, `overhead_s` everything else: loading,
+# tools, serialization and orchestration.
+def run_replay(args) -> int:
+    from src.agent.agent import run_query
+    from src.agent.llm import ReplayEngine, load_transcript
+    from src.agent.llm.replay import session_query
+    from src.agent.session import Session
+
+    sessions = [
+        (path, i, session)
+        for path in args.transcripts
+        for i, session in enumerate(load_transcript(path))
+    ]
+
+    if not args.datasets and not args.base:
+        raise SystemExit("Either --datasets or --base is required")
+
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        datasets = args.datasets or [
+            scaled_dataset(args.base, rows, tmp) for rows in args.rows
+        ]
+
+        for dataset in datasets:
+            for path, i, session in sessions:
+                runs = []
+                error = None
+
+                for _ in range(args.repeat):
+                    engine = ReplayEngine(
+                        session,
+                        reproduce_timings=args.reproduce_timings
+                    )
+
+                    start = time.perf_counter()
+                    try:
+                        run_query(
+                            session_query(session),
+                            dataset,
+                            session=Session(engine=engine)
+                        )
+                    except Exception as e:
+                        error = str(e)
+                        break
+                    runs.append((time.perf_counter() - start, engine.elapsed_s))
+
+                result = {
+                    "transcript": path,
+                    "session": i,
+                    "dataset": dataset,
+                    "dataset_bytes": Path(dataset).stat().st_size,
+                }
+
+                if error is not None:
+                    failures += 1
+                    result["error"] = error
+                else:
+                    total_s, llm_s = min(runs)
+                    result.update({
+                        "total_s": round(total_s, 4),
+                        "llm_s": round(llm_s, 4),
+                        "overhead_s": round(total_s - llm_s, 4),
+                    })
+
+                print(json.dumps(result))
+
+    return 1 if failures else 0
+
+
+# Upper-triangle walk the correlation tool used before pair extraction was
+# vectorized; kept as the baseline of `bench corr`.
+def _loop_pairs(corr, threshold: float) -> list[dict]:
+    pairs = []
+    for i, col1 in enumerate(corr.columns):
+        for col2 in corr.columns[i+1:]:
+            value = corr.loc[col1, col2]
+            if abs(value) >= threshold:
+                pairs.append({
+                    "feature_1": col1,
+                    "feature_2": col2,
+                    "correlation": round(float(value), 3)
+                })
+    return pairs
+
+
+def _timed(fn, *args, **kwargs) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+# Times correlation_matrix on synthetic numeric tables of increasing width:
+# the first call, a repeated call answered from memoized results, pair
+# extraction from a dense matrix (Python loop vs vectorized) and the
+# heatmap. Tables wider than MATRIX_MAX_COLUMNS take the blockwise path; its
+# pairs are checked against the dense float64 matrix. Heatmaps are written
+# to the temporary directory, not to PLOTS_DIR.
+def run_corr(args) -> int:
+    import numpy as np
+    import pandas as pd
+
+    from src.agent.llm import DataContext
+    from src.agent.tools import tools
+    from src.agent.tools.loaders import peak_rss_mb
+
+    rng = np.random.default_rng(0)
+    failures = 0
+    ctx = DataContext()
+    plots_dir = tools.PLOTS_DIR
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tools.PLOTS_DIR = Path(tmp) / "plots"
+        try:
+            for n_cols in args.columns:
+                # Shared latent factors so some pairs are strongly correlated.
+                latent = rng.standard_normal((args.rows, 8))
+                weights = rng.standard_normal((8, n_cols)) * (rng.random(n_cols) < 0.2)
+                data = latent @ weights + rng.standard_normal((args.rows, n_cols))
+                names = [f"c{i}" for i in range(n_cols)]
+
+                path = Path(tmp) / f"corr_{n_cols}.parquet"
+                pd.DataFrame(data, columns=names).to_parquet(path)
+
+                tools.load_data(ctx, str(path), use_cache=False)
+                first_s, result = _timed(tools.correlation_matrix, ctx, args.threshold)
+                cached_s, _ = _timed(tools.correlation_matrix, ctx, args.threshold)
+                heatmap_s, _ = _timed(tools.plot_correlation_heatmap, ctx)
+
+                corr = pd.DataFrame(np.corrcoef(data, rowvar=False), index=names, columns=names)
+                loop_s, loop_pairs = _timed(_loop_pairs, corr, args.threshold)
+                vector_s, pairs = _timed(tools.high_correlation_pairs, corr, args.threshold)
+
+                key = lambda p: (p["feature_1"], p["feature_2"])
+                expected = {key(p) for p in loop_pairs}
+                if expected != {key(p) for p in pairs}:
+                    print(f"FAIL: pair extraction differs at {n_cols} columns", file=sys.stderr)
+                    failures += 1
+
+                # Pairs within float32 rounding of the threshold may differ.
+                reported = {key(p) for p in result["high_correlation_pairs"]}
+                mismatched = len(expected ^ reported)
+
+                print(json.dumps({
+                    "columns": n_cols,
+                    "rows": args.rows,
+                    "mode": "matrix" if "matrix" in result else "blockwise",
+                    "pairs": len(reported),
+                    "pairs_mismatched": mismatched,
+                    "first_call_s": round(first_s, 4),
+                    "cached_call_s": round(cached_s, 4),
+                    "heatmap_s": round(heatmap_s, 4),
+                    "pairs_loop_s": round(loop_s, 4),
+                    "pairs_vectorized_s": round(vector_s, 4),
+                    "peak_rss_mb": round(peak_rss_mb(), 1),
+                }))
+        finally:
+            tools.PLOTS_DIR = plots_dir
+
+    return 1 if failures else 0
+
+
+# Alternates between synthetic datasets in one process: the first load of
+# each parses the file, later loads switch back through the dataset registry
+# unless the memory budget forced the dataset out.
+def run_registry(args) -> int:
+    import numpy as np
+    import pandas as pd
+
+    from src.agent.llm import DataContext
+    from src.agent.tools import tools
+    from src.agent.tools.registry import REGISTRY
+
+    rng = np.random.default_rng(0)
+    ctx = DataContext()
+    REGISTRY.budget_bytes = int(args.budget_mb * 1024 ** 2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.datasets):
+            path = Path(tmp) / f"registry_{i}.csv"
+            pd.DataFrame({
+                "x": rng.standard_normal(args.rows),
+                "y": rng.integers(0, 100, args.rows),
+                "label": rng.choice(["a", "b", "c"], args.rows),
+            }).to_csv(path, index=False)
+            paths.append(str(path))
+
+        for round_ in range(args.rounds):
+            for path in paths:
+                start = time.perf_counter()
+                result = tools.load_data(ctx, path, use_cache=False)
+                tools.basic_statistics(ctx)
+                seconds = time.perf_counter() - start
+
+                print(json.dumps({
+                    "round": round_,
+                    "dataset": Path(path).name,
+                    "registry": result["load"]["registry"],
+                    "load_and_stats_s": round(seconds, 4),
+                }))
+
+        info = tools.registry_info()
+
+    print(json.dumps({
+        k: info[k] for k in ("budget_bytes", "total_bytes", "hits", "misses", "evictions")
+    }))
+    return 0
+
+
+# Times dataset_info plus basic_statistics on a wide synthetic table for each
+# worker count, with column data already loaded and the pool already started,
+# and checks that every worker count gives the single-process output.
+def run_parallel(args) -> int:
+    import os
+
+    import numpy as np
+    import pandas as pd
+
+    from src.agent.llm import DataContext
+    from src.agent.tools import parallel, tools
+    from src.agent.tools.loaders import open_dataset
+
+    rng = np.random.default_rng(0)
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = {
+            f"n{i}": rng.standard_normal(args.rows)
+            for i in range(args.numeric)
+        }
+        for i in range(args.categorical):
+            data[f"s{i}"] = rng.choice(["a", "b", "c", None], args.rows)
+
+        path = Path(tmp) / "wide.parquet"
+        pd.DataFrame(data).to_parquet(path)
+
+        baseline = None
+        baseline_s = None
+
+        for workers in args.workers:
+            if workers > 1:
+                parallel.start_pool(workers)
+
+            ctx = DataContext()
+            source, fmt, _ = open_dataset(str(path), use_cache=False)
+            ctx.attach(source, str(path), fmt)
+            ctx.workers = workers
+            ctx.select(ctx.columns)
+
+            seconds, result = _timed(
+                lambda: (tools.dataset_info(ctx), tools.basic_statistics(ctx))
+            )
+
+            if baseline is None:
+                baseline, baseline_s = result, seconds
+            elif result != baseline:
+                print(f"FAIL: output with {workers} workers differs", file=sys.stderr)
+                failures += 1
+
+            print(json.dumps({
+                "workers": workers,
+                "cpus": os.cpu_count(),
+                "columns": args.numeric + args.categorical,
+                "rows": args.rows,
+                "seconds": round(seconds, 4),
+                "speedup": round(baseline_s / seconds, 2),
+            }))
+
+    return 1 if failures else 0
+
+
+# Synthetic dataset for the backend comparison: nulls, NaN, infinite values,
+# values around 1e12, integers with missing values, constant and empty
+# columns, ties among top values and types DuckDB leaves to pandas.
+def backend_dataset(rng, rows: int):
+    import numpy as np
+    import pandas as pd
+
+    floats = rng.standard_normal(rows) * 100
+    floats[rng.random(rows) < 0.1] = np.nan
+    infinite = rng.standard_normal(rows)
+    infinite[rng.random(rows) < 0.01] = np.inf
+    infinite[rng.random(rows) < 0.01] = -np.inf
+
+    return pd.DataFrame({
+        "float": floats,
+        "int": rng.integers(-1000, 1000, rows),
+        "int_missing": pd.Series(rng.integers(0, 50, rows), dtype="Int64").where(
+            rng.random(rows) > 0.2
+        ),
+        "small": rng.integers(0, 8, rows).astype(np.int8),
+        "ratio": rng.random(rows).astype(np.float32),
+        "infinite": infinite,
+        "large": 1e12 + rng.random(rows) * 1e6,
+        "constant": np.full(rows, 3.5),
+        "empty": np.full(rows, np.nan),
+        "category": pd.Series(
+            rng.choice(["red", "green", "blue", "amber", None], rows), dtype="str"
+        ),
+        "code": pd.Series(
+            [f"id{v}" for v in rng.integers(0, rows // 2 + 1, rows)], dtype="str"
+        ),
+        "flag": rng.random(rows) < 0.3,
+    })
+
+
+# Outputs of the statistics tools on `path` attached to a fresh data context
+# computed with `backend`, as the model would read them.
+def backend_results(path: str, backend: str) -> dict:
+    from src.agent.llm import DataContext
+    from src.agent.tools import tools
+    from src.agent.tools.loaders import open_dataset
+
+    ctx = DataContext()
+    source, fmt, _ = open_dataset(path, progress=False)
+    ctx.attach(source, path, fmt)
+    ctx.backend = backend
+
+    result = {
+        "dataset_info": tools.dataset_info(ctx, max_top_values=10, approximate=False),
+        "missing_values_report": tools.missing_values_report(ctx),
+        "basic_statistics": tools.basic_statistics(ctx),
+        "correlation_matrix": tools.correlation_matrix(ctx, threshold=0.1),
+    }
+    return json.loads(json.dumps(result, default=str))
+
+
+# Times the statistics tools with every backend on fresh data contexts, over
+# backend_dataset as CSV (ingest cache tables) and Parquet plus any
+# --datasets. tests/test_backends.py checks that every backend gives the
+# pandas output.
+def run_backends(args) -> int:
+    import numpy as np
+
+    from src.agent.tools.profile import BACKENDS
+
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = list(args.datasets or [])
+        for rows in args.rows:
+            df = backend_dataset(rng, rows)
+            for suffix in ("csv", "parquet"):
+                path = Path(tmp) / f"backends_{rows}.{suffix}"
+                if suffix == "csv":
+                    df.to_csv(path, index=False)
+                else:
+                    df.to_parquet(path)
+                paths.append(str(path))
+
+        for path in paths:
+            for name in BACKENDS:
+                seconds, result = _timed(backend_results, path, name)
+                print(json.dumps({
+                    "dataset": Path(path).name,
+                    "rows": result["dataset_info"]["rows"],
+                    "backend": name,
+                    "tools_s": round(seconds, 4),
+                }))
+
+    return 0
+
+
+def _compress_file(path: Path, codec: str) -> Path:
+    import bz2
+    import gzip
+    import lzma
+    import shutil
+
+    suffix = {"gzip": ".gz", "zstd": ".zst", "bz2": ".bz2", "xz": ".xz"}[codec]
+    out = path.with_name(path.name + suffix)
+
+    if codec == "zstd":
+        import zstandard
+        with open(path, "rb") as src, open(out, "wb") as dst:
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+        return out
+
+    opener = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}[codec]
+    with open(path, "rb") as src, opener(out, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 ** 2)
+    return out
+
+
+# Loads synthetic CSV and JSONL files plain and compressed with each codec,
+# fully and as a streaming pass, without the ingest cache. Reports the
+# throughput over the file as stored and over the decompressed data, and the
+# time relative to the plain file; every load must give the same rows.
+def run_decompress(args) -> int:
+    import numpy as np
+    import pandas as pd
+
+    from src.agent.llm import DataContext
+    from src.agent.tools import tools
+
+    rng = np.random.default_rng(0)
+    failures = 0
+
+    df = pd.DataFrame({
+        "x": rng.standard_normal(args.rows),
+        "y": rng.integers(0, 1000, args.rows),
+        "label": rng.choice(["alpha", "beta", "gamma"], args.rows),
+    })
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("csv", "jsonl"):
+            plain = Path(tmp) / f"decompress.{fmt}"
+            if fmt == "csv":
+                df.to_csv(plain, index=False)
+            else:
+                df.to_json(plain, orient="records", lines=True)
+            plain_bytes = plain.stat().st_size
+
+            for mode in ("full", "streaming"):
+                plain_s = None
+                for codec in [None] + args.codecs:
+                    path = plain if codec is None else _compress_file(plain, codec)
+
+                    ctx = DataContext()
+                    seconds, result = _timed(
+                        tools.load_data, ctx, str(path), progress=False,
+                        use_cache=False, streaming=mode == "streaming"
+                    )
+                    if plain_s is None:
+                        plain_s = seconds
+                    if result["rows"] != args.rows:
+                        print(f"FAIL: {path.name} ({mode}) gave {result['rows']} rows",
+                              file=sys.stderr)
+                        failures += 1
+
+                    print(json.dumps({
+                        "format": fmt,
+                        "mode": mode,
+                        "compression": codec,
+                        "bytes": path.stat().st_size,
+                        "seconds": round(seconds, 4),
+                        "mb_per_s": round(path.stat().st_size / 1024 ** 2 / seconds, 2),
+                        "decompressed_mb_per_s": round(plain_bytes / 1024 ** 2 / seconds, 2),
+                        "vs_plain": round(seconds / plain_s, 2),
+                    }))
+
+    return 1 if failures else 0
+
+
+# Grows a synthetic CSV log by --append rows per round after an initial
+# --rows, loading it incrementally each time and, for comparison, with a full
+# streaming pass. Incremental loads must read only the appended bytes and
+# give the same row and missing counts, moments and correlations; quartiles
+# are sketch estimates once columns outgrow the exact sample and may differ.
+def run_incremental(args) -> int:
+    import numpy as np
+    import pandas as pd
+
+    from src.agent.llm import DataContext
+    from src.agent.tools import tools
+    from src.agent.tools.incremental import _state_path
+
+    rng = np.random.default_rng(0)
+    failures = 0
+
+    def chunk(rows: int) -> pd.DataFrame:
+        x = rng.standard_normal(rows)
+        df = pd.DataFrame({
+            "x": x,
+            "y": 2 * x + rng.standard_normal(rows),
+            "n": rng.integers(0, 1000, rows),
+            "level": rng.choice(["debug", "info", "warning", "error"], rows),
+        })
+        df.loc[rng.random(rows) < 0.05, "y"] = np.nan
+        return df
+
+    def outputs(ctx) -> dict:
+        stats = tools.basic_statistics(ctx)
+        for values in stats.values():
+            for q in ("25%", "50%", "75%"):
+                values.pop(q)
+        return {
+            "rows": ctx.n_rows,
+            "missing": tools.missing_values_report(ctx),
+            "statistics": stats,
+            "correlation": tools.correlation_matrix(ctx)["matrix"],
+        }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "incremental.csv"
+        chunk(args.rows).to_csv(path, index=False)
+
+        try:
+            for step in range(args.rounds + 1):
+                if step:
+                    chunk(args.append).to_csv(path, mode="a", header=False, index=False)
+
+                ctx = DataContext()
+                inc_s, result = _timed(
+                    tools.load_data, ctx, str(path), progress=False, incremental=True
+                )
+                report = result["load"]["incremental"]
+                inc_out = outputs(ctx)
+
+                full = DataContext()
+                full_s, _ = _timed(
+                    tools.load_data, full, str(path), progress=False,
+                    use_cache=False, streaming=True
+                )
+
+                expected_mode = "append" if step else "full"
+                if report["mode"] != expected_mode or inc_out != outputs(full):
+                    print(f"FAIL: round {step} ({report['mode']}) differs from a full pass",
+                          file=sys.stderr)
+                    failures += 1
+
+                print(json.dumps({
+                    "round": step,
+                    "mode": report["mode"],
+                    "rows": result["rows"],
+                    "parsed_bytes": report["parsed_bytes"],
+                    "file_bytes": path.stat().st_size,
+                    "incremental_s": round(inc_s, 4),
+                    "full_s": round(full_s, 4),
+                    "speedup": round(full_s / inc_s, 2),
+                }))
+        finally:
+            _state_path(str(path)).unlink(missing_ok=True)
+
+    return 1 if failures else 0
+
+
+# Times missing_values_report and dataset_head on a string-heavy synthetic
+# dataset (CSV and Parquet) against the same results computed from the
+# pandas frame, and reports the bytes of columns each path converts to
+# pandas. Fails if the outputs differ.
+def run_arrow(args) -> int:
+    import numpy as np
+    import pandas as pd
+
+    from src.agent.llm import DataContext
+    from src.agent.tools import tools
+    from src.agent.tools.loaders import open_dataset
+
+    rng = np.random.default_rng(0)
+    failures = 0
+
+    users = np.array([f"user_{i:06d}" for i in range(50_000)])
+    df = pd.DataFrame({
+        "id": np.arange(args.rows),
+        "user": users[rng.integers(0, len(users), args.rows)],
+        "level": rng.choice(["debug", "info", "warning", "error"], args.rows),
+        "host": rng.choice([f"host-{i}" for i in range(200)], args.rows),
+        "path": rng.choice([f"/api/v1/items/{i}" for i in range(5_000)], args.rows),
+        "latency": rng.exponential(50, args.rows),
+    })
+    df.loc[rng.random(args.rows) < 0.1, "host"] = None
+    df.loc[rng.random(args.rows) < 0.05, "latency"] = np.nan
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("csv", "parquet"):
+            path = Path(tmp) / f"strings.{fmt}"
+            if fmt == "csv":
+                df.to_csv(path, index=False)
+            else:
+                df.to_parquet(path)
+
+            contexts = []
+            for _ in range(2):
+                ctx = DataContext()
+                source, source_fmt, _ = open_dataset(str(path), progress=False, use_cache=False)
+                ctx.attach(source, str(path), source_fmt)
+                contexts.append(ctx)
+            ctx, frame_ctx = contexts
+
+            arrow_s, arrow = _timed(
+                lambda: (tools.missing_values_report(ctx), tools.dataset_head(ctx, args.head))
+            )
+            arrow_bytes = ctx.memory_bytes() - ctx.source.memory_bytes()
+
+            def from_frame():
+                frame = frame_ctx.df
+                counts = frame.isna().sum()
+                report = {
+                    col: {"missing": int(n), "percent": round(n / len(frame) * 100, 2)}
+                    for col, n in counts.items() if n > 0
+                }
+                head = [
+                    {col: tools._json_value(v) for col, v in record.items()}
+                    for record in frame.head(args.head).to_dict(orient="records")
+                ]
+                return report, head
+
+            frame_s, frame = _timed(from_frame)
+            frame_bytes = frame_ctx.memory_bytes() - frame_ctx.source.memory_bytes()
+
+            if json.dumps(arrow) != json.dumps(frame):
+                print(f"FAIL: {fmt} outputs differ from the pandas frame", file=sys.stderr)
+                failures += 1
+
+            print(json.dumps({
+                "format": fmt,
+                "rows": args.rows,
+                "arrow_s": round(arrow_s, 4),
+                "frame_s": round(frame_s, 4),
+                "speedup": round(frame_s / arrow_s, 2),
+                "arrow_converted_mb": round(arrow_bytes / 1024 ** 2, 1),
+                "frame_converted_mb": round(frame_bytes / 1024 ** 2, 1),
+            }))
+
+    return 1 if failures else 0
+
+
+# Writes --files Parquet and CSV part files whose schemas drift (an integer
+# column that is float in some parts, a column only the later parts have)
+# and loads them as a directory and as a glob pattern, next to one file
+# holding the same rows. Reports load and tool times; fails if any tool
+# output of the part sets differs from the single file.
+def run_parts(args) -> int:
+    import numpy as np
+    import pandas as pd
+
+    from src.agent.llm import DataContext
+    from src.agent.tools import tools
+    from src.agent.tools.loaders import open_dataset
+
+    rng = np.random.default_rng(0)
+    failures = 0
+
+    def part(index: int, rows: int) -> pd.DataFrame:
+        amount = rng.integers(0, 10_000, rows)
+        df = pd.DataFrame({
+            "id": np.arange(rows) + index * rows,
+            "amount": amount.astype(np.int32) if index % 2 == 0 else amount / 4,
+            "score": rng.standard_normal(rows),
+            "status": rng.choice(["new", "paid", "shipped", "returned"], rows),
+        })
+        df.loc[rng.random(rows) < 0.05, "score"] = np.nan
+        if index >= args.files // 2:
+            df["region"] = pd.Series(rng.choice(["eu", "us", "apac", None], rows), dtype="str")
+        return df
+
+    def run_tools(ctx):
+        return {
+            "dataset_info": tools.dataset_info(ctx, max_top_values=10, approximate=False),
+            "missing_values_report": tools.missing_values_report(ctx),
+            "basic_statistics": tools.basic_statistics(ctx),
+            "correlation_matrix": tools.correlation_matrix(ctx, threshold=0.1),
+            "dataset_head": tools.dataset_head(ctx, 20),
+            "run_sql": tools.run_sql(
+                ctx, "SELECT status, count(*) AS n, avg(amount) AS amount FROM data "
+                     "GROUP BY status ORDER BY status"
+            ),
+        }
+
+    rows = args.rows // args.files
+    parts = [part(i, rows) for i in range(args.files)]
+    whole = pd.concat(parts, ignore_index=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("parquet", "csv"):
+            directory = Path(tmp) / fmt
+            directory.mkdir()
+            for i, df in enumerate(parts):
+                path = directory / f"part-{i:05d}.{fmt}"
+                df.to_parquet(path, index=False) if fmt == "parquet" else df.to_csv(path, index=False)
+            (directory / "_SUCCESS").touch()
+
+            single = Path(tmp) / f"single.{fmt}"
+            whole.to_parquet(single, index=False) if fmt == "parquet" else whole.to_csv(single, index=False)
+
+            baseline = None
+            for label, path in (
+                    ("single", single), ("directory", directory), ("glob", directory / f"part-*.{fmt}")
+            ):
+                ctx = DataContext()
+                load_s, (source, source_fmt, stats) = _timed(
+                    open_dataset, str(path), progress=False, use_cache=False
+                )
+                ctx.attach(source, str(path), source_fmt)
+
+                tools_s, result = _timed(run_tools, ctx)
+                result = json.loads(json.dumps(result, default=str))
+
+                if baseline is None:
+                    baseline = result
+                mismatched = sorted(k for k in result if result[k] != baseline[k])
+                if mismatched:
+                    print(f"FAIL: {fmt} {label} differs from the single file: "
+                          f"{', '.join(mismatched)}", file=sys.stderr)
+                    failures += 1
+
+                print(json.dumps({
+                    "format": fmt,
+                    "path": label,
+                    "files": len(stats.get("files", [])) or 1,
+                    "rows": ctx.n_rows,
+                    "source": type(ctx.source).__name__,
+                    "load_s": round(load_s, 4),
+                    "tools_s": round(tools_s, 4),
+                    "identical": not mismatched,
+                }))
+
+    return 1 if failures else 0
+
+
+# JSON values of a serialized result with NaN read as null, the way the
+# tool result serializer writes it.
+def _json_values(value):
+    if isinstance(value, dict):
+        return {k: _json_values(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_values(v) for v in value]
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+# Serializes tool results the way tool_phase used to (json.dumps) and with
+# dumps_result, through orjson and through its standard-library fallback:
+# correlation_matrix on synthetic tables of each width (dense matrices up to
+# MATRIX_MAX_COLUMNS, blockwise summaries beyond) and a frame summary built
+# straight from pandas, with NumPy scalars, Timestamps and categoricals,
+# that json.dumps rejects. Fails if the paths give different values.
+def run_serialize(args) -> int:
+    import numpy as np
+    import pandas as pd
+
+    from src.agent.llm import DataContext
+    from src.agent.tools import serialize, tools
+
+    rng = np.random.default_rng(0)
+    failures = 0
+    orjson = serialize.orjson
+
+    def best(fn, result) -> tuple[float, str | None]:
+        times = []
+        try:
+            for _ in range(args.repeat):
+                seconds, text = _timed(fn, result)
+                times.append(seconds)
+        except (TypeError, ValueError):
+            return None, None
+        return min(times), text
+
+    def fallback(result):
+        serialize.orjson = None
+        try:
+            return serialize.dumps_result(result)
+        finally:
+            serialize.orjson = orjson
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_cols in args.columns:
+            data = rng.standard_normal((args.rows, n_cols))
+            data[:, 1] = 1.0  # constant column: NaN correlations
+            path = Path(tmp) / f"serialize_{n_cols}.parquet"
+            pd.DataFrame(data, columns=[f"c{i}" for i in range(n_cols)]).to_parquet(path)
+
+            ctx = DataContext()
+            tools.load_data(ctx, str(path), use_cache=False)
+            results[f"correlation_matrix_{n_cols}"] = tools.correlation_matrix(ctx, threshold=0.05)
+
+    frame = pd.DataFrame({
+        "when": pd.date_range("2024-01-01", periods=args.rows, freq="min"),
+        "level": pd.Categorical(rng.choice(["info", "warning", "error"], args.rows)),
+        "count": rng.integers(0, 100, args.rows),
+        "value": rng.standard_normal(args.rows),
+    })
+    results["pandas_summary"] = {
+        "describe": frame.describe().to_dict(),
+        "level_counts": frame["level"].value_counts().to_dict(),
+        "count_counts": frame["count"].value_counts().head(50).to_dict(),
+        "head": frame.head(100).to_dict(orient="records"),
+    }
+
+    for name, result in results.items():
+        json_s, json_text = best(json.dumps, result)
+        std_s, std_text = best(fallback, result)
+        fast_s, fast_text = best(serialize.dumps_result, result)
+
+        expected = json.loads(std_text)
+        if json_text is not None and _json_values(json.loads(json_text)) != expected:
+            print(f"FAIL: {name}: fallback values differ from json.dumps", file=sys.stderr)
+            failures += 1
+        if json.loads(fast_text) != expected:
+            print(f"FAIL: {name}: orjson values differ from the fallback", file=sys.stderr)
+            failures += 1
+
+        print(json.dumps({
+            "result": name,
+            "json_dumps_s": None if json_s is None else round(json_s, 5),
+            "fallback_s": round(std_s, 5),
+            "orjson_s": round(fast_s, 5) if orjson is not None else None,
+            "speedup": round(json_s / fast_s, 1) if json_s is not None and orjson is not None else None,
+            "json_dumps_chars": None if json_text is None else len(json_text),
+            "chars": len(fast_text),
+        }))
+
+    return 1 if failures else 0
+
+
+# Runs group_aggregate on synthetic tables with --groups distinct keys (one
+# string key, and the same with a second integer key) and the same
+# aggregation with pandas groupby, keeping the top_k largest groups. Column
+# data is loaded before timing. Fails if the groups or their statistics
+# differ beyond rounding.
+def run_groupby(args) -> int:
+    import math
+
+    import numpy as np
+    import pandas as pd
+
+    from src.agent.llm import DataContext
+    from src.agent.tools import tools
+    from src.agent.tools.loaders import open_dataset
+
+    rng = np.random.default_rng(0)
+    failures = 0
+    percentiles = [25, 50, 75]
+    columns = ["amount", "latency", "score"]
+
+    def with_pandas(df: pd.DataFrame, by: list[str]) -> list[dict]:
+        grouped = df.groupby(by, sort=False)
+        sizes = grouped.size().sort_values(ascending=False, kind="stable").head(args.top_k)
+        stats = grouped[columns].agg(["count", "mean", "std", "min", "max"])
+        quantiles = grouped[columns].quantile([p / 100 for p in percentiles])
+
+        groups = []
+        for key, size in sizes.items():
+            key = key if isinstance(key, tuple) else (key,)
+            row = stats.loc[key if len(key) > 1 else key[0]]
+            group = {"key": dict(zip(by, key)), "size": int(size), "stats": {}}
+            for col in columns:
+                values = {"count": int(row[(col, "count")])}
+                for name in ("mean", "std", "min"):
+                    values[name] = float(row[(col, name)])
+                for p in percentiles:
+                    values[f"p{p}"] = float(quantiles.loc[(*key, p / 100), col])
+                values["max"] = float(row[(col, "max")])
+                group["stats"][col] = values
+            groups.append(group)
+        return groups
+
+    def same(expected: list[dict], result: list[dict]) -> bool:
+        if [(g["key"], g["size"]) for g in expected] != [(g["key"], g["size"]) for g in result]:
+            return False
+        for e, r in zip(expected, result):
+            for col in columns:
+                for name, value in e["stats"][col].items():
+                    got = r["stats"][col].get(name)
+                    if isinstance(value, float) and math.isnan(value):
+                        if got is not None:
+                            return False
+                    elif got is None or not math.isclose(value, got, rel_tol=1e-6, abs_tol=1e-4):
+                        return False
+        return True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_groups in args.groups:
+            users = np.array([f"user_{i:07d}" for i in range(n_groups)])
+            # Zipf-like group sizes, so the top groups are well separated.
+            weights = 1 / np.arange(1, n_groups + 1) ** 0.8
+            df = pd.DataFrame({
+                "user": users[rng.choice(n_groups, args.rows, p=weights / weights.sum())],
+                "region": rng.integers(0, 8, args.rows),
+                "amount": rng.exponential(100, args.rows),
+                "latency": rng.gamma(2, 30, args.rows),
+                "score": rng.standard_normal(args.rows),
+            })
+            df.loc[rng.random(args.rows) < 0.05, "latency"] = np.nan
+
+            path = Path(tmp) / f"groupby_{n_groups}.parquet"
+            df.to_parquet(path, index=False)
+            df = pd.read_parquet(path)
+
+            ctx = DataContext()
+            source, fmt, _ = open_dataset(str(path), progress=False, use_cache=False)
+            ctx.attach(source, str(path), fmt)
+            ctx.select(list(df.columns))
+
+            for by in (["user"], ["user", "region"]):
+                tool_s, result = _timed(
+                    tools.group_aggregate, ctx, by, columns, percentiles, args.top_k
+                )
+                pandas_s, expected = _timed(with_pandas, df, by)
+
+                identical = same(expected, result["groups"])
+                if not identical:
+                    print(f"FAIL: group_aggregate differs from pandas for {n_groups} groups "
+                          f"by {by}", file=sys.stderr)
+                    failures += 1
+
+                print(json.dumps({
+                    "rows": args.rows,
+                    "by": by,
+                    "n_groups": result["n_groups"],
+                    "tool_s": round(tool_s, 4),
+                    "pandas_s": round(pandas_s, 4),
+                    "speedup": round(pandas_s / tool_s, 1),
+                    "identical": identical,
+                }))
+
+    return 1 if failures else 0
+
+
+# Engine for concurrent sessions: plans every tool but the heatmap, calls
+# them in order with `arguments` (default ones for tools not in it) and
+# answers with nothing. Keeps the tool results it was shown; `delay_s` stands
+# in for generation time.
+class _ScriptedEngine:
+    def __init__(self, tools: list[str], delay_s: float = 0.0, arguments: dict | None = None):
+        self.tools = tools
+        self.delay_s = delay_s
+        self.arguments = arguments or {}
+        self.tool_results = None
+
+    def generate(self, messages: list[dict], max_new_tokens: int) -> str:
+        time.sleep(self.delay_s)
+
+        done = [m["tool_name"] for m in messages if m.get("role") == "tool"]
+        if not any(m.get("role") == "assistant" for m in messages):
+            return json.dumps({"phase": "plan", "plan": self.tools})
+        if len(done) < len(self.tools):
+            return json.dumps({
+                "phase": "tool",
+                "tool": self.tools[len(done)],
+                "arguments": self.arguments.get(self.tools[len(done)], {})
+            })
+
+        self.tool_results = {
+            m["tool_name"]: m["content"] for m in messages if m.get("role") == "tool"
+        }
+        return json.dumps({"phase": "final", "answer": "done"})
+
+
+# Writes `count` synthetic datasets (CSV and Parquet in turn) of about `rows`
+# rows into `out_dir` and returns their paths with the label column of each.
+# Column names and shapes differ, so a session answered from another
+# session's data cannot match.
+def concurrency_datasets(rng, count: int, rows: int, out_dir: str) -> dict[str, str]:
+    import numpy as np
+    import pandas as pd
+
+    labels = {}
+    for i in range(count):
+        n = rows + 1000 * i
+        df = pd.DataFrame({
+            f"d{i}_x": rng.standard_normal(n),
+            f"d{i}_y": rng.integers(0, 10 + i, n).astype(np.float64),
+            f"d{i}_label": rng.choice(["a", "b", "c"], n),
+        })
+        df.loc[df.sample(frac=0.05, random_state=i).index, f"d{i}_y"] = np.nan
+
+        path = Path(out_dir) / (f"conc_{i}.parquet" if i % 2 else f"conc_{i}.csv")
+        if i % 2:
+            df.to_parquet(path)
+        else:
+            df.to_csv(path, index=False)
+        labels[str(path)] = f"d{i}_label"
+
+    return labels
+
+
+# Runs every tool but the heatmap on `path` through run_query with a scripted
+# engine and returns the tool results the engine was shown.
+def scripted_session(path: str, label: str, delay_s: float = 0.0) -> dict:
+    from src.agent.agent import run_query
+    from src.agent.session import Session
+    from src.agent.tools import TOOLS
+
+    plan = [t for t in TOOLS if t != "plot_correlation_heatmap"]
+    engine = _ScriptedEngine(plan, delay_s, {
+        "run_sql": {"query": "SELECT count(*) AS n, max(COLUMNS(*)) FROM data"},
+        "group_aggregate": {"by": label},
+    })
+    run_query("Describe the dataset", path, use_cache=False,
+              max_steps=len(plan) + 2, session=Session(engine=engine))
+    return engine.tool_results
+
+
+# Times run_query sessions on different datasets run one after another and
+# in threads sharing the dataset registry. tests/test_concurrency.py checks
+# that every session sees the results of a serial run on its own dataset.
+def run_concurrency(args) -> int:
+    from concurrent.futures import ThreadPoolExecutor
+
+    import numpy as np
+
+    from src.agent.tools.registry import REGISTRY
+
+    REGISTRY.budget_bytes = int(args.budget_mb * 1024 ** 2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        labels = concurrency_datasets(np.random.default_rng(0), args.datasets, args.rows, tmp)
+        paths = list(labels)
+
+        start = time.perf_counter()
+        for path in paths:
+            scripted_session(path, labels[path], args.delay_s)
+        serial_s = time.perf_counter() - start
+
+        jobs = [paths[i % len(paths)] for i in range(args.sessions)]
+        hits, misses = REGISTRY.hits, REGISTRY.misses
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(
+                lambda path: scripted_session(path, labels[path], args.delay_s), jobs
+            ))
+        parallel_s = time.perf_counter() - start
+
+    print(json.dumps({
+        "sessions": args.sessions,
+        "workers": args.workers,
+        "datasets": args.datasets,
+        "serial_s_per_dataset": round(serial_s / len(paths), 4),
+        "parallel_s": round(parallel_s, 4),
+        "sessions_per_s": round(args.sessions / parallel_s, 2),
+        "registry_hits": REGISTRY.hits - hits,
+        "registry_misses": REGISTRY.misses - misses,
+    }))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Performance checks and benchmarks for the agent"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    importtime = subparsers.add_parser(
+        "importtime",
+        help="Report import times and heavy imports of the agent modules"
+    )
+    importtime.add_argument(
+        "--modules",
+        nargs="+",
+        default=["src.agent", "src.agent.tools", "src.agent.cli"]
+    )
+    importtime.set_defaults(func=run_importtime)
+
+    replay = subparsers.add_parser(
+        "replay",
+        help="Replay recorded sessions against datasets of increasing size"
+    )
+    replay.add_argument(
+        "--transcripts",
+        nargs="+",
+        required=True,
+        help="JSONL transcripts recorded with --record"
+    )
+    replay.add_argument(
+        "--datasets",
+        nargs="+",
+        default=None,
+        help="Dataset paths to replay against"
+    )
+    replay.add_argument(
+        "--base",
+        type=str,
+        default=None,
+        help="CSV resampled to each --rows size when --datasets is not given"
+    )
+    replay.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000, 1_000_000]
+    )
+    replay.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per session and dataset; the fastest is reported"
+    )
+    replay.add_argument(
+        "--reproduce-timings",
+        action="store_true",
+        help="Sleep for the recorded generation time of each LLM call"
+    )
+    replay.set_defaults(func=run_replay)
+
+    corr = subparsers.add_parser(
+        "corr",
+        help="Time correlation_matrix on synthetic tables of increasing width"
+    )
+    corr.add_argument(
+        "--columns",
+        type=int,
+        nargs="+",
+        default=[50, 500, 2000]
+    )
+    corr.add_argument("--rows", type=int, default=10_000)
+    corr.add_argument("--threshold", type=float, default=0.2)
+    corr.set_defaults(func=run_corr)
+
+    registry = subparsers.add_parser(
+        "registry",
+        help="Switch between datasets loaded in one process"
+    )
+    registry.add_argument("--datasets", type=int, default=3)
+    registry.add_argument("--rows", type=int, default=1_000_000)
+    registry.add_argument("--rounds", type=int, default=3)
+    registry.add_argument(
+        "--budget-mb",
+        type=float,
+        default=DATASET_MEMORY_BUDGET_MB,
+        help="Memory budget of the registry"
+    )
+    registry.set_defaults(func=run_registry)
+
+    parallel = subparsers.add_parser(
+        "parallel",
+        help="Scale column-parallel profiling of a wide table with worker count"
+    )
+    parallel.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parallel.add_argument("--numeric", type=int, default=2000)
+    parallel.add_argument("--categorical", type=int, default=200)
+    parallel.add_argument("--rows", type=int, default=20_000)
+    parallel.set_defaults(func=run_parallel)
+
+    backends = subparsers.add_parser(
+        "backends",
+        help="Time the statistics tools with every analysis backend"
+    )
+    backends.add_argument("--rows", type=int, nargs="+", default=[1_000, 1_000_000])
+    backends.add_argument(
+        "--datasets",
+        nargs="+",
+        default=None,
+        help="Extra dataset paths to compare the backends on"
+    )
+    backends.set_defaults(func=run_backends)
+
+    decompress = subparsers.add_parser(
+        "decompress",
+        help="Compare loading compressed and plain CSV/JSONL files"
+    )
+    decompress.add_argument("--rows", type=int, default=500_000)
+    decompress.add_argument(
+        "--codecs",
+        nargs="+",
+        choices=["gzip", "zstd", "bz2", "xz"],
+        default=["gzip", "zstd", "bz2", "xz"]
+    )
+    decompress.set_defaults(func=run_decompress)
+
+    arrow = subparsers.add_parser(
+        "arrow",
+        help="Compare missing counts and head records read from Arrow with the pandas frame"
+    )
+    arrow.add_argument("--rows", type=int, default=1_000_000)
+    arrow.add_argument("--head", type=int, default=100)
+    arrow.set_defaults(func=run_arrow)
+
+    incremental = subparsers.add_parser(
+        "incremental",
+        help="Append to a CSV file and compare incremental loads with full passes"
+    )
+    incremental.add_argument("--rows", type=int, default=1_000_000)
+    incremental.add_argument("--append", type=int, default=50_000)
+    incremental.add_argument("--rounds", type=int, default=3)
+    incremental.set_defaults(func=run_incremental)
+
+    parts = subparsers.add_parser(
+        "parts",
+        help="Load a directory and a glob of part files and compare them with one file"
+    )
+    parts.add_argument("--files", type=int, default=16)
+    parts.add_argument("--rows", type=int, default=1_000_000)
+    parts.set_defaults(func=run_parts)
+
+    serialize = subparsers.add_parser(
+        "serialize",
+        help="Compare json.dumps with the tool result serializer on wide outputs"
+    )
+    serialize.add_argument("--columns", type=int, nargs="+", default=[50, 100, 2000])
+    serialize.add_argument("--rows", type=int, default=2_000)
+    serialize.add_argument("--repeat", type=int, default=5)
+    serialize.set_defaults(func=run_serialize)
+
+    groupby = subparsers.add_parser(
+        "groupby",
+        help="Compare group_aggregate with pandas groupby up to millions of groups"
+    )
+    groupby.add_argument("--groups", type=int, nargs="+", default=[10, 10_000, 1_000_000])
+    groupby.add_argument("--rows", type=int, default=2_000_000)
+    groupby.add_argument("--top-k", type=int, default=10)
+    groupby.set_defaults(func=run_groupby)
+
+    concurrency = subparsers.add_parser(
+        "concurrency",
+        help="Run many sessions on different datasets in parallel threads"
+    )
+    concurrency.add_argument("--sessions", type=int, default=64)
+    concurrency.add_argument("--workers", type=int, default=16)
+    concurrency.add_argument("--datasets", type=int, default=6)
+    concurrency.add_argument("--rows", type=int, default=50_000)
+    concurrency.add_argument(
+        "--delay-s",
+        type=float,
+        default=0.01,
+        help="Simulated generation time of each LLM call"
+    )
+    concurrency.add_argument(
+        "--budget-mb",
+        type=float,
+        default=0,
+        help="Registry memory budget; 0 reloads every dataset not in use"
+    )
+    concurrency.set_defaults(func=run_concurrency)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
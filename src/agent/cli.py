@@ -1,5 +1,5 @@
 import argparse
-from src.agent import run_query
+import json
 
 
 def main():
@@ -8,15 +8,13 @@ def main():
     parser.add_argument(
         "--query",
         type=str,
-        required=True,
         help="User analysis request"
     )
 
     parser.add_argument(
         "--path",
         type=str,
-        required=True,
-        help="Dataset path"
+        help="Dataset path: a file, a directory of part files or a glob pattern"
     )
 
     parser.add_argument(
@@ -49,8 +47,132 @@ def main():
         default=512
     )
 
+    parser.add_argument(
+        "--record",
+        type=str,
+        default=None,
+        help="Append every LLM exchange to this JSONL transcript"
+    )
+
+    parser.add_argument(
+        "--replay",
+        type=str,
+        default=None,
+        help="Serve LLM outputs from a recorded JSONL transcript instead of the model"
+    )
+
+    parser.add_argument(
+        "--replay-timings",
+        action="store_true",
+        help="With --replay, sleep for the recorded generation time of each call"
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse and profile the dataset without reading or writing the ingest cache or profile sidecar"
+    )
+
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Compute statistics in one chunked pass without loading the dataset"
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Like --streaming, but remember the statistics and on later runs "
+             "read only the rows appended to the file since"
+    )
+
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=float,
+        default=None,
+        help="Memory budget of the --streaming, --incremental or --sample pass"
+    )
+
+    parser.add_argument(
+        "--sample",
+        type=int,
+        nargs="?",
+        const=100_000,
+        default=None,
+        help="Run tools on a random sample of this many rows (default 100000) "
+             "and report estimates with confidence intervals"
+    )
+
+    parser.add_argument(
+        "--stratify",
+        type=str,
+        default=None,
+        help="With --sample, stratify the sample by this column"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes for column-parallel statistics of wide tables (default: PROFILE_WORKERS)"
+    )
+
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Store columns in the smallest lossless dtypes and report the memory saved"
+    )
+
+    parser.add_argument(
+        "--backend",
+        choices=["pandas", "duckdb"],
+        default=None,
+        help="Engine computing dataset statistics (default: ANALYSIS_BACKEND)"
+    )
+
+    parser.add_argument(
+        "--cache",
+        choices=["info", "clear"],
+        default=None,
+        help="Inspect or clear the ingest cache, profile sidecars and incremental states and exit"
+    )
+
     args = parser.parse_args()
 
+    if args.cache:
+        from src.agent.tools.cache import cache_info, clear_cache
+
+        report = cache_info() if args.cache == "info" else clear_cache()
+        print(json.dumps(report, indent=2))
+        return
+
+    if not args.query or not args.path:
+        parser.error("--query and --path are required")
+    if args.sample is not None and (args.streaming or args.incremental):
+        parser.error("--sample cannot be combined with --streaming or --incremental")
+    if args.incremental and args.no_cache:
+        parser.error("--incremental keeps its state in the cache and cannot be combined with --no-cache")
+    if args.stratify and args.sample is None:
+        parser.error("--stratify requires --sample")
+    if args.compact and (args.streaming or args.incremental or args.sample is not None):
+        parser.error("--compact cannot be combined with --streaming, --incremental or --sample")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    # Imported after argument parsing so `--help` stays instant.
+    from src.agent import run_query
+    from src.agent.agent import set_engine
+    from src.agent.llm import LLMEngine, ReplayEngine
+    from src.config import ANALYSIS_BACKEND, MODEL_ID, PROFILE_WORKERS, STREAM_MEMORY_LIMIT_MB
+
+    if args.replay:
+        set_engine(ReplayEngine.from_file(
+            args.replay,
+            reproduce_timings=args.replay_timings
+        ))
+    elif args.record:
+        set_engine(LLMEngine(MODEL_ID, record_path=args.record))
+
     result = run_query(
         user_query=args.query,
         dataset_path=args.path,
@@ -59,6 +181,15 @@ def main():
         max_new_tokens_plan=args.max_new_tokens_plan,
         max_new_tokens_tool=args.max_new_tokens_tool,
         max_new_tokens_final=args.max_new_tokens_final,
+        use_cache=not args.no_cache,
+        streaming=args.streaming,
+        memory_limit_mb=args.memory_limit_mb or STREAM_MEMORY_LIMIT_MB,
+        sample=args.sample,
+        stratify=args.stratify,
+        workers=args.workers or PROFILE_WORKERS,
+        backend=args.backend or ANALYSIS_BACKEND,
+        compact=args.compact or None,
+        incremental=args.incremental,
     )
 
     print(f"\n{result}")
@@ -1,4 +1,5 @@
 from .engine import LLMEngine
+from .replay import ReplayEngine, load_transcript
 from .prompts import SYSTEM_PROMPT
-from .data_context import DATA_CONTEXT
+from .data_context import DataContext
 
@@ -1,16 +1,457 @@
-from dataclasses import dataclass
+import math
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as pa_ds
+from pyarrow import parquet as pq
+
+
+def _is_numeric_arrow(data_type: pa.DataType) -> bool:
+    # Matches pandas select_dtypes(include="number"): bools are excluded.
+    return pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+
+
+# Values pandas treats as missing: nulls, counted in the validity bitmap
+# (the count is kept with the array), plus NaN in float columns.
+def _missing_count(column: pa.ChunkedArray | pa.Array) -> int:
+    count = column.null_count
+    if pa.types.is_floating(column.type):
+        count += pc.sum(pc.is_nan(column)).as_py() or 0
+    return count
+
+
+def _pylist(column: pa.ChunkedArray, na_value) -> list:
+    values = column.to_pylist()
+    if column.null_count:
+        values = [na_value if v is None else v for v in values]
+    return values
+
+
+# Rows of an Arrow table as record dicts, with the values
+# DataFrame.to_dict(orient="records") gives after to_pandas(): integers with
+# nulls become floats, nulls in float and string columns NaN. Numeric, bool
+# and string columns are read from the Arrow buffers directly; other types
+# (and columns pandas metadata maps to extension dtypes) go through pandas.
+def arrow_records(table: pa.Table) -> list[dict]:
+    dtypes = table.slice(0, 0).to_pandas().dtypes
+    columns = {}
+    others = []
+
+    for name, column in zip(table.column_names, table.columns):
+        data_type = column.type
+        dtype = str(dtypes[name]) if name in dtypes.index else None
+
+        if _is_numeric_arrow(data_type) and dtype == np.dtype(data_type.to_pandas_dtype()).name:
+            if pa.types.is_integer(data_type) and column.null_count:
+                column = pc.cast(column, pa.float64())
+            columns[name] = _pylist(column, math.nan)
+        elif pa.types.is_boolean(data_type) and dtype == "bool":
+            columns[name] = column.to_pylist()
+        elif (pa.types.is_string(data_type) or pa.types.is_large_string(data_type)) and dtype == "str":
+            columns[name] = _pylist(column, math.nan)
+        else:
+            others.append(name)
+
+    if others:
+        frame = table.select(others).to_pandas()
+        for name, values in frame.to_dict(orient="list").items():
+            columns[name] = values
+
+    names = table.column_names
+    return [dict(zip(names, row)) for row in zip(*(columns[n] for n in names))]
+
+
+# In-memory or memory-mapped Arrow table. Column selection and row slicing
+# are zero-copy; only the selected part is converted to pandas.
+# A memory-mapped table (`mapped`) is backed by the page cache, not the heap.
+class TableSource:
+    streaming = False
+    sampled = False
+    read_copies = True
+
+    def __init__(self, table: pa.Table, mapped: bool = False):
+        self.table = table
+        self.mapped = mapped
+        self.columns = table.column_names
+        self.numeric_columns = [
+            f.name for f in table.schema if _is_numeric_arrow(f.type)
+        ]
+        self.num_rows = table.num_rows
+
+    def memory_bytes(self) -> int:
+        return 0 if self.mapped else self.table.nbytes
+
+    def read(self, columns: list[str]) -> pd.DataFrame:
+        return self.table.select(columns).to_pandas()
+
+    def slice(self, offset: int, length: int, columns: list[str]) -> pd.DataFrame:
+        return self.table.slice(offset, length).select(columns).to_pandas()
+
+    def slice_table(self, offset: int, length: int, columns: list[str]) -> pa.Table:
+        return self.table.slice(offset, length).select(columns)
+
+    def missing_counts(self, columns: list[str]) -> dict[str, int]:
+        return {col: _missing_count(self.table.column(col)) for col in columns}
+
+
+# Rows per batch when a row range is decoded from Parquet row groups.
+SLICE_BATCH_ROWS = 65_536
+
+
+# Parquet file read on demand: only the schema and row group metadata are
+# read up front, columns and row groups when a tool asks for them.
+class ParquetSource:
+    streaming = False
+    sampled = False
+    read_copies = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = pq.ParquetFile(path)
+        schema = self.file.schema_arrow
+
+        # A non-default pandas index is stored as an extra column.
+        index_columns = (schema.pandas_metadata or {}).get("index_columns", [])
+        fields = [f for f in schema if f.name not in index_columns]
+
+        self.columns = [f.name for f in fields]
+        self.numeric_columns = [
+            f.name for f in fields if _is_numeric_arrow(f.type)
+        ]
+        self.num_rows = self.file.metadata.num_rows
+
+    def memory_bytes(self) -> int:
+        return 0
+
+    def read(self, columns: list[str]) -> pd.DataFrame:
+        return self.read_table(columns).to_pandas()
+
+    def read_table(self, columns: list[str]) -> pa.Table:
+        return self.file.read(columns=columns, use_threads=True)
+
+    # Arrow dataset over the file, for engines that scan it themselves.
+    def dataset(self) -> pa_ds.Dataset:
+        return pa_ds.dataset(self.path, format="parquet")
+
+    def slice(self, offset: int, length: int, columns: list[str]) -> pd.DataFrame:
+        return self.slice_table(offset, length, columns).to_pandas()
+
+    def slice_table(self, offset: int, length: int, columns: list[str]) -> pa.Table:
+        metadata = self.file.metadata
+        groups = []
+        first_row = 0
+        group_start = 0
+
+        # Only the row groups overlapping [offset, offset + length) are read.
+        for i in range(metadata.num_row_groups):
+            group_rows = metadata.row_group(i).num_rows
+            if group_start + group_rows > offset and group_start < offset + length:
+                if not groups:
+                    first_row = group_start
+                groups.append(i)
+            group_start += group_rows
+
+        # Decoded batch by batch up to the last requested row, so the head of
+        # a large row group does not cost the whole group.
+        end = offset - first_row + length
+        batches = []
+        for batch in self.file.iter_batches(
+                batch_size=min(max(end, 1), SLICE_BATCH_ROWS),
+                row_groups=groups,
+                columns=columns,
+                use_threads=True
+        ):
+            batches.append(batch)
+            end -= batch.num_rows
+            if end <= 0:
+                break
+
+        schema = self.file.schema_arrow
+        table = pa.Table.from_batches(batches, schema=pa.schema(
+            [schema.field(c) for c in columns], metadata=schema.metadata
+        ))
+        return table.slice(offset - first_row, length)
+
+    # Null counts of non-float columns come from the row group statistics
+    # when every row group has them; other columns are read to count.
+    def missing_counts(self, columns: list[str]) -> dict[str, int]:
+        metadata = self.file.metadata
+        schema = self.file.schema_arrow
+        positions = {
+            metadata.schema.column(i).path: i for i in range(metadata.num_columns)
+        }
+
+        counts = {}
+        unread = []
+        for col in columns:
+            if pa.types.is_floating(schema.field(col).type) or col not in positions:
+                unread.append(col)
+                continue
+
+            stats = [
+                metadata.row_group(g).column(positions[col]).statistics
+                for g in range(metadata.num_row_groups)
+            ]
+            if all(st is not None and st.has_null_count for st in stats):
+                counts[col] = sum(st.null_count for st in stats)
+            else:
+                unread.append(col)
+
+        if unread:
+            table = self.file.read(columns=unread, use_threads=True)
+            for col in unread:
+                counts[col] = _missing_count(table.column(col))
+
+        return {col: counts[col] for col in columns}
 
 
-@dataclass
+# The columns of `schema` from a table holding some of them, cast to their
+# types; columns the table lacks are all null.
+def _conform(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    columns = [
+        table.column(f.name).cast(f.type) if f.name in table.column_names
+        else pa.nulls(table.num_rows, f.type)
+        for f in schema
+    ]
+    return pa.table(columns, schema=schema)
+
+
+# Several Parquet files read as one dataset (part files of a directory or a
+# glob), in file order. Footers are read in parallel up front and the file
+# schemas unified: types are promoted (int32 and float64 to float64) and
+# columns missing from a file read as nulls. Columns are read on demand by
+# an Arrow dataset scan, which reads the files in parallel.
+class ParquetPartsSource:
+    streaming = False
+    sampled = False
+    read_copies = True
+
+    def __init__(self, paths: list[str], threads: int):
+        with ThreadPoolExecutor(max_workers=max(min(threads, len(paths)), 1)) as pool:
+            self.parts = list(pool.map(ParquetSource, paths))
+        self.paths = paths
+        self._threads = threads
+
+        try:
+            schema = pa.unify_schemas(
+                [part.file.schema_arrow for part in self.parts],
+                promote_options="permissive"
+            )
+        except (pa.ArrowTypeError, pa.ArrowInvalid) as e:
+            raise ValueError(f"Part files have incompatible schemas: {e}")
+
+        columns = set().union(*(part.columns for part in self.parts))
+        self.schema = pa.schema(
+            [f for f in schema if f.name in columns], metadata=schema.metadata
+        )
+        self.columns = self.schema.names
+        self.numeric_columns = [
+            f.name for f in self.schema if _is_numeric_arrow(f.type)
+        ]
+        self.num_rows = sum(part.num_rows for part in self.parts)
+
+    def memory_bytes(self) -> int:
+        return 0
+
+    def read(self, columns: list[str]) -> pd.DataFrame:
+        return self.read_table(columns).to_pandas()
+
+    def read_table(self, columns: list[str]) -> pa.Table:
+        return self.dataset().to_table(columns=columns, use_threads=True)
+
+    def dataset(self) -> pa_ds.Dataset:
+        return pa_ds.dataset(self.paths, schema=self.schema, format="parquet")
+
+    def _schema(self, columns: list[str]) -> pa.Schema:
+        return pa.schema(
+            [self.schema.field(c) for c in columns], metadata=self.schema.metadata
+        )
+
+    def slice(self, offset: int, length: int, columns: list[str]) -> pd.DataFrame:
+        return self.slice_table(offset, length, columns).to_pandas()
+
+    # Only the files overlapping [offset, offset + length) are read, each
+    # the way ParquetSource reads its row range.
+    def slice_table(self, offset: int, length: int, columns: list[str]) -> pa.Table:
+        schema = self._schema(columns)
+        tables = []
+        start = 0
+
+        for part in self.parts:
+            if start + part.num_rows > offset and start < offset + length:
+                first = max(offset - start, 0)
+                table = part.slice_table(
+                    first,
+                    min(offset + length - start, part.num_rows) - first,
+                    [c for c in columns if c in part.columns]
+                )
+                tables.append(_conform(table, schema))
+            start += part.num_rows
+
+        return pa.concat_tables(tables) if tables else schema.empty_table()
+
+    def missing_counts(self, columns: list[str]) -> dict[str, int]:
+        def part_counts(part: ParquetSource) -> dict[str, int]:
+            counts = part.missing_counts([c for c in columns if c in part.columns])
+            return {c: counts.get(c, part.num_rows) for c in columns}
+
+        with ThreadPoolExecutor(max_workers=max(min(self._threads, len(self.parts)), 1)) as pool:
+            per_part = list(pool.map(part_counts, self.parts))
+
+        return {c: sum(counts[c] for counts in per_part) for c in columns}
+
+
+# Frame already materialized by pandas (Excel, JSON arrays, pickles).
+# Columns read from it share its memory.
+class FrameSource:
+    streaming = False
+    sampled = False
+    read_copies = False
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.columns = list(df.columns)
+        self.numeric_columns = list(df.select_dtypes(include="number").columns)
+        self.num_rows = len(df)
+        self._bytes = None
+
+    def memory_bytes(self) -> int:
+        if self._bytes is None:
+            self._bytes = int(self.df.memory_usage(index=True, deep=True).sum())
+        return self._bytes
+
+    def read(self, columns: list[str]) -> pd.DataFrame:
+        return self.df[columns]
+
+    def slice(self, offset: int, length: int, columns: list[str]) -> pd.DataFrame:
+        return self.df[columns].iloc[offset:offset + length]
+
+    def missing_counts(self, columns: list[str]) -> dict[str, int]:
+        return {col: int(self.df[col].isna().sum()) for col in columns}
+
+
+# Lazy handle on the dataset loaded by one session. Schema and row count are
+# known after load_data; column data is converted to pandas on first request
+# and kept. Compared by identity, so contexts can key weak mappings.
+# In streaming mode the source is the statistics of a single chunked pass
+# (tools.streaming.StreamStats) and no column data is kept. In sample mode
+# it is a random sample of the rows (tools.sampling.SampleSource).
+@dataclass(eq=False)
 class DataContext:
-    df: pd.DataFrame | None = None
+    source: TableSource | ParquetSource | FrameSource | None = None
     path: str | None = None
     format: str | None = None
+    _loaded: dict[str, pd.Series] = field(default_factory=dict, repr=False)
+    # Per-column quantile sketches and histograms, see tools.distribution.
+    sketches: dict = field(default_factory=dict, repr=False)
+    histograms: dict = field(default_factory=dict, repr=False)
+    # Shared per-column statistics, see tools.profile.
+    profile: object | None = field(default=None, repr=False)
+    # Measured size of each loaded column, see memory_bytes.
+    _sizes: dict[str, int] = field(default_factory=dict, repr=False)
+    # Processes that profile the columns of wide tables; set by load_data
+    # for the calling session, see tools.parallel.
+    workers: int = 1
+    # Engine that computes the profile and correlations ("pandas" or
+    # "duckdb"); set by load_data for the calling session, see tools.profile.
+    backend: str = "pandas"
 
     def is_loaded(self) -> bool:
-        return self.df is not None
+        return self.source is not None
+
+    def attach(
+            self,
+            source: TableSource | ParquetSource | FrameSource,
+            path: str,
+            fmt: str
+    ):
+        self.source = source
+        self.path = path
+        self.format = fmt
+        self._loaded = {}
+        self.sketches = {}
+        self.histograms = {}
+        self.profile = None
+        self._sizes = {}
+
+    # Makes this context use the state of `other` (a snapshot taken with
+    # dataclasses.replace); mutable state is shared, not copied.
+    def restore(self, other: "DataContext"):
+        for f in fields(self):
+            setattr(self, f.name, getattr(other, f.name))
+
+    # Heap bytes held by the dataset: the source plus the loaded columns,
+    # each measured once with memory_usage(deep=True) when first counted.
+    def memory_bytes(self) -> int:
+        if self.source.read_copies:
+            for col in self._loaded.keys() - self._sizes.keys():
+                self._sizes[col] = int(
+                    self._loaded[col].memory_usage(index=False, deep=True)
+                )
+        return self.source.memory_bytes() + sum(self._sizes.values())
+
+    @property
+    def streaming(self) -> bool:
+        return self.source.streaming
+
+    @property
+    def sampled(self) -> bool:
+        return self.source.sampled
+
+    @property
+    def columns(self) -> list[str]:
+        return self.source.columns
+
+    @property
+    def numeric_columns(self) -> list[str]:
+        return self.source.numeric_columns
+
+    @property
+    def n_rows(self) -> int:
+        return self.source.num_rows
+
+    # Returns the requested columns, reading only the ones not yet loaded.
+    def select(self, columns: list[str]) -> pd.DataFrame:
+        missing = [c for c in columns if c not in self._loaded]
+
+        if missing:
+            loaded = self.source.read(missing)
+            for col in missing:
+                self._loaded[col] = loaded[col]
+
+        return pd.DataFrame({c: self._loaded[c] for c in columns})
+
+    def numeric(self) -> pd.DataFrame:
+        return self.select(self.numeric_columns)
+
+    # Returns a row range without loading whole columns.
+    # Loaded columns of a sample are not the leading rows of the dataset.
+    def rows(self, offset: int, length: int) -> pd.DataFrame:
+        if not self.sampled and all(c in self._loaded for c in self.columns):
+            return self.df.iloc[offset:offset + length]
+
+        return self.source.slice(offset, length, self.columns)
+
+    # A row range as record dicts. Rows of Arrow sources are sliced zero-copy
+    # and read from the Arrow buffers, without building a frame.
+    def records(self, offset: int, length: int) -> list[dict]:
+        if hasattr(self.source, "slice_table") and not all(c in self._loaded for c in self.columns):
+            return arrow_records(self.source.slice_table(offset, length, self.columns))
+
+        return self.rows(offset, length).to_dict(orient="records")
 
+    # Missing values per column (as pandas counts them) without converting
+    # columns to pandas: null counts are read from the validity bitmaps (or
+    # Parquet statistics) and only float columns are scanned for NaN.
+    def missing_counts(self, columns: list[str]) -> dict[str, int]:
+        return self.source.missing_counts(columns)
 
-DATA_CONTEXT = DataContext()
+    # Fully materialized frame, for tools that need every column.
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.select(self.columns)
 
@@ -1,13 +1,21 @@
-from transformers import AutoModelForImageTextToText, AutoProcessor
-import torch
+import time
+
+from .replay import TranscriptRecorder
 
 
 class LLMEngine:
     def __init__(
             self, 
             model_id: str, 
-            device_map: str = 'auto'
+            device_map: str = 'auto',
+            record_path: str | None = None
     ):
+        # torch and transformers take seconds to import, so they are only
+        # pulled in once a real engine is constructed.
+        import torch
+        from transformers import AutoModelForImageTextToText, AutoProcessor
+
+        self._torch = torch
 
         self.processor = AutoProcessor.from_pretrained(model_id)
         
@@ -17,12 +25,17 @@ class LLMEngine:
                 offload_buffers=torch.cuda.is_available(), 
                 dtype=torch.float16
                 )
+
+        # Record mode: every exchange is appended to a replayable transcript.
+        self.recorder = TranscriptRecorder(record_path) if record_path else None
     
     def generate(
             self, 
             messages: list[dict], 
             max_new_tokens: int
     )  -> str:
+
+        start = time.perf_counter()
     
         prompt = self.processor.apply_chat_template(
             messages,
@@ -34,12 +47,16 @@ class LLMEngine:
             text=prompt,
             return_tensors="pt"
         ).to(self.model.device)
+
+        prepared = time.perf_counter()
             
-        with torch.no_grad():
+        with self._torch.no_grad():
            output = self.model.generate(
            **inputs,
            max_new_tokens=max_new_tokens,
            )
+
+        generated = time.perf_counter()
     
         prompt_len = inputs["input_ids"].shape[-1]
         generated_tokens = output[0][prompt_len:]
@@ -48,8 +65,22 @@ class LLMEngine:
             generated_tokens,
             skip_special_tokens=True
         )
-        
-        
 
-        return llm_output
+        if self.recorder is not None:
+            end = time.perf_counter()
+            self.recorder.write({
+                "messages": messages,
+                "prompt": prompt,
+                "max_new_tokens": max_new_tokens,
+                "output": llm_output,
+                "prompt_tokens": int(prompt_len),
+                "generated_tokens": int(len(generated_tokens)),
+                "timings": {
+                    "prepare_s": round(prepared - start, 6),
+                    "generate_s": round(generated - prepared, 6),
+                    "decode_s": round(end - generated, 6),
+                    "total_s": round(end - start, 6),
+                },
+            })
 
+        return llm_output
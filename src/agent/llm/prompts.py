@@ -61,11 +61,15 @@ Rules:
 - dataset_info
   Arguments:
   {
-    "max_top_values": <int>
+    "max_top_values": <int>,
+    "approximate": <true or false>
   }
   Notes:
-  - Argument "max_top_values" is OPTIONAL
-  - Default value is 5
+  - All arguments are OPTIONAL
+  - Default max_top_values is 5
+  - "approximate" defaults to automatic: very large datasets get estimated n_unique and top_values
+  - Columns with estimates carry an "approximate" entry with their error bounds; pass false
+    only if exact distinct counts are essential to the question
 
 - basic_statistics
   Arguments:
@@ -79,12 +83,17 @@ Rules:
   Arguments:
   {
     "threshold": <float>,
-    "label": "<string or null>"
+    "label": "<string or null>",
+    "top_k": <int>
   }
   Notes:
   - All arguments are OPTIONAL
   - Default threshold is 0.2
   - Default label is null
+  - "top_k" limits the result to the k strongest pairs; default is all pairs above threshold
+  - Pairs are sorted by absolute correlation, strongest first
+  - With more than 100 numeric columns the full matrix is omitted ("matrix_omitted");
+    use "high_correlation_pairs" and "feature_summary" (strongest partner per feature) instead
 
 - plot_correlation_heatmap
   Arguments:
@@ -93,6 +102,52 @@ Rules:
   - The tool saves the generated correlation heatmap as an image file
   - The plot is automatically saved to a predefined output directory
 
+- distribution_summary
+  Arguments:
+  {
+    "columns": ["<numeric column>", "..."],
+    "percentiles": [<float between 0 and 100>, "..."],
+    "bins": <int>
+  }
+  Notes:
+  - All arguments are OPTIONAL
+  - Default columns: all numeric columns
+  - Default percentiles: [1, 5, 25, 50, 75, 95, 99]
+  - Default bins is 10 (maximum 100)
+  - Returns percentiles (keys like "p95") and an equal-width histogram per column
+  - "approximate": true marks values estimated from a sketch
+
+- run_sql
+  Arguments:
+  {
+    "query": "<one SQL SELECT statement>",
+    "max_rows": <int>
+  }
+  Notes:
+  - Use for filtered, grouped or aggregated questions the other tools cannot answer
+  - The dataset is the table "data"; quote column names with double quotes
+  - Only a single read-only SELECT (WITH ... SELECT allowed) is accepted
+  - Aggregate in SQL instead of selecting raw rows
+  - "max_rows" is OPTIONAL, default 50 (maximum 500); "truncated": true means rows were left out
+  - Not available in streaming or sample mode
+
+- group_aggregate
+  Arguments:
+  {
+    "by": ["<column>", "..."],
+    "columns": ["<numeric column>", "..."],
+    "percentiles": [<float between 0 and 100>, "..."],
+    "top_k": <int>
+  }
+  Notes:
+  - Use for questions like "mean of X per Y"; "by" is REQUIRED (one column name or a list)
+  - "columns", "percentiles" and "top_k" are OPTIONAL
+  - Default columns: up to 20 numeric columns; default percentiles: [25, 50, 75]
+  - Returns count, mean, std, min, percentiles (keys like "p50") and max per group for the
+    "top_k" largest groups (default 10, maximum 100); "truncated": true means groups were left out
+  - Rows with a missing key are not in any group ("rows_missing_key")
+  - Not available in streaming or sample mode
+
 Rules for ALL tools:
 - You MUST NOT invent or rename arguments
 - You MUST NOT pass extra arguments
@@ -113,5 +168,7 @@ Final rules:
 - You MUST NOT introduce new facts or numbers
 - You MUST NOT omit important findings
 - The answer must be complete and not end abruptly
+- If any tool output contains "approximate" or "ci95", its numbers are estimates
+  (from a sample or sketches): say so in the answer and give the "ci95" ranges where present
 """
 
@@ -0,0 +1,85 @@
+import json
+import time
+
+from pathlib import Path
+
+
+# Appends every engine exchange (messages, rendered prompt, output, timings)
+# to a JSONL transcript.
+class TranscriptRecorder:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, exchange: dict):
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(exchange) + "\n")
+
+
+# Splits a transcript into sessions. A session starts with an exchange whose
+# messages contain no assistant turn yet (the planning call of run_query).
+def load_transcript(path: str) -> list[list[dict]]:
+    sessions = []
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+
+            exchange = json.loads(line)
+            roles = [m.get("role") for m in exchange.get("messages", [])]
+
+            if not sessions or "assistant" not in roles:
+                sessions.append([])
+            sessions[-1].append(exchange)
+
+    return sessions
+
+
+# Returns the user query of a recorded session.
+def session_query(session: list[dict]) -> str:
+    for message in session[0]["messages"]:
+        if message.get("role") == "user":
+            return message["content"][0]["text"]
+
+    raise ValueError("Recorded session has no user message")
+
+
+# Drop-in replacement for LLMEngine that serves recorded outputs in order.
+# With reproduce_timings, each call sleeps for the recorded generation time.
+class ReplayEngine:
+    def __init__(
+            self,
+            exchanges: list[dict],
+            reproduce_timings: bool = False
+    ):
+        self.exchanges = exchanges
+        self.reproduce_timings = reproduce_timings
+        self.calls = 0
+        self.elapsed_s = 0.0
+
+    @classmethod
+    def from_file(cls, path: str, session: int = 0, **kwargs) -> "ReplayEngine":
+        return cls(load_transcript(path)[session], **kwargs)
+
+    def generate(
+            self,
+            messages: list[dict],
+            max_new_tokens: int
+    ) -> str:
+
+        if self.calls >= len(self.exchanges):
+            raise RuntimeError(
+                f"Replay transcript exhausted after {self.calls} calls"
+            )
+
+        start = time.perf_counter()
+        exchange = self.exchanges[self.calls]
+        self.calls += 1
+
+        if self.reproduce_timings:
+            time.sleep(exchange["timings"]["total_s"])
+
+        self.elapsed_s += time.perf_counter() - start
+
+        return exchange["output"]
@@ -2,15 +2,30 @@ import logging
 import os
 
 
-def setup_logger(verbose: bool = False) -> logging.Logger:
-    logging.basicConfig(
-        level=logging.INFO if verbose else logging.WARNING,
-        format="%(message)s",
-    )
-    
-    logger = logging.getLogger("agent")
- 
+# Logger of one session. Verbosity is per session, so it is decided here
+# rather than by the level of the shared "agent" logger; messages carry the
+# session name when one is given.
+class SessionLogger(logging.LoggerAdapter):
+    def __init__(self, verbose: bool = False, name: str | None = None):
+        super().__init__(logging.getLogger("agent"), {})
+        self.min_level = logging.INFO if verbose else logging.WARNING
+        self.session_name = name
+
+    def isEnabledFor(self, level: int) -> bool:
+        return level >= self.min_level
+
+    def process(self, msg, kwargs):
+        if self.session_name:
+            msg = f"[{self.session_name}] {msg}"
+        return msg, kwargs
+
+
+def setup_logger(verbose: bool = False, name: str | None = None) -> SessionLogger:
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger("agent").setLevel(logging.INFO)
+
+    logger = SessionLogger(verbose, name)
+
     logger.info("")
 
     return logger
-
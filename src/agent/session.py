@@ -0,0 +1,14 @@
+from dataclasses import dataclass, field
+
+from .llm import DataContext, LLMEngine, ReplayEngine
+from .logger import SessionLogger, setup_logger
+
+
+# State of one run_query call: its dataset, logger and, optionally, its own
+# engine. Sessions without an engine share the process-wide one, so many
+# sessions can run in threads against a single loaded model.
+@dataclass(eq=False)
+class Session:
+    data: DataContext = field(default_factory=DataContext)
+    logger: SessionLogger = field(default_factory=setup_logger)
+    engine: LLMEngine | ReplayEngine | None = None
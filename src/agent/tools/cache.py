@@ -0,0 +1,245 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pyarrow as pa
+
+from src.config import INCREMENTAL_DIR, INGEST_CACHE_DIR, INGEST_CACHE_MAX_BYTES, PROFILE_DIR
+
+
+# Bytes hashed at each of the sampled offsets of a source file.
+SAMPLE_BYTES = 64 * 1024
+SAMPLE_POINTS = 4
+
+# Files of a directory or glob dataset fingerprinted concurrently.
+FINGERPRINT_THREADS = 16
+
+
+_GLOB_CHARS = ("*", "?", "[")
+
+
+# Files of a dataset path, sorted: the file itself, the files under a
+# directory (recursively, skipping hidden files and markers such as _SUCCESS
+# and _temporary/ that Spark and Hadoop leave next to part files), or the
+# files matching a glob pattern (** matches nested directories).
+def dataset_files(path: str) -> list[str]:
+    if os.path.isfile(path):
+        return [path]
+
+    if os.path.isdir(path):
+        root = Path(path)
+        files = [
+            str(p) for p in root.rglob("*")
+            if p.is_file() and not any(
+                part.startswith((".", "_")) for part in p.relative_to(root).parts
+            )
+        ]
+    elif any(c in path for c in _GLOB_CHARS):
+        files = [p for p in glob.glob(path, recursive=True) if os.path.isfile(p)]
+    else:
+        raise FileNotFoundError(f"No such file or directory: {path}")
+
+    if not files:
+        raise ValueError(f"No files found in {path}")
+    return sorted(files)
+
+
+# Whether the path names several files (a directory or a glob pattern).
+def is_multi_file(path: str) -> bool:
+    return os.path.isdir(path) or (
+        not os.path.isfile(path) and any(c in path for c in _GLOB_CHARS)
+    )
+
+
+# Identifies a source file by resolved path, size, mtime and a hash of a few
+# evenly spaced samples of its content. Cheap even for multi-GB files.
+# A directory or glob is identified by the fingerprints of its files,
+# computed in parallel.
+def fingerprint(path: str) -> str:
+    if is_multi_file(path):
+        files = dataset_files(path)
+        with ThreadPoolExecutor(max_workers=min(len(files), FINGERPRINT_THREADS)) as pool:
+            parts = list(pool.map(fingerprint, files))
+
+        h = hashlib.blake2b(digest_size=16)
+        for file, part in zip(files, parts):
+            h.update(f"{file}|{part}".encode())
+        return h.hexdigest()
+
+    resolved = Path(path).resolve()
+    st = resolved.stat()
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{resolved}|{st.st_size}|{st.st_mtime_ns}".encode())
+
+    with open(resolved, "rb") as f:
+        step = max(st.st_size - SAMPLE_BYTES, 0) // max(SAMPLE_POINTS - 1, 1)
+        for i in range(SAMPLE_POINTS):
+            f.seek(i * step)
+            h.update(f.read(SAMPLE_BYTES))
+
+    return h.hexdigest()
+
+
+def _entry_paths(key: str) -> tuple[Path, Path]:
+    return INGEST_CACHE_DIR / f"{key}.arrow", INGEST_CACHE_DIR / f"{key}.json"
+
+
+# Memory-maps a cached table. The access time kept in the file mtime drives
+# LRU eviction. Returns None on a miss.
+def load_cached(key: str) -> pa.Table | None:
+    data_path, _ = _entry_paths(key)
+
+    try:
+        source = pa.memory_map(str(data_path))
+    except FileNotFoundError:
+        return None
+
+    os.utime(data_path)
+    return pa.ipc.open_file(source).read_all()
+
+
+# Writes a table to the cache as an uncompressed Arrow IPC file, then evicts
+# least recently used entries until the cache fits its size cap. file_rows
+# are the rows of each file of a directory or glob dataset.
+def store_cached(key: str, table: pa.Table, source_path: str, file_rows: list[int] | None = None):
+    INGEST_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    data_path, meta_path = _entry_paths(key)
+
+    tmp_path = data_path.with_suffix(f".tmp{os.getpid()}_{threading.get_ident()}")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, data_path)
+
+    meta_path.write_text(json.dumps({
+        "source": str(Path(source_path).resolve()),
+        "rows": table.num_rows,
+        "columns": table.num_columns,
+        "created": time.time(),
+        **({"file_rows": file_rows} if file_rows is not None else {}),
+    }))
+
+    evict(INGEST_CACHE_MAX_BYTES, keep=key)
+
+
+# Metadata stored with a cache entry, or None without one.
+def cached_meta(key: str) -> dict | None:
+    _, meta_path = _entry_paths(key)
+    try:
+        return json.loads(meta_path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _entries() -> list[dict]:
+    if not INGEST_CACHE_DIR.exists():
+        return []
+
+    entries = []
+    for data_path in INGEST_CACHE_DIR.glob("*.arrow"):
+        meta_path = data_path.with_suffix(".json")
+        try:
+            st = data_path.stat()
+            meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        except FileNotFoundError:
+            continue
+
+        entries.append({
+            "key": data_path.stem,
+            "bytes": st.st_size,
+            "last_used": st.st_mtime,
+            **meta,
+        })
+
+    return sorted(entries, key=lambda e: e["last_used"])
+
+
+def _remove(key: str):
+    for path in _entry_paths(key):
+        path.unlink(missing_ok=True)
+
+
+# Removes least recently used entries until the total size is within
+# max_bytes. The entry `keep` is never removed.
+def evict(max_bytes: int, keep: str | None = None) -> list[str]:
+    entries = _entries()
+    total = sum(e["bytes"] for e in entries)
+
+    evicted = []
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        if entry["key"] == keep:
+            continue
+
+        _remove(entry["key"])
+        total -= entry["bytes"]
+        evicted.append(entry["key"])
+
+    return evicted
+
+
+# Profile sidecars (see tools.profile) are small and kept next to the cache.
+def _profile_files() -> list[Path]:
+    if not PROFILE_DIR.exists():
+        return []
+    return list(PROFILE_DIR.glob("*.json"))
+
+
+# So are the states of incremental analyses (see tools.incremental), along
+# with pickled states left by earlier versions.
+def _incremental_files() -> list[Path]:
+    if not INCREMENTAL_DIR.exists():
+        return []
+    return list(INCREMENTAL_DIR.glob("*.npz")) + list(INCREMENTAL_DIR.glob("*.pkl"))
+
+
+def cache_info() -> dict:
+    entries = _entries()
+    profiles = _profile_files()
+    states = _incremental_files()
+
+    return {
+        "directory": str(INGEST_CACHE_DIR),
+        "max_bytes": INGEST_CACHE_MAX_BYTES,
+        "total_bytes": sum(e["bytes"] for e in entries),
+        "entries": entries[::-1],
+        "profiles": {
+            "directory": str(PROFILE_DIR),
+            "count": len(profiles),
+            "total_bytes": sum(p.stat().st_size for p in profiles),
+        },
+        "incremental": {
+            "directory": str(INCREMENTAL_DIR),
+            "count": len(states),
+            "total_bytes": sum(p.stat().st_size for p in states),
+        },
+    }
+
+
+def clear_cache() -> dict:
+    entries = _entries()
+    for entry in entries:
+        _remove(entry["key"])
+
+    profiles = _profile_files()
+    for path in profiles:
+        path.unlink(missing_ok=True)
+
+    states = _incremental_files()
+    for path in states:
+        path.unlink(missing_ok=True)
+
+    return {
+        "removed": len(entries),
+        "freed_bytes": sum(e["bytes"] for e in entries),
+        "profiles_removed": len(profiles),
+        "incremental_removed": len(states),
+    }
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.agent.llm.data_context import FrameSource, ParquetPartsSource, ParquetSource, TableSource
+
+
+# Strings become categoricals when at most this share of their non-null
+# values is distinct.
+CATEGORY_MAX_RATIO = 0.5
+
+# Date formats tried on string columns, in order. Day/month orders that are
+# ambiguous (01/02/2024) are not guessed.
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d", "%d.%m.%Y")
+
+# Leading values a string column must parse as dates before the whole
+# column is tried.
+DATE_PROBE_VALUES = 100
+
+_INT_TYPES = (pa.int8(), pa.int16(), pa.int32())
+_UINT_TYPES = (pa.uint8(), pa.uint16(), pa.uint32())
+
+
+def _smallest_int(column: pa.ChunkedArray) -> pa.DataType | None:
+    bounds = pc.min_max(column)
+    lo, hi = bounds["min"].as_py(), bounds["max"].as_py()
+    if lo is None:
+        return None
+
+    for candidate in _UINT_TYPES if lo >= 0 else _INT_TYPES:
+        if candidate.bit_width >= column.type.bit_width:
+            break
+        info = np.iinfo(candidate.to_pandas_dtype())
+        if info.min <= lo and hi <= info.max:
+            return candidate
+    return None
+
+
+# float64 values that float32 holds exactly (integral or short binary
+# fractions); anything else would change the statistics.
+def _float32_exact(column: pa.ChunkedArray) -> pa.ChunkedArray | None:
+    narrow = pc.cast(column, pa.float32(), safe=False)
+    back = pc.cast(narrow, pa.float64())
+    same = pc.or_(pc.equal(back, column), pc.and_(pc.is_nan(back), pc.is_nan(column)))
+    if pc.all(same, skip_nulls=True).as_py() is False:
+        return None
+    return narrow
+
+
+# Same text as pc.strftime(timestamps, format=fmt) for the DATE_FORMATS,
+# cut from the timestamps cast to strings, which is many times faster.
+def _format_dates(timestamps: pa.ChunkedArray, fmt: str) -> pa.ChunkedArray:
+    text = pc.cast(timestamps, pa.string())  # YYYY-MM-DD HH:MM:SS
+    if fmt == "%Y-%m-%d %H:%M:%S":
+        return text
+
+    def part(start, stop):
+        return pc.utf8_slice_codeunits(text, start, stop)
+
+    if fmt == "%d.%m.%Y":
+        return pc.binary_join_element_wise(part(8, 10), part(5, 7), part(0, 4), ".")
+    if fmt == "%Y/%m/%d":
+        return pc.replace_substring(part(0, 10), "-", "/")
+    return part(0, 10)
+
+
+# Timestamps of a string column in the first of DATE_FORMATS that every value
+# is written in exactly, so that formatting them back gives the original
+# strings and distinct strings stay distinct ("2021-01-01" and
+# "2021-01-01 00:00:00" in one column are left as strings).
+def _parse_dates(column: pa.ChunkedArray) -> pa.ChunkedArray | None:
+    probe = pc.drop_null(column.slice(0, DATE_PROBE_VALUES * 10))[:DATE_PROBE_VALUES]
+    if len(probe) == 0:
+        return None
+
+    for fmt in DATE_FORMATS:
+        try:
+            pc.strptime(probe, format=fmt, unit="s", error_is_null=False)
+            parsed = pc.strptime(column, format=fmt, unit="s", error_is_null=False)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+        if pc.all(pc.equal(_format_dates(parsed, fmt), column)).as_py() is not False:
+            return pc.cast(parsed, pa.timestamp("us"))
+    return None
+
+
+def _categorical(column: pa.ChunkedArray) -> pa.Array | None:
+    count = len(column) - column.null_count
+    if count == 0 or pc.count_distinct(column).as_py() > CATEGORY_MAX_RATIO * count:
+        return None
+
+    encoded = column.combine_chunks().dictionary_encode()
+    n_values = len(encoded.dictionary)
+    # Smallest index type: pandas uses it for the category codes.
+    for index_type in _INT_TYPES:
+        if n_values < 2 ** (index_type.bit_width - 1):
+            return pc.cast(encoded, pa.dictionary(index_type, encoded.type.value_type))
+    return encoded
+
+
+# Compacted form of one column, or None when it stays as it is: integers in
+# the smallest type holding their range, floats as float32 when lossless,
+# date strings as timestamps when they round-trip exactly and
+# low-cardinality strings as dictionaries (pandas categoricals). Values are
+# unchanged in every case.
+def compact_column(column: pa.ChunkedArray) -> pa.ChunkedArray | pa.Array | None:
+    data_type = column.type
+
+    if pa.types.is_integer(data_type):
+        target = _smallest_int(column)
+        return pc.cast(column, target) if target is not None else None
+    if pa.types.is_float64(data_type):
+        return _float32_exact(column)
+    if pa.types.is_string(data_type) or pa.types.is_large_string(data_type):
+        dates = _parse_dates(column)
+        return dates if dates is not None else _categorical(column)
+    return None
+
+
+# dtype pandas gives the column, taking pandas metadata into account.
+def _pandas_dtype(table: pa.Table, name: str) -> str:
+    return str(table.select([name]).slice(0, 0).to_pandas()[name].dtype)
+
+
+def _report(changes: dict, before: int, after: int) -> dict:
+    return {
+        "before_bytes": before,
+        "after_bytes": after,
+        "saved_pct": round((1 - after / before) * 100, 2) if before else 0.0,
+        "columns": changes,
+    }
+
+
+# Compacts every column of an Arrow table. The report has the total Arrow
+# bytes before and after, and per compacted column its old and new type and
+# bytes.
+def compact_table(table: pa.Table) -> tuple[pa.Table, dict]:
+    columns = []
+    changes = {}
+
+    for name, column in zip(table.column_names, table.columns):
+        compacted = compact_column(column)
+        if compacted is None or compacted.nbytes >= column.nbytes:
+            columns.append(column)
+            continue
+
+        columns.append(compacted)
+        changes[name] = {
+            "from": None,
+            "to": None,
+            "before_bytes": column.nbytes,
+            "after_bytes": compacted.nbytes,
+        }
+
+    compacted = pa.table(columns, names=table.column_names).replace_schema_metadata(
+        table.schema.metadata
+    )
+    for name, change in changes.items():
+        change["from"] = _pandas_dtype(table, name)
+        change["to"] = _pandas_dtype(compacted, name)
+
+    return compacted, _report(changes, table.nbytes, compacted.nbytes)
+
+
+# Same for a pandas frame, column by column through Arrow; columns without an
+# Arrow form (mixed objects) stay as they are. Bytes are pandas deep memory.
+def compact_frame(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    out = {}
+    changes = {}
+
+    for name, s in df.items():
+        out[name] = s
+        try:
+            column = pa.chunked_array([pa.array(s, from_pandas=True)])
+        except (pa.ArrowException, TypeError, ValueError):
+            continue
+
+        compacted = compact_column(column)
+        if compacted is None:
+            continue
+
+        series = compacted.to_pandas()
+        series.index = s.index
+        before = int(s.memory_usage(index=False, deep=True))
+        after = int(series.memory_usage(index=False, deep=True))
+        if after >= before:
+            continue
+
+        out[name] = series
+        changes[name] = {
+            "from": str(s.dtype),
+            "to": str(series.dtype),
+            "before_bytes": before,
+            "after_bytes": after,
+        }
+
+    compacted = pd.DataFrame(out, index=df.index)
+    return compacted, _report(
+        changes,
+        int(df.memory_usage(index=False, deep=True).sum()),
+        int(compacted.memory_usage(index=False, deep=True).sum()),
+    )
+
+
+# Compacted copy of a lazy source with its report. Parquet files are read
+# whole for it; the result is an in-memory table.
+def compact_source(
+        source: TableSource | ParquetSource | ParquetPartsSource | FrameSource
+) -> tuple[TableSource | FrameSource, dict]:
+    if isinstance(source, FrameSource):
+        df, report = compact_frame(source.df)
+        return FrameSource(df), report
+
+    if isinstance(source, (ParquetSource, ParquetPartsSource)):
+        table = source.read_table(source.columns)
+    else:
+        table = source.table
+
+    table, report = compact_table(table)
+    return TableSource(table), report
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+
+# Above this many numeric columns the dense matrix is not returned and
+# correlations are computed block by block, keeping only reported pairs.
+MATRIX_MAX_COLUMNS = 100
+
+# Columns per block; a block pair holds BLOCK_COLUMNS ** 2 float32 values.
+BLOCK_COLUMNS = 512
+
+
+# Column-standardized float32 copy of the data: zero mean, unit norm over
+# the non-missing values, so a correlation is a dot product. Missing values
+# become 0 and are tracked in `mask` (None when there are none).
+def _standardize(values: np.ndarray) -> tuple[np.ndarray, np.ndarray | None]:
+    missing = np.isnan(values)
+    has_missing = missing.any()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centered = values - np.nanmean(values, axis=0)
+        centered[missing] = 0.0
+        norms = np.sqrt((centered ** 2).sum(axis=0))
+        z = (centered / norms).astype(np.float32)
+
+    # Constant or empty columns have no defined correlation.
+    z[:, ~(norms > 0)] = np.nan
+
+    mask = (~missing).astype(np.float32) if has_missing else None
+    return z, mask
+
+
+# Correlations between two column blocks. Without missing values this is one
+# matrix product; otherwise every pair uses only the rows where both are
+# present (like DataFrame.corr), from five products over the block.
+def _block_corr(z, mask, a: slice, b: slice) -> np.ndarray:
+    za, zb = z[:, a], z[:, b]
+
+    if mask is None:
+        return za.T @ zb
+
+    ma, mb = mask[:, a], mask[:, b]
+    n = ma.T @ mb
+    sx, sy = za.T @ mb, ma.T @ zb
+    sxx, syy = (za * za).T @ mb, ma.T @ (zb * zb)
+    sxy = za.T @ zb
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        r = cov / np.sqrt((sxx - sx * sx / n) * (syy - sy * sy / n))
+
+    # Pairs with fewer than two joint rows or no joint variance.
+    r[(n < 2) | ~np.isfinite(r)] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+# Pairs with |r| >= threshold (the top_k strongest if given) and a summary per
+# feature, computed over column blocks in float32. Memory is the standardized
+# data plus one block pair and the kept pairs, never the full N x N matrix.
+def sparse_correlation(
+        num_df: pd.DataFrame,
+        threshold: float,
+        top_k: int | None = None,
+        block: int = BLOCK_COLUMNS
+) -> dict:
+
+    names = list(num_df.columns)
+    n = len(names)
+    z, mask = _standardize(num_df.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    rows = [np.empty(0, dtype=np.intp)]
+    cols = [np.empty(0, dtype=np.intp)]
+    values = [np.empty(0, dtype=np.float32)]
+    kept = 0
+
+    max_abs = np.full(n, np.nan)
+    partner = np.full(n, -1)
+    n_pairs = np.zeros(n, dtype=np.int64)
+
+    for start_a in range(0, n, block):
+        a = slice(start_a, min(start_a + block, n))
+
+        for start_b in range(start_a, n, block):
+            b = slice(start_b, min(start_b + block, n))
+            r = _block_corr(z, mask, a, b)
+            abs_r = np.abs(r)
+
+            if start_a == start_b:
+                # Upper triangle only: no self or mirrored pairs.
+                abs_r[np.tril_indices(len(abs_r))] = np.nan
+
+            # Strongest partner of every feature, from both sides of the block.
+            for axis, offset, other in ((1, start_a, start_b), (0, start_b, start_a)):
+                best = np.argmax(np.nan_to_num(abs_r, nan=-1.0), axis=axis)
+                best_abs = np.take_along_axis(
+                    abs_r, np.expand_dims(best, axis), axis
+                ).squeeze(axis)
+                idx = np.arange(offset, offset + len(best))
+                better = best_abs > np.nan_to_num(max_abs[idx], nan=-1.0)
+                max_abs[idx[better]] = best_abs[better]
+                partner[idx[better]] = best[better] + other
+
+            with np.errstate(invalid="ignore"):
+                i, j = np.nonzero(abs_r >= threshold)
+            np.add.at(n_pairs, i + start_a, 1)
+            np.add.at(n_pairs, j + start_b, 1)
+
+            rows.append(i + start_a)
+            cols.append(j + start_b)
+            values.append(r[i, j])
+            kept += len(i)
+
+            # With top_k, only the strongest top_k candidates are carried on.
+            if top_k is not None and kept > 2 * top_k:
+                rows, cols, values = _top(rows, cols, values, top_k)
+                kept = top_k
+
+    rows, cols, values = _top(rows, cols, values, top_k)
+
+    pairs = [
+        {
+            "feature_1": names[i],
+            "feature_2": names[j],
+            "correlation": round(float(v), 3)
+        }
+        for i, j, v in zip(rows[0], cols[0], values[0])
+    ]
+
+    summary = {
+        names[i]: {
+            "max_abs_corr": round(float(max_abs[i]), 3),
+            "strongest_partner": names[partner[i]],
+            "n_pairs_above_threshold": int(n_pairs[i]),
+        }
+        for i in range(n)
+        if n_pairs[i] > 0
+    }
+
+    return {
+        "high_correlation_pairs": pairs,
+        "feature_summary": summary,
+    }
+
+
+# Concatenates the kept pair chunks and orders them by |r|, strongest first,
+# keeping top_k of them when given.
+def _top(rows, cols, values, top_k):
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    values = np.concatenate(values)
+
+    order = np.argsort(-np.abs(values), kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+
+    return [rows[order]], [cols[order]], [values[order]]
@@ -0,0 +1,94 @@
+import numpy as np
+
+from src.agent.llm.data_context import DataContext
+
+from .sketches import KLLSketch, FixedHistogram
+
+
+DEFAULT_PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+
+DEFAULT_BINS = 10
+
+MAX_BINS = 100
+
+# Values fed to a sketch at a time, so sketches are built the same way a
+# chunked or multi-worker pass would build and merge them.
+CHUNK_VALUES = 1_000_000
+
+
+def _column_values(ctx: DataContext, col: str) -> np.ndarray:
+    values = ctx.select([col])[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+# Quantile sketch of a numeric column, built once per dataset and cached on
+# the data context. The streaming pass already holds one per column.
+def column_sketch(ctx: DataContext, col: str) -> KLLSketch:
+    if ctx.streaming:
+        return ctx.source.column_stats[col].quantiles
+
+    if col not in ctx.sketches:
+        values = _column_values(ctx, col)
+        sketch = KLLSketch()
+
+        for start in range(0, len(values), CHUNK_VALUES):
+            part = KLLSketch()
+            part.update(values[start:start + CHUNK_VALUES])
+            sketch.merge(part)
+
+        ctx.sketches[col] = sketch
+
+    return ctx.sketches[col]
+
+
+# Fixed-bin histogram over [min, max] of a column, cached per bin count.
+# Exact when the column is in memory or the streaming sketch still holds
+# every value, estimated from the sketch otherwise.
+def column_histogram(ctx: DataContext, col: str, bins: int) -> tuple[FixedHistogram, bool]:
+    sketch = column_sketch(ctx, col)
+
+    if ctx.streaming:
+        return FixedHistogram.from_sketch(sketch, bins), not sketch.is_exact
+
+    key = (col, bins)
+    if key not in ctx.histograms:
+        values = _column_values(ctx, col)
+        hist = FixedHistogram(sketch.min, sketch.max, bins)
+
+        for start in range(0, len(values), CHUNK_VALUES):
+            part = FixedHistogram(sketch.min, sketch.max, bins)
+            part.update(values[start:start + CHUNK_VALUES])
+            hist.merge(part)
+
+        ctx.histograms[key] = hist
+
+    return ctx.histograms[key], False
+
+
+def _percentile_key(p: float) -> str:
+    return f"p{p:g}"
+
+
+def summarize(ctx: DataContext, col: str, percentiles: list[float], bins: int) -> dict:
+    sketch = column_sketch(ctx, col)
+
+    if sketch.n == 0:
+        return {"count": 0}
+
+    values = sketch.quantiles(np.asarray(percentiles, dtype=np.float64) / 100)
+    hist, hist_approximate = column_histogram(ctx, col, bins)
+
+    return {
+        "count": sketch.n,
+        "min": round(sketch.min, 4),
+        "max": round(sketch.max, 4),
+        "percentiles": {
+            _percentile_key(p): round(float(v), 4)
+            for p, v in zip(percentiles, values)
+        },
+        "histogram": {
+            "edges": [round(float(e), 4) for e in hist.edges],
+            "counts": [int(c) for c in hist.counts],
+        },
+        "approximate": not sketch.is_exact or hist_approximate,
+    }
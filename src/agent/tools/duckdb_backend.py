@@ -0,0 +1,211 @@
+import math
+
+import numpy as np
+import pyarrow as pa
+
+from src.agent.llm.data_context import DataContext, ParquetSource, TableSource
+
+
+# Columns per aggregate query: a query over thousands of columns takes
+# longer to plan than to run.
+QUERY_COLUMNS = 200
+
+# Column pairs per correlation query.
+QUERY_PAIRS = 2_000
+
+_ROW_COLUMN = "file_row_number"
+
+
+# DuckDB scans Arrow tables (in memory or memory-mapped) and Parquet files
+# in place, multi-threaded and without converting columns to pandas.
+def supports(ctx: DataContext) -> bool:
+    return isinstance(ctx.source, (TableSource, ParquetSource))
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _schema(ctx: DataContext) -> pa.Schema:
+    if isinstance(ctx.source, TableSource):
+        return ctx.source.table.schema
+    return ctx.source.file.schema_arrow
+
+
+# "numeric" or "string" for the columns profiled here, by what pandas makes of
+# them: numeric Arrow types it converts to numpy dtypes, and strings it
+# converts to str. Anything else (bools, dates, dictionaries, extension dtypes
+# from pandas metadata) is left to the pandas backend.
+def column_kinds(ctx: DataContext, columns: list[str]) -> dict[str, str]:
+    schema = _schema(ctx)
+    dtypes = schema.empty_table().to_pandas().dtypes
+
+    kinds = {}
+    for col in columns:
+        data_type = schema.field(col).type
+        dtype = str(dtypes[col]) if col in dtypes.index else None
+
+        if pa.types.is_integer(data_type) or (
+                pa.types.is_floating(data_type) and not pa.types.is_float16(data_type)
+        ):
+            if dtype == np.dtype(data_type.to_pandas_dtype()).name:
+                kinds[col] = "numeric"
+        elif pa.types.is_string(data_type) or pa.types.is_large_string(data_type):
+            if dtype == "str" and col != _ROW_COLUMN:
+                kinds[col] = "string"
+
+    return kinds
+
+
+class _Scan:
+    def __init__(self, ctx: DataContext, row_numbers: bool = False):
+        try:
+            import duckdb
+        except ImportError:
+            raise RuntimeError("The duckdb backend needs the duckdb package (pip install duckdb)")
+
+        self.con = duckdb.connect()
+
+        if isinstance(ctx.source, TableSource):
+            table = ctx.source.table
+            if row_numbers:
+                table = table.append_column(
+                    _ROW_COLUMN, pa.array(np.arange(table.num_rows))
+                )
+            self.con.register("dataset", table)
+            self.relation = "dataset"
+        else:
+            path = str(ctx.path).replace("'", "''")
+            self.relation = (
+                f"read_parquet('{path}', file_row_number = {str(row_numbers).lower()})"
+            )
+
+    def one(self, exprs: list[str]) -> tuple:
+        return self.con.execute(f"SELECT {', '.join(exprs)} FROM {self.relation}").fetchone()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.con.close()
+
+
+# Values as pandas sees them: float64, with NaN missing like null.
+def _as_double(col: str) -> str:
+    return f"NULLIF(CAST({_quote(col)} AS DOUBLE), 'NaN'::DOUBLE)"
+
+
+def _float(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+# Magnitude from which a mean summed in another order than pandas sums it is
+# likely to differ once rounded for output.
+SUMMATION_LIMIT = 2.0 ** 26
+
+
+# Profile fields of numeric columns, as _numeric_profiles computes them.
+# Quartiles use the same linear interpolation as numpy and match bit for bit;
+# the mean is summed with compensation and std in another order, so both may
+# differ from pandas in the last bits. Columns with infinite values (whose
+# quartiles numpy interpolates to NaN) or values reaching SUMMATION_LIMIT
+# are left out, for the pandas backend to profile; their sums are filtered
+# out of the query, where they would overflow.
+def numeric_profiles(ctx: DataContext, columns: list[str]) -> dict[str, dict]:
+    schema = _schema(ctx)
+    n_rows = ctx.n_rows
+    profiles = {}
+
+    with _Scan(ctx) as scan:
+        for start in range(0, len(columns), QUERY_COLUMNS):
+            block = columns[start:start + QUERY_COLUMNS]
+            exprs = []
+            for col in block:
+                x = _as_double(col)
+                summed = f"FILTER (WHERE abs({x}) < {SUMMATION_LIMIT!r})"
+                exprs += [
+                    f"count({x})", f"fsum({x}) {summed}", f"stddev_samp({x}) {summed}",
+                    f"min({x})", f"quantile_cont({x}, [0.25, 0.5, 0.75])", f"max({x})",
+                    f"count(DISTINCT {x})",
+                ]
+            row = scan.one(exprs)
+
+            for i, col in enumerate(block):
+                count, total, std, lo, quartiles, hi, n_unique = row[7 * i:7 * i + 7]
+                if count and max(-lo, hi) >= SUMMATION_LIMIT:
+                    continue
+                quartiles = quartiles or [None] * 3
+                data_type = schema.field(col).type
+
+                # pandas turns integers with nulls into float64.
+                dtype = np.dtype(data_type.to_pandas_dtype()).name
+                if pa.types.is_integer(data_type) and count < n_rows:
+                    dtype = "float64"
+
+                profiles[col] = {
+                    "dtype": dtype,
+                    "n_missing": n_rows - count,
+                    "n_unique": n_unique,
+                    "stats": {
+                        "count": count,
+                        "mean": total / count if count else math.nan,
+                        "std": _float(std),
+                        "min": _float(lo),
+                        "25%": _float(quartiles[0]),
+                        "50%": _float(quartiles[1]),
+                        "75%": _float(quartiles[2]),
+                        "max": _float(hi),
+                    },
+                }
+
+    return profiles
+
+
+# Profile fields of string columns, as _profile_other computes them: top
+# values by descending count, ties in order of first appearance. One
+# aggregation per column gives the counts, distinct count and missing count.
+def string_profiles(ctx: DataContext, columns: list[str], k: int) -> dict[str, dict]:
+    n_rows = ctx.n_rows
+    profiles = {}
+
+    with _Scan(ctx, row_numbers=True) as scan:
+        for col in columns:
+            top = scan.con.execute(
+                f"SELECT value, n, count(*) OVER (), sum(n) OVER () FROM ("
+                f"  SELECT {_quote(col)} AS value, count(*) AS n, min({_ROW_COLUMN}) AS first"
+                f"  FROM {scan.relation} WHERE {_quote(col)} IS NOT NULL"
+                f"  GROUP BY {_quote(col)}"
+                f") ORDER BY n DESC, first LIMIT {int(k)}"
+            ).fetchall()
+
+            n_unique, count = (top[0][2], int(top[0][3])) if top else (0, 0)
+            profiles[col] = {
+                "dtype": "str",
+                "n_missing": n_rows - count,
+                "n_unique": n_unique,
+                "top_values": [(value, n) for value, n, _, _ in top],
+            }
+
+    return profiles
+
+
+# Pearson correlation matrix of numeric columns over the rows where both
+# values are finite, like DataFrame.corr.
+def correlation(ctx: DataContext, columns: list[str]) -> np.ndarray:
+    n = len(columns)
+    matrix = np.full((n, n), np.nan)
+    pairs = [(i, j) for i in range(n) for j in range(i, n)]
+
+    with _Scan(ctx) as scan:
+        for start in range(0, len(pairs), QUERY_PAIRS):
+            block = pairs[start:start + QUERY_PAIRS]
+            row = scan.one([
+                f"corr({x}, {y}) FILTER (WHERE isfinite({x}) AND isfinite({y}))"
+                for x, y in (
+                    (_as_double(columns[i]), _as_double(columns[j])) for i, j in block
+                )
+            ])
+            for (i, j), value in zip(block, row):
+                matrix[i, j] = matrix[j, i] = _float(value)
+
+    return matrix
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from src.agent.llm.data_context import DataContext
+
+from .distribution import _percentile_key
+
+
+DEFAULT_PERCENTILES = [25, 50, 75]
+
+DEFAULT_TOP_K = 10
+
+MAX_TOP_K = 100
+
+# Value columns aggregated when none are given; wider tables report the rest
+# as omitted.
+DEFAULT_MAX_COLUMNS = 20
+
+# Combined key codes are renumbered before the code space outgrows int64.
+_MAX_CODE_SPACE = 2 ** 62
+
+
+# Integer code per row of the key columns together (-1 where any key is
+# missing), numbered in order of first appearance, with the per-column codes
+# and distinct values to label groups by. Each column is factorized on its
+# own; codes are combined in mixed radix and renumbered whenever the
+# product of cardinalities would overflow.
+def group_codes(keys: pd.DataFrame) -> tuple[np.ndarray, list[np.ndarray], list]:
+    column_codes = []
+    uniques = []
+    combined = None
+    space = 1
+    missing = np.zeros(len(keys), dtype=bool)
+
+    for col in keys.columns:
+        codes, values = pd.factorize(keys[col], use_na_sentinel=True)
+        codes = codes.astype(np.int64, copy=False)
+        column_codes.append(codes)
+        uniques.append(values)
+        missing |= codes < 0
+
+        size = max(len(values), 1)
+        if combined is None:
+            combined = codes.copy()
+        else:
+            if space * size >= _MAX_CODE_SPACE:
+                combined, renumbered = pd.factorize(combined)
+                space = len(renumbered)
+            combined = combined * size + codes
+        space *= size
+
+    dense = np.full(len(keys), -1, dtype=np.int64)
+    dense[~missing], _ = pd.factorize(combined[~missing])
+    return dense, column_codes, uniques
+
+
+# count, mean, std (ddof 1), min, percentiles (linear interpolation, as
+# numpy and pandas compute them) and max of each group, given the values
+# ordered by group and the group boundaries. Each group's run is sorted on
+# its own, which drops its NaN and gives min, max and percentiles.
+def _aggregate_column(values: np.ndarray, bounds: np.ndarray, percentiles: list[float]) -> list[dict]:
+    results = []
+
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        run = np.sort(values[start:end])
+        run = run[:np.searchsorted(run, np.nan)]  # NaN sorts last
+        n = len(run)
+        if n == 0:
+            results.append({"count": 0})
+            continue
+
+        stats = {
+            "count": n,
+            "mean": round(float(run.mean()), 4),
+            "std": round(float(run.std(ddof=1)), 4) if n > 1 else None,
+            "min": round(float(run[0]), 4),
+        }
+        for p, value in zip(percentiles, np.percentile(run, percentiles)):
+            stats[_percentile_key(p)] = round(float(value), 4)
+        stats["max"] = round(float(run[-1]), 4)
+        results.append(stats)
+
+    return results
+
+
+def _label(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat(sep=" ") if value != value.normalize() else value.date().isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+# Per-group statistics of `columns` grouped by the `by` columns. Group
+# sizes come from one bincount over the integer group codes; only the rows
+# of the top_k largest groups (ties in order of first appearance) are then
+# aggregated. Rows with a missing key are left out, as pandas does.
+def aggregate(
+        ctx: DataContext,
+        by: list[str],
+        columns: list[str],
+        percentiles: list[float],
+        top_k: int
+) -> dict:
+    frame = ctx.select(by + [c for c in columns if c not in by])
+    codes, column_codes, uniques = group_codes(frame[by])
+
+    keyed = codes >= 0
+    sizes = np.bincount(codes[keyed])
+    n_groups = len(sizes)
+    top = np.argsort(-sizes, kind="stable")[:top_k]
+    k = len(top)
+
+    rank = np.full(n_groups, -1, dtype=np.int64)
+    rank[top] = np.arange(k)
+    rows = np.flatnonzero(keyed)
+    rows = rows[rank[codes[rows]] >= 0]
+    # Rows of the shown groups in group order, in row order within each; with
+    # at most MAX_TOP_K groups the ranks fit a small integer type, which numpy
+    # radix-sorts.
+    ranks = rank[codes[rows]].astype(np.min_scalar_type(k))
+    rows = rows[np.argsort(ranks, kind="stable")]
+    bounds = np.concatenate(([0], np.cumsum(sizes[top])))
+    first_rows = rows[bounds[:-1]]
+
+    aggregated = {
+        col: _aggregate_column(
+            frame[col].to_numpy(dtype=np.float64, na_value=np.nan)[rows], bounds, percentiles
+        )
+        for col in columns
+    }
+
+    return {
+        "by": by,
+        "n_groups": n_groups,
+        "rows_missing_key": int(len(codes) - keyed.sum()),
+        "groups": [
+            {
+                "key": {
+                    col: _label(values[col_codes[first_rows[g]]])
+                    for col, col_codes, values in zip(by, column_codes, uniques)
+                },
+                "size": int(sizes[top[g]]),
+                "stats": {col: aggregated[col][g] for col in columns},
+            }
+            for g in range(k)
+        ],
+        "truncated": n_groups > k,
+    }
@@ -0,0 +1,301 @@
+import hashlib
+import json
+import os
+import threading
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.config import INCREMENTAL_DIR
+
+from .cache import SAMPLE_BYTES
+from .loaders import detect_compression, detect_format
+from .sketches import CoMoments, DistinctCounter, KLLSketch, MisraGries
+from .streaming import StreamStats, extend_stats, stream_stats
+
+
+# Bump whenever the stored StreamStats change shape; states of other
+# versions are ignored and the file is analysed from the start.
+STATE_VERSION = 2
+
+FORMATS = ("csv", "tsv", "jsonl")
+
+
+# What is remembered of the last analysed version of a file: how far it was
+# read, a signature of the bytes before that offset, and the mergeable
+# statistics of those rows.
+@dataclass
+class IncrementalState:
+    version: int
+    source: str
+    offset: int
+    rows: int
+    signature: str
+    ends_with_newline: bool
+    stats: StreamStats
+
+
+def _state_path(path: str) -> Path:
+    resolved = str(Path(path).resolve())
+    return INCREMENTAL_DIR / f"{hashlib.blake2b(resolved.encode(), digest_size=16).hexdigest()}.npz"
+
+
+# Hash of the first and last SAMPLE_BYTES before `offset`. A file that was
+# only appended to still has the same bytes there; a rewritten one almost
+# never does.
+def _signature(path: str, offset: int) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(offset).encode())
+
+    with open(path, "rb") as f:
+        h.update(f.read(min(SAMPLE_BYTES, offset)))
+        f.seek(max(offset - SAMPLE_BYTES, 0))
+        h.update(f.read(min(SAMPLE_BYTES, offset)))
+
+    return h.hexdigest()
+
+
+def _byte_at(path: str, offset: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(1)
+
+
+# Arrow data (schemas, head rows, the distinct values of exact counters and
+# heavy-hitter keys) stored as IPC stream bytes in a uint8 array.
+def _ipc_bytes(table: pa.Table) -> np.ndarray:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return np.frombuffer(sink.getvalue(), dtype=np.uint8)
+
+
+def _ipc_table(data: np.ndarray) -> pa.Table:
+    return pa.ipc.open_stream(pa.py_buffer(data.tobytes())).read_all()
+
+
+def _values_bytes(values) -> np.ndarray:
+    return _ipc_bytes(pa.table({"values": pa.array(list(values))}))
+
+
+def _values(data: np.ndarray) -> list:
+    return _ipc_table(data).column("values").to_pylist()
+
+
+# JSON fields of the statistics, with every array stored in `arrays` under
+# the key the fields name.
+def _stats_fields(stats: StreamStats, arrays: dict) -> dict:
+    def put(name: str, array: np.ndarray) -> str:
+        arrays[name] = array
+        return name
+
+    arrays["schema"] = _ipc_bytes(stats.schema.empty_table())
+    arrays["head"] = _ipc_bytes(pa.Table.from_pandas(stats.head, preserve_index=False))
+    columns = []
+
+    for i, s in enumerate(stats.column_stats.values()):
+        column = {"missing": s.missing, "nulls": s.nulls}
+        if s.moments is not None:
+            m = s.moments
+            column["moments"] = [m.count, m.mean, m.m2, m.min, m.max]
+        if s.quantiles is not None:
+            q = s.quantiles
+            column["quantiles"] = {
+                "k": q.k, "exact_limit": q.exact_limit, "n": q.n, "min": q.min, "max": q.max,
+                "levels": [put(f"c{i}_level{h}", items) for h, items in enumerate(q.levels)],
+                "rng": q._rng.bit_generator.state,
+            }
+        if s.distinct is not None:
+            d = s.distinct
+            column["distinct"] = {
+                "exact_limit": d.exact_limit,
+                "exact": None if d.exact is None else put(f"c{i}_exact", _values_bytes(d.exact)),
+                "p": d.hll.p,
+                "registers": put(f"c{i}_registers", d.hll.registers),
+            }
+        if s.top is not None:
+            t = s.top
+            column["top"] = {
+                "capacity": t.capacity, "n": t.n, "error": t.error,
+                "values": put(f"c{i}_top_values", _values_bytes(t.counts.index)),
+                "counts": put(f"c{i}_top_counts", t.counts.to_numpy(dtype=np.int64)),
+            }
+        columns.append(column)
+
+    comoments = None
+    if stats.comoments is not None and stats.comoments.shift is not None:
+        c = stats.comoments
+        comoments = {
+            name: put(f"comoments_{name}", getattr(c, name))
+            for name in ("shift", "n", "sx", "sxx", "sxy")
+        }
+
+    return {
+        "num_rows": stats.num_rows,
+        "batches": stats.batches,
+        "columns": columns,
+        "comoments": comoments,
+    }
+
+
+def _stats_from_fields(fields: dict, arrays) -> StreamStats:
+    stats = StreamStats(_ipc_table(arrays["schema"]).schema)
+    stats.num_rows = fields["num_rows"]
+    stats.batches = fields["batches"]
+    stats.head = _ipc_table(arrays["head"]).to_pandas()
+
+    for s, column in zip(stats.column_stats.values(), fields["columns"]):
+        s.missing, s.nulls = column["missing"], column["nulls"]
+        if "moments" in column:
+            m = s.moments
+            m.count, m.mean, m.m2, m.min, m.max = column["moments"]
+        if "quantiles" in column:
+            q = column["quantiles"]
+            s.quantiles = KLLSketch(q["k"], q["exact_limit"])
+            s.quantiles.n, s.quantiles.min, s.quantiles.max = q["n"], q["min"], q["max"]
+            s.quantiles.levels = [arrays[name] for name in q["levels"]]
+            s.quantiles._rng.bit_generator.state = q["rng"]
+        if "distinct" in column:
+            d = column["distinct"]
+            s.distinct = DistinctCounter(d["exact_limit"], d["p"])
+            s.distinct.exact = None if d["exact"] is None else set(_values(arrays[d["exact"]]))
+            s.distinct.hll.registers = arrays[d["registers"]]
+        if "top" in column:
+            t = column["top"]
+            s.top = MisraGries(t["capacity"])
+            s.top.n, s.top.error = t["n"], t["error"]
+            s.top.counts = pd.Series(
+                arrays[t["counts"]], index=pd.Index(_values(arrays[t["values"]])), dtype=np.int64
+            )
+
+    if fields["comoments"] is not None:
+        stats.comoments = CoMoments(len(stats.numeric_columns))
+        for name, key in fields["comoments"].items():
+            setattr(stats.comoments, name, arrays[key])
+
+    return stats
+
+
+# The state is stored as data only: a .npz archive of numpy arrays, read
+# without allow_pickle, with the scalar fields as JSON in its "state" entry.
+def load_state(path: str) -> IncrementalState | None:
+    try:
+        with np.load(_state_path(path), allow_pickle=False) as archive:
+            arrays = {name: archive[name] for name in archive.files}
+        fields = json.loads(str(arrays.pop("state")))
+        if fields.get("version") != STATE_VERSION:
+            return None
+
+        return IncrementalState(
+            version=fields["version"],
+            source=fields["source"],
+            offset=fields["offset"],
+            rows=fields["rows"],
+            signature=fields["signature"],
+            ends_with_newline=fields["ends_with_newline"],
+            stats=_stats_from_fields(fields["stats"], arrays),
+        )
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError, pa.ArrowException):  # unreadable or foreign file
+        return None
+
+
+# Written whole to a temporary file and renamed, like profile sidecars.
+def save_state(state: IncrementalState):
+    INCREMENTAL_DIR.mkdir(parents=True, exist_ok=True)
+    path = _state_path(state.source)
+    tmp_path = path.with_suffix(f".tmp{os.getpid()}_{threading.get_ident()}")
+
+    arrays = {}
+    fields = {
+        "version": state.version,
+        "source": state.source,
+        "offset": state.offset,
+        "rows": state.rows,
+        "signature": state.signature,
+        "ends_with_newline": state.ends_with_newline,
+        "stats": _stats_fields(state.stats, arrays),
+    }
+    with open(tmp_path, "wb") as f:
+        np.savez(f, state=np.array(json.dumps(fields)), **arrays)
+    os.replace(tmp_path, path)
+
+
+# Why the remembered state cannot be extended to the file as it is now, or
+# None when the file only grew (or is unchanged) since.
+def _mismatch(path: str, state: IncrementalState, size: int) -> str | None:
+    if size < state.offset:
+        return "file shrank"
+    if _signature(path, state.offset) != state.signature:
+        return "file rewritten"
+    if size > state.offset and not state.ends_with_newline and _byte_at(path, state.offset) not in (b"\n", b"\r"):
+        return "last row extended"
+    return None
+
+
+# Statistics of an append-only CSV, TSV or JSONL file. The first analysis
+# reads it whole; later ones parse only the bytes appended since and merge
+# their rows into the remembered statistics, so the time taken follows the
+# size of the new data. Files rewritten in between, or whose new rows do not
+# fit the column types seen so far, are analysed from the start again.
+# Returns the statistics and a report of what was read.
+def incremental_stats(
+        path: str,
+        memory_limit_mb: float,
+        progress: bool | None = None
+) -> tuple[StreamStats, dict]:
+
+    fmt = detect_format(path)
+    if fmt not in FORMATS or detect_compression(path) is not None:
+        raise ValueError("Incremental analysis needs an uncompressed CSV, TSV or JSONL file")
+
+    size = Path(path).stat().st_size
+    state = load_state(path)
+    reason = "no previous state" if state is None else _mismatch(path, state, size)
+
+    stats = None
+    start = 0
+    if reason is None:
+        start = state.offset
+        stats = state.stats
+        if size > start:
+            try:
+                extend_stats(stats, path, start, size, memory_limit_mb, progress)
+            except pa.ArrowInvalid as e:
+                reason = f"new rows do not fit the column types ({e})"
+                stats = None
+                start = 0
+
+    previous_rows = state.rows if reason is None else 0
+    if stats is None:
+        stats = stream_stats(path, memory_limit_mb, progress, end=size)
+
+    if size > start or reason is not None:
+        save_state(IncrementalState(
+            version=STATE_VERSION,
+            source=path,
+            offset=size,
+            rows=stats.num_rows,
+            signature=_signature(path, size),
+            ends_with_newline=size > 0 and _byte_at(path, size - 1) in (b"\n", b"\r"),
+            stats=stats,
+        ))
+
+    if reason is not None:
+        mode = "full"
+    else:
+        mode = "append" if size > start else "unchanged"
+
+    return stats, {
+        "mode": mode,
+        **({"reason": reason} if reason is not None else {}),
+        "offset": start,
+        "parsed_bytes": size - start,
+        "previous_rows": previous_rows,
+        "new_rows": stats.num_rows - previous_rows,
+    }
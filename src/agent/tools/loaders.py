@@ -0,0 +1,666 @@
+import itertools
+import json
+import lzma
+import os
+import re
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from pyarrow import json as pa_json
+from pyarrow import parquet as pq
+
+from src.agent.llm.data_context import TableSource, ParquetPartsSource, ParquetSource, FrameSource
+
+from .cache import cached_meta, dataset_files, fingerprint, is_multi_file, load_cached, store_cached
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+FORMATS = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".xlsx": "excel",
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".pkl": "pickle",
+}
+
+# Files at least this large show a tqdm progress bar while loading.
+PROGRESS_MIN_BYTES = 64 * 1024 ** 2
+
+# Same strings pandas.read_csv treats as missing by default.
+CSV_NULL_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+]
+
+
+# Compressed inputs are recognized by a compression suffix after the format
+# one (data.csv.gz) or by their magic bytes, and decompressed while read.
+COMPRESSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+    ".bz2": "bz2",
+    ".xz": "xz",
+}
+
+_MAGIC_BYTES = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"\xfd7zXZ\x00", "xz"),
+)
+
+
+# Format of a file, or of the files of a directory or glob, which must all
+# have the same one.
+def detect_format(path: str) -> str:
+    if is_multi_file(path):
+        formats = {_file_format(f) for f in dataset_files(path)}
+        if len(formats) > 1:
+            raise ValueError(f"Files of different formats in {path}: {', '.join(sorted(formats))}")
+        return formats.pop()
+
+    return _file_format(path)
+
+
+def _file_format(path: str) -> str:
+    ext = Path(path).suffix.lower()
+    compressed = ext in COMPRESSIONS
+    if compressed:
+        ext = Path(Path(path).stem).suffix.lower()
+
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported format: {ext or Path(path).name}")
+
+    fmt = FORMATS[ext]
+    if compressed and fmt in ("parquet", "excel"):
+        raise ValueError(f"Compressed {fmt} files are not supported: {fmt} is compressed internally")
+
+    return fmt
+
+
+# Short name of a dataset for file names and titles: the file stem, the
+# directory name, or that of the directory a glob pattern starts in.
+def dataset_name(path: str) -> str:
+    if os.path.isdir(path):
+        return Path(path).resolve().name
+    if is_multi_file(path):
+        parts = Path(path).parts
+        fixed = next(i for i, part in enumerate(parts) if any(c in part for c in "*?["))
+        return Path(*parts[:fixed]).resolve().name if fixed else Path.cwd().name
+    return Path(path).stem
+
+
+# Compression codec of the file ("gzip", "zstd", "bz2", "xz") or None.
+def detect_compression(path: str) -> str | None:
+    ext = Path(path).suffix.lower()
+    if ext in COMPRESSIONS:
+        return COMPRESSIONS[ext]
+
+    try:
+        with open(path, "rb") as f:
+            head = f.read(6)
+    except OSError:
+        return None
+
+    for magic, codec in _MAGIC_BYTES:
+        if head.startswith(magic):
+            return codec
+    # "BZh" plus the block size digit.
+    if head[:3] == b"BZh" and head[3:4].isdigit():
+        return "bz2"
+    return None
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+
+    # ru_maxrss is reported in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Binary file whose reads advance a tqdm progress bar.
+class _ProgressFile:
+    def __init__(self, path: str, size: int):
+        from tqdm import tqdm
+
+        self._file = open(path, "rb")
+        self._bar = tqdm(
+            total=size,
+            desc=f"Loading {Path(path).name}",
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+        )
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._bar.update(len(data))
+        return data
+
+    def close(self):
+        self._bar.close()
+        self._file.close()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+# The bytes [start, end) of an open binary file, read as a file of their own.
+class _RangeFile:
+    def __init__(self, file, start: int, end: int):
+        self._file = file
+        self._file.seek(start)
+        self._left = end - start
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self._left:
+            size = self._left
+        data = self._file.read(size)
+        self._left -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+# Opens the file for an Arrow reader: the path itself, or a progress-
+# reporting file object when the file is large enough for the load to take
+# noticeable time. Compressed files are decompressed as a stream in front of
+# the reader; Arrow pulls from it on its read-ahead thread, so decompression
+# overlaps the multi-threaded parse and nothing is written to disk.
+# With byte_range, only those bytes of an uncompressed file are read.
+@contextmanager
+def _open_source(
+        path: str,
+        size: int,
+        progress: bool | None,
+        byte_range: tuple[int, int] | None = None
+):
+    if progress is None:
+        progress = size >= PROGRESS_MIN_BYTES
+
+    compression = detect_compression(path)
+    raw = _ProgressFile(path, size) if progress else None
+
+    if byte_range is not None:
+        if compression is not None:
+            raise ValueError("Byte ranges of compressed files cannot be read")
+        source = _RangeFile(raw or open(path, "rb"), *byte_range)
+    elif compression is None:
+        source = raw or path
+    elif compression == "xz":
+        # No xz codec in Arrow; lzma releases the GIL while decompressing.
+        source = lzma.open(raw or open(path, "rb"))
+    else:
+        source = pa.CompressedInputStream(raw or pa.OSFile(path), compression)
+
+    try:
+        yield source
+    finally:
+        if not isinstance(source, str):
+            source.close()
+        if raw is not None:
+            raw.close()
+
+
+# Reader options for a CSV/TSV file. The header is read up front and passed
+# as column names (skipping the header row) renamed as pandas.read_csv names
+# them, since Arrow keeps empty and repeated names as they are.
+def _csv_options(path: str, delimiter: str, block_size: int | None = None):
+    read_options = pa_csv.ReadOptions(use_threads=True)
+    parse_options = pa_csv.ParseOptions(delimiter=delimiter)
+    convert_options = pa_csv.ConvertOptions(
+        null_values=CSV_NULL_VALUES,
+        strings_can_be_null=True,
+    )
+
+    header = _csv_schema(path, read_options, parse_options, convert_options).names
+    read_options.column_names = _pandas_names(header)
+    read_options.skip_rows = 1
+    if block_size is not None:
+        read_options.block_size = block_size
+    return read_options, parse_options, convert_options
+
+
+# Column names as pandas.read_csv gives them: ".1", ".2", ... appended to
+# repeated names, skipping suffixed names the header already has, then
+# "Unnamed: <position>" for empty names, renamed the same way.
+def _pandas_names(header: list[str]) -> list[str]:
+    names = list(header)
+    counts = {}
+    named = [i for i, name in enumerate(header) if name]
+    unnamed = [i for i, name in enumerate(header) if not name]
+
+    for i in named + unnamed:
+        original = names[i] or f"Unnamed: {i}"
+        name = original
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in names else counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+
+    return names
+
+
+def _csv_schema(path: str, read_options, parse_options, convert_options) -> pa.Schema:
+    with _open_source(path, 0, False) as source:
+        reader = pa_csv.open_csv(
+            source,
+            read_options=read_options,
+            parse_options=parse_options,
+            convert_options=convert_options,
+        )
+        schema = reader.schema
+        reader.close()
+    return schema
+
+
+# Column type overrides derived from the schema Arrow infers on the first
+# block. Arrow infers dates and timestamps from CSV text, pandas.read_csv
+# does not, so such columns are read back as strings to keep tool outputs
+# identical.
+def _csv_overrides(path: str, read_options, parse_options, convert_options) -> dict:
+    return {
+        field.name: pa.string()
+        for field in _csv_schema(path, read_options, parse_options, convert_options)
+        if pa.types.is_temporal(field.type)
+    }
+
+
+# Multi-threaded CSV/TSV read into an Arrow table.
+def read_csv_table(path: str, delimiter: str = ",", progress: bool | None = None) -> pa.Table:
+    read_options, parse_options, convert_options = _csv_options(path, delimiter)
+
+    overrides = _csv_overrides(path, read_options, parse_options, convert_options)
+    if overrides:
+        convert_options.column_types = overrides
+
+    with _open_source(path, Path(path).stat().st_size, progress) as source:
+        return pa_csv.read_csv(
+            source,
+            read_options=read_options,
+            parse_options=parse_options,
+            convert_options=convert_options,
+        )
+
+
+# Yields the dataset as record batches of roughly block_bytes of input each,
+# so memory stays bounded regardless of file size. Excel, JSON arrays and
+# pickles have no incremental reader and are loaded whole, then split.
+# With byte_range, CSV, TSV and JSONL files are read from and up to those
+# byte offsets only. A range starting past the CSV header needs the schema
+# of the rows before it; values that do not fit it raise ArrowInvalid.
+# column_types override the types Arrow infers for those CSV columns.
+def iter_batches(
+        path: str,
+        block_bytes: int,
+        progress: bool | None = None,
+        byte_range: tuple[int, int] | None = None,
+        schema: pa.Schema | None = None,
+        column_types: dict[str, pa.DataType] | None = None
+) -> Iterator[pa.RecordBatch]:
+
+    fmt = detect_format(path)
+    size = Path(path).stat().st_size
+    if byte_range is not None:
+        if fmt not in ("csv", "tsv", "jsonl"):
+            raise ValueError(f"Byte ranges of {fmt} files cannot be read")
+        size = byte_range[1] - byte_range[0]
+
+    if fmt in ("csv", "tsv"):
+        options = _csv_options(path, "," if fmt == "csv" else "\t", block_bytes)
+        if schema is not None:
+            if byte_range is not None and byte_range[0] > 0:
+                options[0].column_names = schema.names
+                options[0].skip_rows = 0
+            options[2].column_types = {f.name: f.type for f in schema}
+        else:
+            overrides = {**_csv_overrides(path, *options), **(column_types or {})}
+            if overrides:
+                options[2].column_types = overrides
+
+        with _open_source(path, size, progress, byte_range) as source:
+            yield from pa_csv.open_csv(
+                source,
+                read_options=options[0],
+                parse_options=options[1],
+                convert_options=options[2],
+            )
+
+    elif fmt == "jsonl":
+        read_options = pa_json.ReadOptions(block_size=block_bytes)
+        parse_options = pa_json.ParseOptions()
+        names = None
+        if schema is not None:
+            parse_options.explicit_schema = schema
+            parse_options.unexpected_field_behavior = "error"
+        elif column_types:
+            # Arrow puts explicitly typed fields first; the batches keep the
+            # column order of the first block instead.
+            with _open_source(path, size, False, byte_range) as source:
+                names = pa_json.open_json(source, read_options=read_options).schema.names
+            parse_options.explicit_schema = pa.schema(list(column_types.items()))
+
+        with _open_source(path, size, progress, byte_range) as source:
+            reader = pa_json.open_json(source, read_options=read_options, parse_options=parse_options)
+            for batch in reader:
+                if names is not None:
+                    batch = batch.select(
+                        [n for n in names if n in batch.schema.names]
+                        + [n for n in batch.schema.names if n not in names]
+                    )
+                yield batch
+
+    elif fmt == "parquet":
+        parquet_file = pq.ParquetFile(path)
+        metadata = parquet_file.metadata
+
+        # Row groups know their decoded size, which gives rows per batch.
+        decoded = sum(
+            metadata.row_group(i).total_byte_size
+            for i in range(metadata.num_row_groups)
+        )
+        row_bytes = max(decoded / max(metadata.num_rows, 1), 1)
+
+        yield from parquet_file.iter_batches(
+            batch_size=max(int(block_bytes / row_bytes), 1),
+            use_threads=True,
+        )
+
+    else:
+        table = pa.Table.from_pandas(_read_source(path, fmt, size, progress), preserve_index=False)
+        row_bytes = max(table.nbytes / max(table.num_rows, 1), 1)
+        yield from table.to_batches(max_chunksize=max(int(block_bytes / row_bytes), 1))
+
+
+# Reads the source file into an Arrow table when the format has a
+# multi-threaded Arrow reader, otherwise into a pandas frame.
+def _read_source(path: str, fmt: str, size: int, progress: bool | None) -> pa.Table | pd.DataFrame:
+    if fmt == "csv":
+        return read_csv_table(path, ",", progress)
+    if fmt == "tsv":
+        return read_csv_table(path, "\t", progress)
+    if fmt == "jsonl":
+        with _open_source(path, size, progress) as source:
+            return pa_json.read_json(source)
+    if fmt == "json":
+        return pd.read_json(path, compression=detect_compression(path))
+    if fmt == "excel":
+        return pd.read_excel(path)
+
+    return pd.read_pickle(path, compression=detect_compression(path))
+
+
+_CSV_CONVERSION_ERROR = re.compile(
+    r"In CSV column #(\d+): .*CSV conversion error to (\w+): invalid value '(.*)'", re.S
+)
+
+
+_JSON_TYPE_CHANGE = re.compile(r"Column\(/([^)]*)\) changed from (\w+) to (\w+)")
+_JSON_CONVERSION_ERROR = re.compile(r"Failed to convert JSON to (u?int\d+)")
+_JSON_TYPES = {"number": pa.int64(), "string": pa.string(), "boolean": pa.bool_()}
+
+
+# Runs `consume` over iter_batches(path, ...) and returns its result. Arrow
+# infers CSV and JSONL column types from the first block only, so a value
+# further down that does not fit its column raises ArrowInvalid. The pass is
+# then run again with that column read as float64 (a fractional value in an
+# integer column) or as strings (CSV), or as the type of its first non-null
+# values (a JSONL column that was all null), as a whole-file read types it,
+# until every block converts. A JSONL column that changes between numbers,
+# strings, booleans and objects cannot be widened and raises ValueError.
+def consume_batches(
+        consume,
+        path: str,
+        block_bytes: int,
+        progress: bool | None = None,
+        byte_range: tuple[int, int] | None = None
+):
+    fmt = detect_format(path)
+    column_types = {}
+
+    while True:
+        seen = {"rows": 0, "schema": None}
+
+        def counted(batches):
+            for batch in batches:
+                yield batch
+                seen["rows"] += batch.num_rows
+                seen["schema"] = batch.schema
+
+        try:
+            return consume(counted(iter_batches(
+                path, block_bytes, progress, byte_range=byte_range, column_types=column_types
+            )))
+        except pa.ArrowInvalid as e:
+            if fmt in ("csv", "tsv"):
+                name, widened = _csv_widening(path, fmt, str(e))
+            elif fmt == "jsonl":
+                name, widened = _jsonl_widening(path, str(e), seen["rows"], seen["schema"], byte_range)
+            else:
+                raise
+            if name is None:
+                raise
+            if widened is None or column_types.get(name) == widened:
+                raise ValueError(
+                    f"Column '{name}' of {Path(path).name} changes type after the first "
+                    f"block ({e}); load the file without --streaming, --sample or --incremental"
+                ) from e
+            column_types[name] = widened
+
+
+# The CSV column named by a conversion error and the type to read it as.
+def _csv_widening(path: str, fmt: str, message: str) -> tuple[str | None, pa.DataType | None]:
+    match = _CSV_CONVERSION_ERROR.search(message)
+    if match is None:
+        return None, None
+
+    options = _csv_options(path, "," if fmt == "csv" else "\t")
+    name = _csv_schema(path, *options).names[int(match.group(1))]
+    if match.group(2).startswith(("int", "uint")) and _is_float(match.group(3)):
+        return name, pa.float64()
+    return name, pa.string()
+
+
+# The JSONL column behind a parse error and the type to read it as, or None
+# when its values cannot share one type. A failed integer conversion does not
+# name the column, so the rows after those already read are scanned for the
+# first integer column holding a fractional number.
+def _jsonl_widening(
+        path: str,
+        message: str,
+        rows: int,
+        schema: pa.Schema | None,
+        byte_range: tuple[int, int] | None
+) -> tuple[str | None, pa.DataType | None]:
+    match = _JSON_TYPE_CHANGE.search(message)
+    if match is not None:
+        name = match.group(1).replace("~1", "/").replace("~0", "~")
+        return name, _JSON_TYPES.get(match.group(3)) if match.group(2) == "null" else None
+
+    if _JSON_CONVERSION_ERROR.search(message) is None or schema is None:
+        return None, None
+
+    integers = {f.name for f in schema if pa.types.is_integer(f.type)}
+    size = Path(path).stat().st_size
+    with _open_source(path, size, False, byte_range) as source:
+        lines = (line for line in _read_lines(source) if line.strip())
+        for line in itertools.islice(lines, rows, None):
+            values = json.loads(line)
+            for name in integers:
+                if isinstance(values, dict) and isinstance(values.get(name), float):
+                    return name, pa.float64()
+    return None, None
+
+
+# The lines of a binary source, read in chunks.
+def _read_lines(source, chunk_bytes: int = 1 << 20) -> Iterator[bytes]:
+    file = open(source, "rb") if isinstance(source, str) else source
+    try:
+        rest = b""
+        while chunk := file.read(chunk_bytes):
+            *lines, rest = (rest + chunk).split(b"\n")
+            yield from lines
+        if rest:
+            yield rest
+    finally:
+        if file is not source:
+            file.close()
+
+
+def _is_float(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+# Reads the files of a directory or glob dataset concurrently, one thread
+# per file up to the CPU count (each Arrow reader also parses in parallel),
+# and concatenates them in file order. Column types are promoted across
+# files and columns missing from a file are filled with nulls. Returns the
+# data and the rows of each file.
+def _read_files(files: list[str], fmt: str, progress: bool | None) -> tuple[pa.Table | pd.DataFrame, list[int]]:
+    def read(path: str):
+        return _read_source(path, fmt, Path(path).stat().st_size, progress)
+
+    with ThreadPoolExecutor(max_workers=min(len(files), pa.cpu_count())) as pool:
+        parts = list(pool.map(read, files))
+    rows = [len(part) for part in parts]
+
+    if all(isinstance(part, pa.Table) for part in parts):
+        try:
+            return pa.concat_tables(parts, promote_options="permissive"), rows
+        except (pa.ArrowTypeError, pa.ArrowInvalid) as e:
+            raise ValueError(f"Files have incompatible schemas: {e}")
+
+    return pd.concat(parts, ignore_index=True), rows
+
+
+# Opens a dataset of any supported format as a lazy source. The path may be
+# a file, or a directory or glob pattern whose files are read as one dataset.
+# Parquet is already columnar and is read column by column on demand.
+# Other formats are parsed once; with use_cache the parsed table is kept as
+# an Arrow IPC file in the ingest cache and memory-mapped, both right after
+# parsing and on later loads of the unchanged file(s).
+# Returns the source, its format name and load statistics; those of a
+# directory or glob list the rows of every file.
+def open_dataset(
+        path: str,
+        progress: bool | None = None,
+        use_cache: bool = True
+) -> tuple[TableSource | ParquetSource | ParquetPartsSource | FrameSource, str, dict]:
+
+    fmt = detect_format(path)
+    files = dataset_files(path)
+    sizes = [Path(f).stat().st_size for f in files]
+    size = sum(sizes)
+
+    start = time.perf_counter()
+    rss_before = peak_rss_mb()
+
+    file_rows = None
+    if fmt == "parquet":
+        if is_multi_file(path):
+            source = ParquetPartsSource(files, pa.cpu_count())
+            file_rows = [part.num_rows for part in source.parts]
+        else:
+            source = ParquetSource(path)
+        cache_status = "not_needed"
+    else:
+        source, cache_status, file_rows = _open_parsed(path, fmt, size, progress, use_cache)
+
+    seconds = time.perf_counter() - start
+    rss_after = peak_rss_mb()
+
+    compressions = {detect_compression(f) for f in files}
+
+    stats = {
+        "bytes": size,
+        "seconds": round(seconds, 4),
+        "mb_per_s": round(size / 1024 ** 2 / seconds, 2) if seconds > 0 else None,
+        "threads": pa.cpu_count(),
+        "cache": cache_status,
+        "compression": compressions.pop() if len(compressions) == 1 else "mixed",
+        "peak_rss_mb": round(rss_after, 1) if rss_after is not None else None,
+        "peak_rss_increase_mb": (
+            round(rss_after - rss_before, 1) if rss_after is not None else None
+        ),
+    }
+    if is_multi_file(path):
+        stats["files"] = [
+            {"path": f, "bytes": b, "rows": r}
+            for f, b, r in zip(files, sizes, file_rows or [None] * len(files))
+        ]
+
+    return source, fmt, stats
+
+
+# Parses the file, or the files of a directory or glob. Returns the source,
+# the cache status and, for several files, the rows of each.
+def _open_parsed(
+        path: str,
+        fmt: str,
+        size: int,
+        progress: bool | None,
+        use_cache: bool
+) -> tuple[TableSource | FrameSource, str, list[int] | None]:
+
+    multi = is_multi_file(path)
+
+    def read():
+        if multi:
+            return _read_files(dataset_files(path), fmt, progress)
+        return _read_source(path, fmt, size, progress), None
+
+    if not use_cache:
+        data, file_rows = read()
+        if isinstance(data, pd.DataFrame):
+            return FrameSource(data), "disabled", file_rows
+        return TableSource(data), "disabled", file_rows
+
+    key = fingerprint(path)
+    table = load_cached(key)
+    if table is not None:
+        file_rows = (cached_meta(key) or {}).get("file_rows") if multi else None
+        return TableSource(table, mapped=True), "hit", file_rows
+
+    data, file_rows = read()
+
+    if isinstance(data, pd.DataFrame):
+        try:
+            table = pa.Table.from_pandas(data, preserve_index=False)
+        except pa.ArrowException:
+            # Mixed-type object columns have no Arrow equivalent.
+            return FrameSource(data), "unsupported", file_rows
+    else:
+        table = data
+
+    store_cached(key, table, path, file_rows)
+
+    # Swap the heap copy for the memory-mapped one.
+    return TableSource(load_cached(key), mapped=True), "miss", file_rows
@@ -0,0 +1,125 @@
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+# Column-parallel execution pays off from this many columns on; narrower
+# frames are processed in the calling process.
+PARALLEL_MIN_COLUMNS = 64
+
+# Pools are kept for the life of the process, one per worker count, so the
+# spawn and import cost is paid once. Spawned workers (not forked) are safe
+# to start from a process running sessions in threads.
+_pools: dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context("spawn")
+            )
+        return _pools[workers]
+
+
+def _ready(_) -> bool:
+    from . import profile  # noqa: F401  (the module that submits work)
+    return True
+
+
+# Starts every worker of the pool and imports the tool modules in it, so the
+# first real task does not pay for it.
+def start_pool(workers: int):
+    pool = get_pool(workers)
+    list(pool.map(_ready, range(4 * workers)))
+
+
+# Contiguous [start, stop) column ranges, one per part.
+def column_blocks(n_columns: int, parts: int) -> list[tuple[int, int]]:
+    edges = np.linspace(0, n_columns, min(parts, n_columns) + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def _numeric_worker(fn, name: str, shape: tuple, start: int, stop: int, *args):
+    shm = SharedMemory(name=name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, order="F")
+        result = fn(values[:, start:stop], start, stop, *args)
+        # Views must be gone before the mapping is closed.
+        del values
+        return result
+    finally:
+        shm.close()
+
+
+# Runs fn(values, start, stop, *args) on column blocks of `frame` as float64
+# in a process pool. The data is written once to shared memory in
+# column-major order, so each block is a contiguous slice that workers map
+# instead of receiving a pickled copy. Returns the results in block order.
+def map_numeric_blocks(fn, frame: pd.DataFrame, workers: int, *args) -> list:
+    n_rows, n_cols = frame.shape
+    shm = SharedMemory(create=True, size=max(n_rows * n_cols * 8, 1))
+
+    try:
+        values = np.ndarray((n_rows, n_cols), dtype=np.float64, buffer=shm.buf, order="F")
+        for i, col in enumerate(frame.columns):
+            values[:, i] = frame[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        del values
+
+        pool = get_pool(workers)
+        futures = [
+            pool.submit(_numeric_worker, fn, shm.name, (n_rows, n_cols), start, stop, *args)
+            for start, stop in column_blocks(n_cols, workers)
+        ]
+        return [f.result() for f in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _table_worker(fn, name: str, start: int, stop: int, *args):
+    shm = SharedMemory(name=name)
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(shm.buf)).read_all()
+        result = fn(table.select(list(range(start, stop))), *args)
+        del table
+        return result
+    finally:
+        shm.close()
+
+
+# Runs fn(table, *args) on column blocks of an Arrow table in a process pool.
+# The table is written once to shared memory as an Arrow IPC stream that
+# workers read zero-copy. Returns the results in block order.
+def map_table_blocks(fn, table: pa.Table, workers: int, *args, parts: int | None = None) -> list:
+    sizer = pa.MockOutputStream()
+    with pa.ipc.new_stream(sizer, table.schema) as writer:
+        writer.write_table(table)
+
+    shm = SharedMemory(create=True, size=max(sizer.size(), 1))
+
+    try:
+        sink = pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf))
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        sink.close()
+        # The writers hold the exported buffer until they are gone.
+        del writer, sink
+
+        pool = get_pool(workers)
+        futures = [
+            pool.submit(_table_worker, fn, shm.name, start, stop, *args)
+            for start, stop in column_blocks(table.num_columns, parts or workers)
+        ]
+        return [f.result() for f in futures]
+    finally:
+        shm.close()
+        shm.unlink()
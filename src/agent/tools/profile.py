@@ -0,0 +1,624 @@
+import json
+import math
+import os
+import threading
+
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import pyarrow as pa
+
+from src.agent.llm.data_context import DataContext
+from src.config import PROFILE_DIR
+
+from . import duckdb_backend, parallel
+from .cache import fingerprint
+from .correlation import sparse_correlation
+from .sketches import DistinctCounter, MisraGries
+from .streaming import TOP_VALUES_CAPACITY
+
+
+# Bump whenever a change alters what is stored in a profile or how tools
+# derive their output from it; sidecars of other versions are ignored.
+PROFILE_SCHEMA_VERSION = 2
+
+# Top values kept per categorical column. Larger max_top_values requests
+# fall back to value_counts on the column.
+PROFILE_TOP_VALUES = 20
+
+# Datasets with at least this many rows get sketched distinct counts and top
+# values for non-numeric columns unless exact ones are requested.
+APPROX_MIN_ROWS = 5_000_000
+
+# Rows per value_counts call when sketching a column.
+SKETCH_CHUNK_ROWS = 1_000_000
+
+QUARTILES = (0.25, 0.5, 0.75)
+
+
+@dataclass
+class ColumnProfile:
+    dtype: str
+    n_missing: int
+    n_unique: int | None
+    semantic_type: str
+    # (value, count) pairs by descending count, ties in order of appearance.
+    top_values: list[tuple] | None = None
+    # count/mean/std/min/25%/50%/75%/max, unrounded, for numeric dtypes.
+    stats: dict | None = None
+    # Error bounds of sketched n_unique / top_values; None when exact.
+    approximate: dict | None = None
+
+
+# Per-column statistics shared by dataset_info, missing_values_report and
+# basic_statistics. Columns are profiled on first request by the backend of
+# the data context and kept on it until the next load_data. Sessions on the
+# same dataset share one profile; the lock serializes its updates.
+@dataclass
+class DatasetProfile:
+    n_rows: int
+    columns: dict[str, ColumnProfile] = field(default_factory=dict)
+    # Pearson correlation of the numeric columns.
+    correlation: pd.DataFrame | None = None
+    # Blockwise results for wide tables by (threshold, top_k); not persisted.
+    sparse_correlations: dict = field(default_factory=dict, repr=False)
+    # Missing counts of columns not profiled yet; not persisted.
+    missing: dict[str, int] = field(default_factory=dict, repr=False)
+    # Fingerprint of the source file; profiles with a key are persisted.
+    key: str | None = None
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    # With approximate, non-numeric columns are sketched instead of counted
+    # exactly; columns sketched before are recomputed when exact is asked.
+    def ensure(self, ctx: DataContext, columns: list[str], approximate: bool = False):
+        if ctx.streaming:
+            return
+
+        with self._lock:
+            missing = [
+                c for c in columns
+                if c not in self.columns
+                   or (not approximate and self.columns[c].approximate)
+            ]
+            if not missing:
+                return
+
+            self.columns.update(
+                BACKENDS[ctx.backend].profile(ctx, missing, approximate)
+            )
+            save_profile(self, ctx.path)
+
+    # Missing values per column. Columns not profiled yet are counted from
+    # the source without being loaded (DataContext.missing_counts); the
+    # counts are kept until they are profiled.
+    def missing_counts(self, ctx: DataContext) -> dict[str, int]:
+        with self._lock:
+            unknown = [
+                c for c in ctx.columns
+                if c not in self.columns and c not in self.missing
+            ]
+            if unknown:
+                self.missing.update(ctx.missing_counts(unknown))
+
+            return {
+                c: self.columns[c].n_missing if c in self.columns else self.missing[c]
+                for c in ctx.columns
+            }
+
+    # Up to k most frequent values of a categorical column.
+    def top_values(self, ctx: DataContext, col: str, k: int) -> dict | None:
+        profile = self.columns[col]
+        if profile.top_values is None:
+            return None
+
+        if k > PROFILE_TOP_VALUES:
+            if ctx.streaming:
+                return ctx.source.column_stats[col].top.top(k)
+            if not profile.approximate and len(profile.top_values) == PROFILE_TOP_VALUES:
+                return (
+                    ctx.select([col])[col]
+                      .value_counts(dropna=True)
+                      .head(k)
+                      .to_dict()
+                )
+
+        return dict(profile.top_values[:k])
+
+
+# Computes column profiles and correlation matrices from the loaded columns
+# of the data context, converted to pandas.
+class PandasBackend:
+    name = "pandas"
+
+    def profile(
+            self,
+            ctx: DataContext,
+            columns: list[str],
+            approximate: bool = False
+    ) -> dict[str, ColumnProfile]:
+        df = ctx.select(columns)
+        numeric = list(df.select_dtypes(include="number").columns)
+        others = [c for c in columns if c not in numeric]
+        profiles = {}
+
+        if numeric:
+            profiles.update(_profile_numeric(df[numeric], ctx.workers))
+
+        if approximate:
+            for col in others:
+                profiles[col] = _profile_sketched(df[col])
+        elif others:
+            profiles.update(_profile_others(df[others], ctx.workers))
+
+        return profiles
+
+    def correlation(self, ctx: DataContext) -> pd.DataFrame:
+        return ctx.numeric().corr()
+
+
+# Same results from DuckDB queries over Arrow-backed sources (ingest cache
+# tables, Parquet files), run multi-threaded where the data lies instead of
+# on columns converted to pandas. Columns of types DuckDB does not handle
+# here or whose sums it would not match, and other sources, go to the pandas
+# backend. Non-numeric columns are
+# always counted exactly: it costs one aggregation, not a sketch.
+class DuckDBBackend(PandasBackend):
+    name = "duckdb"
+
+    def profile(
+            self,
+            ctx: DataContext,
+            columns: list[str],
+            approximate: bool = False
+    ) -> dict[str, ColumnProfile]:
+        if not duckdb_backend.supports(ctx):
+            return super().profile(ctx, columns, approximate)
+
+        kinds = duckdb_backend.column_kinds(ctx, columns)
+        numeric = [c for c in columns if kinds.get(c) == "numeric"]
+        strings = [c for c in columns if kinds.get(c) == "string"]
+        profiles = {}
+
+        for col, fields in duckdb_backend.numeric_profiles(ctx, numeric).items():
+            profiles[col] = ColumnProfile(semantic_type="numeric", **fields)
+
+        for col, fields in duckdb_backend.string_profiles(
+                ctx, strings, PROFILE_TOP_VALUES
+        ).items():
+            profiles[col] = ColumnProfile(semantic_type="categorical", **fields)
+
+        others = [c for c in columns if c not in profiles]
+        if others:
+            profiles.update(super().profile(ctx, others, approximate))
+
+        return {col: profiles[col] for col in columns}
+
+    def correlation(self, ctx: DataContext) -> pd.DataFrame:
+        columns = ctx.numeric_columns
+        if not duckdb_backend.supports(ctx) or not columns:
+            return super().correlation(ctx)
+
+        return pd.DataFrame(
+            duckdb_backend.correlation(ctx, columns),
+            index=columns,
+            columns=columns,
+        )
+
+
+BACKENDS = {backend.name: backend for backend in (PandasBackend(), DuckDBBackend())}
+
+
+# With workers > 1, wide frames are split into column blocks profiled in a
+# process pool (tools.parallel); results are identical either way.
+def _profile_numeric(num_df: pd.DataFrame, workers: int = 1) -> dict[str, ColumnProfile]:
+    names = list(num_df.columns)
+    dtypes = [str(num_df[col].dtype) for col in names]
+
+    if workers > 1 and len(names) >= parallel.PARALLEL_MIN_COLUMNS:
+        profiles = {}
+        for block in parallel.map_numeric_blocks(
+                _numeric_block, num_df, workers, names, dtypes
+        ):
+            profiles.update(block)
+        return profiles
+
+    return {
+        col: _numeric_column(num_df[col].to_numpy(dtype=np.float64, na_value=np.nan), dtype)
+        for col, dtype in zip(names, dtypes)
+    }
+
+
+def _numeric_block(values: np.ndarray, start: int, stop: int, names, dtypes) -> dict:
+    return _numeric_profiles(values, names[start:stop], dtypes[start:stop])
+
+
+# Columns of a block are profiled one at a time, so temporaries never exceed
+# a few copies of one column.
+def _numeric_profiles(
+        values: np.ndarray,
+        names: list[str],
+        dtypes: list[str]
+) -> dict[str, ColumnProfile]:
+    return {
+        col: _numeric_column(np.ascontiguousarray(values[:, i]), dtypes[i])
+        for i, col in enumerate(names)
+    }
+
+
+# Sorting the column once yields min, max, quartiles and the distinct count
+# together; NaN sorts last so the first `count` values are the valid ones.
+def _numeric_column(values: np.ndarray, dtype: str) -> ColumnProfile:
+    n_rows = len(values)
+    missing = np.isnan(values)
+    count = n_rows - int(np.count_nonzero(missing))
+
+    if count == 0:
+        return ColumnProfile(
+            dtype=dtype,
+            n_missing=n_rows,
+            n_unique=0,
+            semantic_type="numeric",
+            stats={
+                "count": 0, "mean": math.nan, "std": math.nan, "min": math.nan,
+                "25%": math.nan, "50%": math.nan, "75%": math.nan, "max": math.nan,
+            },
+        )
+
+    # Same arithmetic as pandas nanops: NaN filled with 0, then summed in
+    # row order, for the mean and the squared deviations.
+    work = np.where(missing, 0.0, values)
+    with np.errstate(invalid="ignore", over="ignore"):  # infinite values
+        mean = work.sum() / count
+        if count > 1:
+            np.subtract(mean, values, out=work)
+            work **= 2
+            work[missing] = 0.0
+            std = float(np.sqrt(work.sum() / (count - 1)))
+        else:
+            std = math.nan
+    del work, missing
+
+    valid = np.sort(values)[:count]
+
+    # Linear interpolation between order statistics, written as numpy's
+    # quantile (used by describe()) does so the results match bit for bit.
+    last = count - 1
+    quartiles = []
+    for q in QUARTILES:
+        pos = q * last
+        lo = math.floor(pos)
+        hi = min(lo + 1, last)
+        a, b = valid[lo], valid[hi]
+        t = pos - lo
+        with np.errstate(invalid="ignore"):
+            diff = b - a
+            quartiles.append(float(b - diff * (1 - t) if t >= 0.5 else a + diff * t))
+
+    n_unique = int(np.count_nonzero(valid[1:] != valid[:-1])) + 1
+
+    return ColumnProfile(
+        dtype=dtype,
+        n_missing=n_rows - count,
+        n_unique=n_unique,
+        semantic_type="numeric",
+        stats={
+            "count": count,
+            "mean": float(mean),
+            "std": float(std),
+            "min": float(valid[0]),
+            "25%": quartiles[0],
+            "50%": quartiles[1],
+            "75%": quartiles[2],
+            "max": float(valid[last]),
+        },
+    )
+
+
+# One factorize per column gives missing count, distinct count and value
+# frequencies; bincount over the codes replaces value_counts.
+def _profile_other(s: pd.Series) -> ColumnProfile:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()
+        uniques = s.cat.categories
+        # Unused categories are counted (as 0) like value_counts does.
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        n_unique = int(np.count_nonzero(counts))
+    else:
+        codes, uniques = pd.factorize(s)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        n_unique = len(uniques)
+
+    numeric = pd.api.types.is_numeric_dtype(s)
+
+    top_values = None
+    if not numeric:
+        order = np.argsort(-counts, kind="stable")[:PROFILE_TOP_VALUES]
+        top_values = [(uniques[i], int(counts[i])) for i in order]
+
+    return ColumnProfile(
+        dtype=str(s.dtype),
+        n_missing=int(np.count_nonzero(codes < 0)),
+        n_unique=n_unique,
+        semantic_type="numeric" if numeric else "categorical",
+        top_values=top_values,
+    )
+
+
+# Non-numeric columns of a wide frame are profiled in a process pool from an
+# Arrow copy. Columns without an Arrow form, or whose dtype does not survive
+# the round trip, are profiled here.
+def _profile_others(df: pd.DataFrame, workers: int = 1) -> dict[str, ColumnProfile]:
+    profiles = {}
+
+    if workers > 1 and len(df.columns) >= parallel.PARALLEL_MIN_COLUMNS:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except pa.ArrowException:
+            table = None
+
+        if table is not None:
+            # Distinct counts vary a lot between columns: smaller blocks
+            # balance the load.
+            for block in parallel.map_table_blocks(
+                    _other_block, table, workers, parts=4 * workers
+            ):
+                profiles.update(block)
+
+            profiles = {
+                col: p for col, p in profiles.items()
+                if p.dtype == str(df[col].dtype)
+            }
+
+    for col in df.columns:
+        if col not in profiles:
+            profiles[col] = _profile_other(df[col])
+
+    return profiles
+
+
+def _other_block(table: pa.Table) -> dict:
+    return {
+        col: _profile_other(s)
+        for col, s in table.to_pandas().items()
+    }
+
+
+# Bounded-memory profile of a non-numeric column: value counts of one chunk at
+# a time feed a distinct counter (exact up to its limit, HyperLogLog beyond)
+# and Misra-Gries heavy hitters. Error bounds are recorded when inexact.
+def _profile_sketched(s: pd.Series) -> ColumnProfile:
+    distinct = DistinctCounter()
+    top = MisraGries(TOP_VALUES_CAPACITY)
+    n_missing = 0
+
+    for start in range(0, len(s), SKETCH_CHUNK_ROWS):
+        chunk = s.iloc[start:start + SKETCH_CHUNK_ROWS]
+        n_missing += int(chunk.isna().sum())
+
+        counts = chunk.value_counts(dropna=True, sort=False)
+        values = counts.index.to_numpy()
+        distinct.update(values)
+        top.update(values, counts.to_numpy())
+
+    numeric = pd.api.types.is_numeric_dtype(s)
+
+    return ColumnProfile(
+        dtype=str(s.dtype),
+        n_missing=n_missing,
+        n_unique=distinct.estimate(),
+        semantic_type="numeric" if numeric else "categorical",
+        top_values=None if numeric else list(top.top(PROFILE_TOP_VALUES).items()),
+        approximate=_error_bounds(distinct, None if numeric else top),
+    )
+
+
+def _error_bounds(distinct, top) -> dict | None:
+    bounds = {}
+    if distinct is not None and not distinct.is_exact:
+        bounds["n_unique_relative_std_error"] = round(distinct.hll.relative_error, 4)
+    if top is not None and not top.is_exact:
+        # Reported counts are low by at most this much.
+        bounds["top_values_max_undercount"] = int(top.error)
+
+    return bounds or None
+
+
+# Profile of a streaming pass (tools.streaming.StreamStats), complete at once.
+def _profile_from_stream(stats) -> DatasetProfile:
+    profile = DatasetProfile(n_rows=stats.num_rows)
+
+    for col, s in stats.column_stats.items():
+        column_stats = None
+        if s.is_numeric:
+            m = s.moments
+            q25, q50, q75 = s.quantiles.quantiles(QUARTILES)
+            column_stats = {
+                "count": m.count,
+                "mean": m.mean if m.count else math.nan,
+                "std": m.std,
+                "min": m.min if m.count else math.nan,
+                "25%": float(q25),
+                "50%": float(q50),
+                "75%": float(q75),
+                "max": m.max if m.count else math.nan,
+            }
+
+        semantic = "numeric" if s.is_semantic_numeric else "categorical"
+        top_values = None
+        if semantic == "categorical" and s.top is not None:
+            top_values = list(s.top.top(PROFILE_TOP_VALUES).items())
+
+        profile.columns[col] = ColumnProfile(
+            dtype=s.dtype,
+            n_missing=s.missing,
+            n_unique=s.distinct.estimate() if s.distinct is not None else None,
+            semantic_type=semantic,
+            top_values=top_values,
+            stats=column_stats,
+            approximate=_error_bounds(
+                s.distinct, s.top if semantic == "categorical" else None
+            ),
+        )
+
+    return profile
+
+
+# Profile of the loaded dataset, created on first use and reset by load_data.
+def get_profile(
+        ctx: DataContext,
+        columns: list[str] | None = None,
+        approximate: bool = False
+) -> DatasetProfile:
+    if ctx.profile is None:
+        if ctx.streaming:
+            ctx.profile = _profile_from_stream(ctx.source)
+        else:
+            ctx.profile = DatasetProfile(n_rows=ctx.n_rows)
+
+    profile = ctx.profile
+    profile.ensure(ctx, ctx.columns if columns is None else columns, approximate)
+
+    return profile
+
+
+# Correlation matrix of the numeric columns, computed once per dataset. A
+# streaming pass has accumulated it already.
+def get_correlation(ctx: DataContext) -> pd.DataFrame:
+    profile = get_profile(ctx, [])
+
+    with profile._lock:
+        if profile.correlation is None:
+            if ctx.streaming:
+                profile.correlation = ctx.source.correlation()
+            else:
+                profile.correlation = BACKENDS[ctx.backend].correlation(ctx)
+            save_profile(profile, ctx.path)
+
+    return profile.correlation
+
+
+# High-correlation pairs and per-feature summary of a wide table, computed
+# block by block once per (threshold, top_k).
+def get_sparse_correlation(
+        ctx: DataContext,
+        threshold: float,
+        top_k: int | None = None
+) -> dict:
+    profile = get_profile(ctx, [])
+    key = (threshold, top_k)
+
+    with profile._lock:
+        if key not in profile.sparse_correlations:
+            profile.sparse_correlations[key] = sparse_correlation(
+                ctx.numeric(), threshold, top_k
+            )
+
+    return profile.sparse_correlations[key]
+
+
+# Starts the profile of a freshly loaded dataset from its sidecar, if one
+# was stored for the same file content by a compatible version. Compacted
+# loads report other dtypes and have sidecars of their own.
+def attach_profile(ctx: DataContext, path: str, persist: bool = True, compact: bool = False):
+    # Streaming and sample statistics are estimates and never persisted.
+    if not persist or ctx.streaming or ctx.sampled:
+        return
+
+    key = fingerprint(path) + ("_compact" if compact else "")
+    ctx.profile = load_profile(key) or DatasetProfile(n_rows=ctx.n_rows, key=key)
+
+
+def _profile_path(key: str):
+    return PROFILE_DIR / f"{key}.json"
+
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return None
+
+
+def _column_to_json(profile: ColumnProfile) -> dict | None:
+    column = asdict(profile)
+
+    if profile.top_values is not None:
+        values = [_json_value(v) for v, _ in profile.top_values]
+        # Values without a lossless JSON form (timestamps, mixed objects):
+        # the column is profiled again instead of persisted.
+        if any(v is None for v in values):
+            return None
+        column["top_values"] = [
+            [v, c] for v, (_, c) in zip(values, profile.top_values)
+        ]
+
+    return column
+
+
+def load_profile(key: str) -> DatasetProfile | None:
+    try:
+        data = json.loads(_profile_path(key).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if data.get("schema_version") != PROFILE_SCHEMA_VERSION:
+        return None
+
+    columns = {}
+    for col, column in data["columns"].items():
+        if column["top_values"] is not None:
+            column["top_values"] = [tuple(pair) for pair in column["top_values"]]
+        columns[col] = ColumnProfile(**column)
+
+    correlation = data["correlation"]
+    if correlation is not None:
+        correlation = pd.DataFrame(
+            correlation["values"],
+            index=correlation["columns"],
+            columns=correlation["columns"],
+        )
+
+    return DatasetProfile(
+        n_rows=data["rows"],
+        columns=columns,
+        correlation=correlation,
+        key=key,
+    )
+
+
+# Writes the profile to its sidecar. Written whole to a temporary file and
+# renamed, so concurrent readers never see a partial profile.
+def save_profile(profile: DatasetProfile, source_path: str):
+    if profile.key is None:
+        return
+
+    columns = {}
+    for col, column in profile.columns.items():
+        column = _column_to_json(column)
+        if column is not None:
+            columns[col] = column
+
+    correlation = None
+    if profile.correlation is not None:
+        correlation = {
+            "columns": list(profile.correlation.columns),
+            "values": profile.correlation.to_numpy().tolist(),
+        }
+
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _profile_path(profile.key)
+    tmp_path = path.with_suffix(f".tmp{os.getpid()}_{threading.get_ident()}")
+
+    tmp_path.write_text(json.dumps({
+        "schema_version": PROFILE_SCHEMA_VERSION,
+        "source": source_path,
+        "rows": profile.n_rows,
+        "columns": columns,
+        "correlation": correlation,
+    }))
+    os.replace(tmp_path, path)
@@ -0,0 +1,153 @@
+import dataclasses
+import threading
+import time
+import weakref
+
+from collections import OrderedDict
+from pathlib import Path
+
+from src.agent.llm.data_context import DataContext
+from src.config import DATASET_MEMORY_BUDGET_MB
+
+
+@dataclasses.dataclass
+class DatasetEntry:
+    # (mode, fingerprint, mode parameters...)
+    key: tuple
+    path: str
+    # Snapshot of the data context state of the dataset.
+    context: DataContext
+    # Result of the load_data call that loaded the dataset.
+    load: dict
+    bytes: int = 0
+    last_used: float = 0.0
+
+
+# Datasets loaded in this process, keyed by load mode and file fingerprint,
+# in least recently used order. Activating a dataset restores its state into
+# a session's data context; sessions on the same dataset share its loaded
+# columns, sketches and profile. Beyond budget_bytes of measured memory the
+# least recently used datasets are dropped, except those active in a session.
+class DatasetRegistry:
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.entries: OrderedDict[tuple, DatasetEntry] = OrderedDict()
+        # Dataset active in each live data context.
+        self.active: weakref.WeakKeyDictionary[DataContext, tuple] = (
+            weakref.WeakKeyDictionary()
+        )
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    # Saves the state of the dataset active in `ctx` and measures it.
+    def _save(self, ctx: DataContext):
+        entry = self.entries.get(self.active.get(ctx))
+        if entry is None:
+            return
+
+        entry.context = dataclasses.replace(ctx)
+        entry.bytes = ctx.memory_bytes()
+
+    # Makes the dataset `key` active in `ctx` if it is registered and returns
+    # the result of its original load. Returns None on a miss; the caller
+    # loads the dataset into `ctx` and registers it.
+    def activate(self, ctx: DataContext, key: tuple) -> dict | None:
+        with self._lock:
+            self._save(ctx)
+
+            entry = self.entries.get(key)
+            if entry is None:
+                # ctx is about to be attached to another dataset.
+                self.misses += 1
+                self.active.pop(ctx, None)
+                return None
+
+            self.hits += 1
+            if self.active.get(ctx) != key:
+                ctx.restore(entry.context)
+                self.active[ctx] = key
+
+            entry.last_used = time.time()
+            self.entries.move_to_end(key)
+            return entry.load
+
+    # Registers the dataset just attached to `ctx` as active in it.
+    # Versions of the same file with another fingerprint are stale and dropped.
+    def register(self, ctx: DataContext, key: tuple, path: str, load: dict):
+        with self._lock:
+            resolved = Path(path).resolve()
+            for stale in [
+                k for k, e in self.entries.items()
+                if k[1] != key[1] and Path(e.path).resolve() == resolved
+            ]:
+                del self.entries[stale]
+
+            self.entries[key] = DatasetEntry(
+                key=key,
+                path=path,
+                context=dataclasses.replace(ctx),
+                load=load,
+                bytes=ctx.memory_bytes(),
+                last_used=time.time(),
+            )
+            self.entries.move_to_end(key)
+            self.active[ctx] = key
+
+            self._evict()
+
+    def _save_all(self):
+        for ctx in list(self.active.keys()):
+            self._save(ctx)
+
+    # Drops least recently used datasets until the total is within budget.
+    def _evict(self) -> list[str]:
+        self._save_all()
+
+        pinned = set(self.active.values())
+        total = sum(e.bytes for e in self.entries.values())
+        evicted = []
+
+        for key in list(self.entries):
+            if total <= self.budget_bytes:
+                break
+            if key in pinned:
+                continue
+
+            entry = self.entries.pop(key)
+            total -= entry.bytes
+            evicted.append(entry.path)
+            self.evictions += 1
+
+        return evicted
+
+    def evict(self) -> list[str]:
+        with self._lock:
+            return self._evict()
+
+    def info(self) -> dict:
+        with self._lock:
+            self._save_all()
+            pinned = set(self.active.values())
+
+            return {
+                "budget_bytes": self.budget_bytes,
+                "total_bytes": sum(e.bytes for e in self.entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "datasets": [
+                    {
+                        "path": e.path,
+                        "mode": e.key[0],
+                        "bytes": e.bytes,
+                        "active": e.key in pinned,
+                        "last_used": e.last_used,
+                    }
+                    for e in reversed(self.entries.values())
+                ],
+            }
+
+
+REGISTRY = DatasetRegistry(int(DATASET_MEMORY_BUDGET_MB * 1024 ** 2))
@@ -0,0 +1,426 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.agent.llm.data_context import DataContext
+
+from .loaders import consume_batches
+from .streaming import HEAD_ROWS, batch_bytes
+
+
+DEFAULT_SAMPLE_ROWS = 100_000
+
+# Every stratum keeps at least this many rows (or all of its rows), so small
+# strata are estimated from more than a handful of rows.
+STRATUM_MIN_ROWS = 100
+
+MAX_STRATA = 1_000
+
+# Two-sided 95% normal quantile.
+Z_95 = 1.959963984540054
+
+
+# Rows drawn from a dataset in one pass, with the design needed to turn
+# sample statistics into population estimates. Rows of stratum h are a
+# uniform random sample of its N_h rows and carry weight N_h / n_h; without
+# stratification there is a single stratum. Column data is the sample; the
+# first HEAD_ROWS rows of the file are kept for dataset_head.
+class SampleSource:
+    streaming = False
+    sampled = True
+    read_copies = True
+
+    def __init__(
+            self,
+            table: pa.Table,
+            codes: np.ndarray,
+            strata: list,
+            stratum_rows: np.ndarray,
+            head: pd.DataFrame,
+            stratify: str | None
+    ):
+        self.table = table
+        self.columns = table.column_names
+        self.numeric_columns = [
+            f.name for f in table.schema
+            if pa.types.is_integer(f.type) or pa.types.is_floating(f.type)
+        ]
+        self.num_rows = table.num_rows
+        self.head = head
+        self.stratify = stratify
+
+        self.codes = codes
+        self.strata = strata
+        self.stratum_rows = stratum_rows
+        self.stratum_sample = np.bincount(codes, minlength=len(strata))
+        self.population_rows = int(stratum_rows.sum())
+        self.weights = stratum_rows[codes] / self.stratum_sample[codes]
+
+    def memory_bytes(self) -> int:
+        return self.table.nbytes + self.codes.nbytes + self.weights.nbytes
+
+    def read(self, columns: list[str]) -> pd.DataFrame:
+        return self.table.select(columns).to_pandas()
+
+    def slice(self, offset: int, length: int, columns: list[str]) -> pd.DataFrame:
+        if offset + length > HEAD_ROWS:
+            raise RuntimeError(
+                f"Only the first {HEAD_ROWS} rows are kept in sample mode"
+            )
+        return self.head[columns].iloc[offset:offset + length]
+
+    # Marker attached to tool outputs computed from the sample.
+    def info(self) -> dict:
+        return {
+            "sample_rows": self.num_rows,
+            "population_rows": self.population_rows,
+            "method": (
+                f"stratified by {self.stratify}" if self.stratify
+                else "uniform random"
+            ),
+            "confidence": 0.95,
+        }
+
+    # Variance of the estimated population total of `values` (one per
+    # sample row), summed over strata with finite population correction.
+    def total_variance(self, values: np.ndarray) -> float:
+        n = self.stratum_sample
+        big_n = self.stratum_rows
+        sums = np.bincount(self.codes, weights=values, minlength=len(n))
+        squares = np.bincount(self.codes, weights=values ** 2, minlength=len(n))
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            s2 = (squares - sums ** 2 / n) / (n - 1)
+        s2 = np.where(n > 1, np.maximum(s2, 0.0), 0.0)
+
+        return float(np.sum(big_n ** 2 * (1 - n / big_n) * s2 / np.maximum(n, 1)))
+
+
+# Bottom-k sampling: every row gets a uniform random key and the rows with
+# the `size` smallest keys form the sample, plus the STRATUM_MIN_ROWS smallest
+# keys of every stratum when stratifying. Within a stratum the kept rows are
+# then always its smallest keys, i.e. a uniform sample of the stratum. Rows
+# whose key cannot make the cut are dropped as each batch arrives, so memory
+# is bounded by the sample plus one batch.
+def draw_sample(
+        path: str,
+        size: int,
+        stratify: str | None = None,
+        memory_limit_mb: float = 512,
+        progress: bool | None = None,
+        seed: int = 0
+) -> SampleSource:
+
+    if size < 1:
+        raise ValueError("Sample size must be a positive integer")
+
+    block = batch_bytes(memory_limit_mb)
+
+    return consume_batches(
+        lambda batches: _sample_pass(batches, size, stratify, seed), path, block, progress
+    )
+
+
+def _sample_pass(batches, size: int, stratify: str | None, seed: int) -> SampleSource:
+    rng = np.random.default_rng(seed)
+    min_rows = STRATUM_MIN_ROWS if stratify else 0
+
+    kept = None
+    keys = np.empty(0)
+    codes = np.empty(0, dtype=np.intp)
+    head = None
+
+    labels = {}
+    stratum_rows = np.zeros(0, dtype=np.int64)
+    global_cut = math.inf
+    stratum_cut = np.zeros(0)
+
+    for batch in batches:
+        if head is None or len(head) < HEAD_ROWS:
+            rows = batch.slice(0, HEAD_ROWS).to_pandas()
+            head = rows if head is None else pd.concat(
+                [head, rows], ignore_index=True
+            ).head(HEAD_ROWS)
+
+        if stratify is not None and stratify not in batch.schema.names:
+            raise ValueError(f"Unknown stratification column: {stratify}")
+
+        batch_keys = rng.random(batch.num_rows)
+        if stratify is None:
+            batch_codes = np.zeros(batch.num_rows, dtype=np.intp)
+        else:
+            batch_codes = _stratum_codes(batch.column(stratify), labels, stratify)
+
+        n_strata = max(len(labels), 1)
+        stratum_rows = np.pad(stratum_rows, (0, n_strata - len(stratum_rows)))
+        stratum_rows += np.bincount(batch_codes, minlength=len(stratum_rows))
+        stratum_cut = np.pad(
+            stratum_cut, (0, len(stratum_rows) - len(stratum_cut)),
+            constant_values=math.inf
+        )
+
+        candidate = np.flatnonzero(
+            batch_keys < np.maximum(global_cut, stratum_cut[batch_codes])
+        )
+        if len(candidate) == 0:
+            continue
+
+        table = pa.Table.from_batches([batch]).take(candidate)
+        kept = table if kept is None else pa.concat_tables([kept, table])
+        keys = np.concatenate([keys, batch_keys[candidate]])
+        codes = np.concatenate([codes, batch_codes[candidate]])
+
+        keep, global_cut, stratum_cut = _bottom_k(
+            keys, codes, size, min_rows, len(stratum_rows)
+        )
+        kept, keys, codes = kept.take(keep), keys[keep], codes[keep]
+
+    if kept is None:
+        raise ValueError("Dataset is empty")
+
+    strata = [None] * len(stratum_rows)
+    for label, code in labels.items():
+        strata[code] = label
+
+    return SampleSource(kept, codes, strata, stratum_rows, head, stratify)
+
+
+# Maps the values of the stratification column to stable stratum codes.
+def _stratum_codes(column, labels: dict, stratify: str) -> np.ndarray:
+    batch_codes, uniques = pd.factorize(column.to_pandas(), use_na_sentinel=False)
+
+    lookup = np.empty(len(uniques), dtype=np.intp)
+    for i, value in enumerate(uniques):
+        label = None if pd.isna(value) else value
+        if label not in labels:
+            if len(labels) == MAX_STRATA:
+                raise ValueError(
+                    f"Column {stratify} has more than {MAX_STRATA} distinct "
+                    f"values and cannot be used for stratification"
+                )
+            labels[label] = len(labels)
+        lookup[i] = labels[label]
+
+    return lookup[batch_codes]
+
+
+# Indices of the rows to keep and the key cut-offs a later row must beat:
+# the size-th smallest key overall and the min_rows-th smallest per stratum.
+def _bottom_k(keys, codes, size: int, min_rows: int, n_strata: int):
+    keep = np.zeros(len(keys), dtype=bool)
+    order = np.argsort(keys)
+    keep[order[:size]] = True
+    global_cut = keys[order[size - 1]] if len(keys) >= size else math.inf
+
+    stratum_cut = np.full(n_strata, math.inf)
+    if min_rows:
+        order = np.lexsort((keys, codes))
+        sorted_codes = codes[order]
+        starts = np.searchsorted(sorted_codes, np.arange(n_strata))
+        rank = np.arange(len(order)) - starts[sorted_codes]
+        keep[order[rank < min_rows]] = True
+
+        full = np.flatnonzero(rank == min_rows - 1)
+        stratum_cut[sorted_codes[full]] = keys[order[full]]
+
+    return np.flatnonzero(keep), global_cut, stratum_cut
+
+
+def _ci(estimate: float, se: float, digits: int | None = 4) -> list[float]:
+    return [round(estimate - Z_95 * se, digits), round(estimate + Z_95 * se, digits)]
+
+
+# Weighted quantiles. With equal weights (a uniform sample) they are the
+# sample quantiles with linear interpolation, like describe().
+def weighted_quantile(values: np.ndarray, weights: np.ndarray, qs) -> np.ndarray:
+    qs = np.asarray(qs, dtype=np.float64)
+    if len(values) == 0:
+        return np.full(qs.shape, np.nan)
+    if np.all(weights == weights[0]):
+        return np.quantile(values, qs)
+
+    order = np.argsort(values, kind="stable")
+    values, weights = values[order], weights[order]
+    cum = (np.cumsum(weights) - weights / 2) / weights.sum()
+    return np.interp(qs, cum, values)
+
+
+def _column(ctx: DataContext, col: str) -> np.ndarray:
+    s = ctx.select([col])[col]
+    return s.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+# Population estimates for one numeric column with 95% confidence intervals:
+# count (total), mean (ratio estimator, linearized variance) and quartiles
+# (Woodruff intervals). min and max are the sample extremes.
+def numeric_estimates(ctx: DataContext, col: str) -> dict:
+    source = ctx.source
+    y = _column(ctx, col)
+    w = source.weights
+    present = ~np.isnan(y)
+
+    count = float(w[present].sum())
+    count_se = math.sqrt(source.total_variance(present.astype(np.float64)))
+
+    if not present.any():
+        return {"count": 0, "mean": math.nan, "std": math.nan, "min": math.nan,
+                "25%": math.nan, "50%": math.nan, "75%": math.nan, "max": math.nan,
+                "ci95": {"count": _ci(0.0, count_se, None)}}
+
+    yp, wp = y[present], w[present]
+    mean = float(np.sum(wp * yp) / count)
+    residual = np.where(present, y - mean, 0.0)
+    mean_se = math.sqrt(source.total_variance(residual)) / count
+
+    n_present = len(yp)
+    std = (
+        math.sqrt(np.sum(wp * (yp - mean) ** 2) / count * n_present / (n_present - 1))
+        if n_present > 1 else math.nan
+    )
+
+    qs = (0.25, 0.5, 0.75)
+    quartiles = weighted_quantile(yp, wp, qs)
+
+    ci = {"count": _ci(count, count_se, None), "mean": _ci(mean, mean_se)}
+    for q, value in zip(qs, quartiles):
+        below = np.where(present, (y <= value) - q, 0.0)
+        p_se = math.sqrt(source.total_variance(below)) / count
+        lo, hi = weighted_quantile(yp, wp, [max(q - Z_95 * p_se, 0.0), min(q + Z_95 * p_se, 1.0)])
+        ci[f"{int(q * 100)}%"] = [round(float(lo), 4), round(float(hi), 4)]
+
+    return {
+        "count": int(round(count)),
+        "mean": round(mean, 4),
+        "std": round(std, 4),
+        "min": round(float(yp.min()), 4),
+        "25%": round(float(quartiles[0]), 4),
+        "50%": round(float(quartiles[1]), 4),
+        "75%": round(float(quartiles[2]), 4),
+        "max": round(float(yp.max()), 4),
+        "ci95": ci,
+    }
+
+
+# Estimated population share of missing values in a column, with its CI.
+def missing_estimate(ctx: DataContext, col: str) -> tuple[float, float]:
+    source = ctx.source
+    missing = ctx.select([col])[col].isna().to_numpy().astype(np.float64)
+    n = source.population_rows
+
+    share = float(np.sum(source.weights * missing) / n)
+    se = math.sqrt(source.total_variance(missing)) / n
+    return share, se
+
+
+# Same output as tools.basic_statistics, estimated from the sample.
+def basic_statistics(ctx: DataContext) -> dict:
+    return {col: numeric_estimates(ctx, col) for col in ctx.numeric_columns}
+
+
+# Same output as tools.missing_values_report, estimated from the sample.
+def missing_values_report(ctx: DataContext) -> dict:
+    report = {}
+
+    for col in ctx.columns:
+        share, se = missing_estimate(ctx, col)
+        if share > 0:
+            report[col] = {
+                "missing": int(round(share * ctx.source.population_rows)),
+                "percent": round(share * 100, 2),
+                "ci95": {"percent": [
+                    round(max(share - Z_95 * se, 0.0) * 100, 2),
+                    round(min(share + Z_95 * se, 1.0) * 100, 2),
+                ]},
+            }
+
+    return report
+
+
+# Same output as tools.dataset_info, estimated from the sample. n_unique is
+# the number of distinct values seen in the sample, a lower bound.
+def dataset_info(ctx: DataContext, max_top_values: int = 5) -> dict:
+    source = ctx.source
+    n_rows = source.population_rows
+    n_cols = len(source.columns)
+    w = source.weights
+    columns_info = {}
+    missed_share = 0.0
+
+    for col in source.columns:
+        s = ctx.select([col])[col]
+        share, se = missing_estimate(ctx, col)
+        missed_share += share
+
+        if pd.api.types.is_numeric_dtype(s):
+            semantic = "numeric"
+            top_values = None
+        else:
+            semantic = "categorical"
+            totals = pd.Series(w).groupby(s.to_numpy(), sort=False, dropna=True).sum()
+            top_values = (
+                totals.sort_values(ascending=False, kind="stable")
+                      .head(max_top_values)
+                      .round()
+                      .astype(np.int64)
+                      .to_dict()
+            )
+
+        columns_info[col] = {
+            "dtype": str(s.dtype),
+            "n_missing": int(round(share * n_rows)),
+            "col_missing_pct": round(share * 100, 2),
+            "col_missing_pct_ci95": [
+                round(max(share - Z_95 * se, 0.0) * 100, 2),
+                round(min(share + Z_95 * se, 1.0) * 100, 2),
+            ],
+            "n_unique_in_sample": int(s.nunique(dropna=True)),
+            "semantic_type": semantic,
+            **({"top_values": top_values} if top_values else {})
+        }
+
+    return {
+        "rows": n_rows,
+        "n_columns": n_cols,
+        "missing_pct": round(missed_share / n_cols * 100, 2),
+        "columns": columns_info,
+        "approximate": source.info(),
+    }
+
+
+# 95% interval of a sample correlation from Fisher's z transform.
+def correlation_ci(r: float, n: int) -> list[float] | None:
+    if n <= 3 or not math.isfinite(r) or abs(r) >= 1:
+        return None
+    z = math.atanh(r)
+    half = Z_95 / math.sqrt(n - 3)
+    return [round(math.tanh(z - half), 3), round(math.tanh(z + half), 3)]
+
+
+# Percentiles and histogram of a column from the weighted sample, in the
+# shape of tools.distribution.summarize.
+def distribution_summary(ctx: DataContext, col: str, percentiles, bins: int) -> dict:
+    y = _column(ctx, col)
+    present = ~np.isnan(y)
+    yp, wp = y[present], ctx.source.weights[present]
+
+    if len(yp) == 0:
+        return {"count": 0}
+
+    values = weighted_quantile(yp, wp, np.asarray(percentiles, dtype=np.float64) / 100)
+    counts, edges = np.histogram(yp, bins=bins, weights=wp)
+
+    return {
+        "count": int(round(wp.sum())),
+        "min": round(float(yp.min()), 4),
+        "max": round(float(yp.max()), 4),
+        "percentiles": {
+            f"p{p:g}": round(float(v), 4) for p, v in zip(percentiles, values)
+        },
+        "histogram": {
+            "edges": [round(float(e), 4) for e in edges],
+            "counts": [int(round(c)) for c in counts],
+        },
+        "approximate": True,
+    }
@@ -0,0 +1,100 @@
+import datetime
+import decimal
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # optional, the standard encoder is used instead
+    orjson = None
+
+
+# Dates and timestamps the way tools report them: YYYY-MM-DD without a time
+# of day, otherwise ISO 8601 with a space separator.
+def _datetime(value: datetime.datetime) -> str:
+    value = pd.Timestamp(value)
+    if value == value.normalize():
+        return value.date().isoformat()
+    return value.isoformat(sep=" ")
+
+
+# JSON form of a value neither encoder handles itself. Whatever is returned
+# is encoded in turn, so containers may still hold such values.
+def _default(value):
+    if isinstance(value, np.generic):
+        if isinstance(value, np.datetime64):
+            return _default(pd.Timestamp(value))
+        if isinstance(value, np.timedelta64):
+            return str(pd.Timedelta(value))
+        return value.item()
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in "mM":
+            return pd.Index(value.ravel()).tolist()
+        return value.tolist()
+    if isinstance(value, (pd.Series, pd.Index, pd.Categorical, pd.api.extensions.ExtensionArray)):
+        return value.tolist()
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, datetime.datetime):
+        return _datetime(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def _key(key):
+    if key is None or isinstance(key, (str, int, float, bool)):
+        return key
+    key = _default(key)
+    return key if key is None or isinstance(key, (str, int, float, bool)) else str(key)
+
+
+# Copy with every value in a form json.dumps encodes: non-finite floats as
+# null and keys as strings, numbers, booleans or null.
+def _plain(value):
+    if isinstance(value, dict):
+        return {_key(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.generic):  # np.float64 subclasses float
+        return _plain(_default(value))
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if value is None or isinstance(value, (str, int, bool)):
+        return value
+    return _plain(_default(value))
+
+
+def _dumps_std(result) -> str:
+    try:
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"), allow_nan=False, default=_default)
+    except (ValueError, TypeError):  # NaN or infinity, keys like NumPy integers
+        return json.dumps(_plain(result), ensure_ascii=False, separators=(",", ":"))
+
+
+# Compact JSON text of a tool result. NumPy scalars and arrays, pandas
+# series, categoricals and timestamps, NaN and infinity (as null) and
+# non-string keys are all accepted. With orjson installed the result is
+# encoded in one native pass and only values it has no form for go through
+# _default; otherwise, or for integers beyond 64 bits, the standard encoder
+# is used, which gives the same values.
+def dumps_result(result) -> str:
+    if orjson is None:
+        return _dumps_std(result)
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    try:
+        return orjson.dumps(result, default=_default, option=option).decode()
+    except orjson.JSONEncodeError:  # keys orjson does not take, e.g. NumPy integers
+        pass
+    try:
+        return orjson.dumps(_plain(result), default=_default, option=option).decode()
+    except orjson.JSONEncodeError:  # integers beyond 64 bits, e.g. DuckDB HUGEINT
+        return _dumps_std(result)
@@ -0,0 +1,438 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# Count, mean, M2, min and max of a stream of values. Chunks are combined
+# with Chan et al.'s parallel update, which stays numerically stable where
+# sum-of-squares formulas cancel catastrophically.
+class RunningMoments:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    # `values` must be float64 without NaN.
+    def update(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+
+        other = RunningMoments()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other: "RunningMoments"):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    # Sample standard deviation (ddof=1), like pandas.
+    @property
+    def std(self) -> float:
+        if self.count < 2:
+            return math.nan
+        return math.sqrt(self.m2 / (self.count - 1))
+
+
+# KLL quantile sketch: a stack of compactors where an item on level h stands
+# for 2**h input values. Memory is O(k), rank error roughly 1.7 / k.
+# Up to exact_limit values are kept verbatim, and while nothing has been
+# compacted quantiles match numpy/pandas linear interpolation exactly.
+class KLLSketch:
+    def __init__(self, k: int = 400, exact_limit: int = 16_384, seed: int = 0):
+        self.k = k
+        self.exact_limit = exact_limit
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    # `values` must be float64 without NaN.
+    def update(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        if other.n == 0:
+            return
+
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    # Halves every over-full level: sort it, keep every other item starting
+    # at a random offset and promote those to the next level.
+    def _compress(self):
+        if self.is_exact and self.n <= self.exact_limit:
+            return
+
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+
+                items = np.sort(items)
+                if len(items) % 2:
+                    self.levels[level] = items[-1:]
+                    items = items[:-1]
+                else:
+                    self.levels[level] = np.empty(0)
+
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], promoted]
+                )
+
+            level += 1
+
+    @property
+    def is_exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def _weighted(self) -> tuple[np.ndarray, np.ndarray]:
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(items_), 2 ** level, dtype=np.float64)
+            for level, items_ in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype=np.float64)
+
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.is_exact:
+            return np.quantile(self.levels[0], qs)
+
+        items, cum_weights = self._weighted()
+        idx = np.searchsorted(cum_weights, qs * cum_weights[-1], side="left")
+        result = items[np.clip(idx, 0, len(items) - 1)]
+
+        # The extremes are tracked exactly.
+        result = np.where(qs <= 0, self.min, result)
+        return np.where(qs >= 1, self.max, result)
+
+    # Estimated fraction of values <= each of `points`, or < with strict.
+    def cdf(self, points, strict: bool = False) -> np.ndarray:
+        points = np.asarray(points, dtype=np.float64)
+
+        if self.n == 0:
+            return np.full(points.shape, np.nan)
+
+        items, cum_weights = self._weighted()
+        idx = np.searchsorted(items, points, side="left" if strict else "right")
+        below = np.where(idx > 0, cum_weights[np.maximum(idx - 1, 0)], 0.0)
+        return below / cum_weights[-1]
+
+
+def _leading_zeros64(x: np.ndarray) -> np.ndarray:
+    # float64 represents 32-bit integers exactly, so log2 is exact per half.
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+
+    with np.errstate(divide="ignore"):
+        lz_hi = 31 - np.floor(np.log2(hi))
+        lz_lo = 63 - np.floor(np.log2(lo))
+
+    return np.where(hi > 0, lz_hi, np.where(lo > 0, lz_lo, 64)).astype(np.uint8)
+
+
+# Hashes values to uint64 with pandas' vectorized hashing. Callers pass
+# distinct values, so the factorize step of categorize=True only costs time.
+def hash_values(values) -> np.ndarray:
+    return pd.util.hash_array(np.asarray(values), categorize=False)
+
+
+# HyperLogLog distinct counter over 64-bit hashes with 2**p registers.
+# Relative standard error is 1.04 / sqrt(2**p) (0.81% for p=14).
+class HyperLogLog:
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, hashes: np.ndarray):
+        if len(hashes) == 0:
+            return
+
+        hashes = hashes.astype(np.uint64, copy=False)
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes << np.uint64(self.p)
+        rank = np.minimum(_leading_zeros64(rest) + 1, 64 - self.p + 1)
+
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def estimate(self) -> float:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            # Linear counting is more accurate for small cardinalities.
+            return self.m * math.log(self.m / zeros)
+
+        return float(raw)
+
+
+# Exact distinct set while it stays small, HyperLogLog beyond that.
+class DistinctCounter:
+    def __init__(self, exact_limit: int = 65_536, p: int = 14):
+        self.exact_limit = exact_limit
+        self.exact: set | None = set()
+        self.hll = HyperLogLog(p)
+
+    # `values` are distinct or not, without nulls.
+    def update(self, values):
+        if len(values) == 0:
+            return
+
+        self.hll.update(hash_values(values))
+
+        if self.exact is not None:
+            self.exact.update(values.tolist() if hasattr(values, "tolist") else values)
+            if len(self.exact) > self.exact_limit:
+                self.exact = None
+
+    def merge(self, other: "DistinctCounter"):
+        self.hll.merge(other.hll)
+
+        if self.exact is not None and other.exact is not None:
+            self.exact |= other.exact
+            if len(self.exact) > self.exact_limit:
+                self.exact = None
+        else:
+            self.exact = None
+
+    @property
+    def is_exact(self) -> bool:
+        return self.exact is not None
+
+    def estimate(self) -> int:
+        if self.exact is not None:
+            return len(self.exact)
+        return int(round(self.hll.estimate()))
+
+
+# Misra-Gries heavy hitters over (value, count) pairs. Keeps at most
+# `capacity` counters; every reported count is low by at most `error`,
+# which never exceeds n / (capacity + 1). Exact while fewer than
+# `capacity` distinct values have been seen. Ties keep first-seen order.
+class MisraGries:
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.n = 0
+        self.error = 0
+
+    def update(self, values, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        self.n += int(counts.sum())
+
+        # A chunk with many distinct values is first reduced to a summary of
+        # its own (same cut as _prune); merging summaries keeps the bound.
+        if len(counts) > self.capacity:
+            pos = len(counts) - self.capacity - 1
+            cut = int(np.partition(counts, pos)[pos])
+            keep = np.flatnonzero(counts > cut)
+            self.error += cut
+            values, counts = np.asarray(values)[keep], counts[keep] - cut
+
+        chunk = pd.Series(counts, index=pd.Index(values))
+
+        if self.counts.empty:
+            self.counts = chunk.groupby(level=0, sort=False).sum()
+        else:
+            self.counts = (
+                pd.concat([self.counts, chunk])
+                  .groupby(level=0, sort=False)
+                  .sum()
+            )
+
+        self._prune()
+
+    def merge(self, other: "MisraGries"):
+        n = self.n + other.n
+        self.error += other.error
+        self.update(other.counts.index, other.counts.to_numpy())
+        self.n = n
+
+    def _prune(self):
+        if len(self.counts) <= self.capacity:
+            return
+
+        # Subtract the (capacity + 1)-th largest count from every counter.
+        values = self.counts.to_numpy()
+        pos = len(values) - self.capacity - 1
+        cut = int(np.partition(values, pos)[pos])
+
+        self.error += cut
+        self.counts = self.counts[self.counts > cut] - cut
+
+    @property
+    def is_exact(self) -> bool:
+        return self.error == 0
+
+    def top(self, k: int) -> dict:
+        return (
+            self.counts.sort_values(ascending=False, kind="stable")
+                       .head(k)
+                       .to_dict()
+        )
+
+
+# Histogram with fixed, equal-width bins. Chunks or workers using the same
+# edges merge by adding counts. The last bin includes its right edge.
+class FixedHistogram:
+    def __init__(self, lo: float, hi: float, bins: int):
+        if hi <= lo:
+            hi = lo + 1.0
+        self.edges = np.linspace(lo, hi, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    # `values` must be float64 without NaN.
+    def update(self, values: np.ndarray):
+        self.counts += np.histogram(values, bins=self.edges)[0]
+
+    def merge(self, other: "FixedHistogram"):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Histograms with different bin edges cannot be merged")
+        self.counts += other.counts
+
+    # Bin counts from a quantile sketch when the value range was unknown
+    # while the data streamed past: counted from the values an exact sketch
+    # still holds, otherwise estimated from the share of values below each
+    # interior edge (bins are [a, b) like np.histogram's).
+    @classmethod
+    def from_sketch(cls, sketch: KLLSketch, bins: int) -> "FixedHistogram":
+        hist = cls(sketch.min, sketch.max, bins)
+        if sketch.n == 0:
+            return hist
+        if sketch.is_exact:
+            hist.update(sketch.levels[0])
+            return hist
+
+        below = np.concatenate([[0.0], sketch.cdf(hist.edges[1:-1], strict=True), [1.0]])
+        hist.counts = np.round(np.diff(below) * sketch.n).astype(np.int64)
+        return hist
+
+
+# Pairwise-complete sums for the Pearson correlation of k columns, like
+# DataFrame.corr: per pair, the count, sums, sums of squares and sum of
+# products over the rows where both values are present. Values are shifted
+# by the means of the first chunk to keep the sums from cancelling. Chunks
+# merge by adding the sums, so memory is O(k**2) regardless of row count.
+class CoMoments:
+    def __init__(self, k: int):
+        self.k = k
+        self.shift = None
+        self.n = np.zeros((k, k))
+        self.sx = np.zeros((k, k))
+        self.sxx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+
+    # `values` is a (rows, k) float64 matrix with NaN for missing values.
+    def update(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+
+        valid = ~np.isnan(values)
+        if self.shift is None:
+            with np.errstate(invalid="ignore"):
+                counts = valid.sum(axis=0)
+                self.shift = np.where(
+                    counts > 0, np.nansum(values, axis=0) / np.maximum(counts, 1), 0.0
+                )
+
+        x = np.where(valid, values - self.shift, 0.0)
+        self.sxy += x.T @ x
+
+        if valid.all():
+            # Every pair is complete: the per-column sums are shared by all.
+            self.n += len(values)
+            self.sx += x.sum(axis=0)[:, None]
+            self.sxx += (x * x).sum(axis=0)[:, None]
+        else:
+            mask = valid.astype(np.float64)
+            self.n += mask.T @ mask
+            self.sx += x.T @ mask
+            self.sxx += (x * x).T @ mask
+
+    def merge(self, other: "CoMoments"):
+        if other.shift is None:
+            return
+        if self.shift is None:
+            self.shift = other.shift
+        elif not np.array_equal(self.shift, other.shift):
+            raise ValueError("Co-moments with different shifts cannot be merged")
+
+        self.n += other.n
+        self.sx += other.sx
+        self.sxx += other.sxx
+        self.sxy += other.sxy
+
+    # Correlation matrix; NaN for pairs with fewer than two complete rows or
+    # a constant column.
+    def correlation(self) -> np.ndarray:
+        n, sx, sy = self.n, self.sx, self.sx.T
+        cov = n * self.sxy - sx * sy
+        var_x = n * self.sxx - sx * sx
+        var_y = var_x.T
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.sqrt(var_x * var_y)
+        # Relative to the sums: what is left of a constant column is rounding.
+        constant = var_x <= 1e-12 * n * self.sxx
+        corr[(n < 2) | constant | constant.T] = np.nan
+
+        corr = np.clip(corr, -1.0, 1.0)
+        diagonal = np.diag_indices(self.k)
+        corr[diagonal] = np.where(np.isnan(corr[diagonal]), np.nan, 1.0)
+        return corr
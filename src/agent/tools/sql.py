@@ -0,0 +1,128 @@
+import datetime
+import decimal
+import json
+import math
+import threading
+
+from src.agent.llm.data_context import DataContext, FrameSource, ParquetPartsSource, ParquetSource, TableSource
+
+from .serialize import _datetime
+
+
+# Name of the loaded dataset in queries.
+SQL_TABLE = "data"
+
+SQL_DEFAULT_ROWS = 50
+SQL_MAX_ROWS = 500
+
+# Serialized rows kept in a result, about 2000 tokens at 4 characters each.
+SQL_MAX_CHARS = 8_000
+
+# Longer strings in results are cut to this many characters.
+SQL_MAX_CELL_CHARS = 200
+
+# Queries still running after this long are interrupted.
+SQL_TIMEOUT_S = 30.0
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+# The dataset as DuckDB scans it in place: the Arrow table (memory-mapped from
+# the ingest cache), an Arrow dataset over the Parquet file(s), or the pandas
+# frame. Only the columns and row groups a query needs are read.
+def _scan_object(ctx: DataContext):
+    source = ctx.source
+    if isinstance(source, TableSource):
+        return source.table
+    if isinstance(source, (ParquetSource, ParquetPartsSource)):
+        return source.dataset()
+    if isinstance(source, FrameSource):
+        return source.df
+    raise RuntimeError("run_sql needs the whole dataset; it is not available in streaming or sample mode")
+
+
+def _connect(ctx: DataContext):
+    try:
+        import duckdb
+    except ImportError:
+        raise RuntimeError("run_sql needs the duckdb package (pip install duckdb)")
+
+    # In memory, without file system access: queries see the dataset only.
+    con = duckdb.connect(config={"enable_external_access": False})
+    con.register("_source", _scan_object(ctx))
+    con.execute(
+        f"CREATE VIEW {SQL_TABLE} AS SELECT "
+        f"{', '.join(_quote(c) for c in ctx.columns)} FROM _source"
+    )
+    return duckdb, con
+
+
+def _json_cell(value):
+    if value is None or isinstance(value, (bool, int)):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return _datetime(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, str):
+        if len(value) > SQL_MAX_CELL_CHARS:
+            return value[:SQL_MAX_CELL_CHARS] + "..."
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_json_cell(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _json_cell(v) for k, v in value.items()}
+    return _json_cell(str(value))
+
+
+# Runs one read-only SELECT over the dataset. The query is planned by DuckDB,
+# which pushes projections and filters into the columnar scan, and at most
+# max_rows + 1 rows are produced. Rows are returned until SQL_MAX_CHARS of
+# JSON; "truncated" says whether any were left out.
+def run_query(ctx: DataContext, query: str, max_rows: int) -> dict:
+    duckdb, con = _connect(ctx)
+    timer = threading.Timer(SQL_TIMEOUT_S, con.interrupt)
+
+    try:
+        try:
+            statements = con.extract_statements(query)
+        except duckdb.Error as e:
+            raise ValueError(f"Invalid SQL: {e}")
+
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            raise ValueError("run_sql accepts exactly one SELECT query")
+
+        timer.start()
+        try:
+            relation = con.sql(statements[0].query)
+            columns = relation.columns
+            fetched = relation.limit(max_rows + 1).fetchall()
+        except duckdb.InterruptException:
+            raise RuntimeError(f"Query interrupted after {SQL_TIMEOUT_S:g} s")
+        except duckdb.Error as e:
+            raise ValueError(f"SQL error: {e}")
+    finally:
+        timer.cancel()
+        con.close()
+
+    rows = []
+    size = 0
+    for row in fetched[:max_rows]:
+        record = {col: _json_cell(v) for col, v in zip(columns, row)}
+        size += len(json.dumps(record))
+        if size > SQL_MAX_CHARS and rows:
+            break
+        rows.append(record)
+
+    return {
+        "columns": columns,
+        "rows": rows,
+        "n_rows": len(rows),
+        "truncated": len(rows) < len(fetched),
+    }
@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .correlation import MATRIX_MAX_COLUMNS
+from .loaders import consume_batches, iter_batches
+from .sketches import CoMoments, RunningMoments, KLLSketch, DistinctCounter, MisraGries
+
+
+# Rows kept from the start of the file to serve dataset_head.
+HEAD_ROWS = 100
+
+# Heavy-hitter counters per categorical column.
+TOP_VALUES_CAPACITY = 1024
+
+# Decoded bytes per batch as a fraction of the memory limit. Arrow buffers,
+# the pandas/numpy views and sketch updates each hold a copy of a batch.
+BATCH_MEMORY_FRACTION = 1 / 8
+
+
+def _pandas_dtype(data_type: pa.DataType, has_nulls: bool) -> str:
+    # Dtype the column gets from Table.to_pandas(), as the in-memory tools see it.
+    if pa.types.is_integer(data_type) and has_nulls:
+        return "float64"
+    if pa.types.is_boolean(data_type) and has_nulls:
+        return "object"
+
+    return str(pa.schema([("c", data_type)]).empty_table().to_pandas()["c"].dtype)
+
+
+def _is_hashable(data_type: pa.DataType) -> bool:
+    return not (pa.types.is_nested(data_type) or pa.types.is_dictionary(data_type))
+
+
+# Running state of one column: exact row/missing counts and moments,
+# bounded-memory sketches for quantiles, distinct counts and top values.
+class ColumnStats:
+    def __init__(self, name: str, data_type: pa.DataType):
+        self.name = name
+        self.type = data_type
+        self.is_float = pa.types.is_floating(data_type)
+        self.is_numeric = pa.types.is_integer(data_type) or self.is_float
+        self.missing = 0
+        self.nulls = 0
+
+        self.moments = RunningMoments() if self.is_numeric else None
+        self.quantiles = KLLSketch() if self.is_numeric else None
+        self.distinct = DistinctCounter() if _is_hashable(data_type) else None
+        self.top = (
+            MisraGries(TOP_VALUES_CAPACITY)
+            if not self.is_numeric and not pa.types.is_boolean(data_type)
+               and self.distinct is not None
+            else None
+        )
+
+    def update(self, array: pa.Array):
+        self.nulls += array.null_count
+        self.missing += array.null_count
+        valid = pc.drop_null(array)
+
+        if self.is_numeric:
+            values = valid.to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+
+            if self.is_float:
+                nan = np.isnan(values)
+                if nan.any():
+                    self.missing += int(nan.sum())
+                    values = values[~nan]
+
+            self.moments.update(values)
+            self.quantiles.update(values)
+            self.distinct.update(np.unique(values))
+
+        elif self.distinct is not None:
+            counts = pc.value_counts(valid)
+            values = counts.field("values").to_numpy(zero_copy_only=False)
+
+            self.distinct.update(values)
+            if self.top is not None:
+                self.top.update(values, counts.field("counts").to_numpy())
+
+    @property
+    def dtype(self) -> str:
+        return _pandas_dtype(self.type, self.nulls > 0)
+
+    @property
+    def is_semantic_numeric(self) -> bool:
+        return pd.api.types.is_numeric_dtype(pd.Series([], dtype=self.dtype))
+
+
+# Statistics of a whole dataset computed in one chunked pass. Acts as the
+# data source of a streaming DataContext: schema, row count and the first
+# HEAD_ROWS rows are available, column data is not. Every statistic is
+# mergeable, so further batches (rows appended to the file) can be added
+# later. Correlations are kept for up to MATRIX_MAX_COLUMNS numeric columns.
+class StreamStats:
+    streaming = True
+    sampled = False
+    read_copies = False
+
+    def __init__(self, schema: pa.Schema):
+        self.schema = schema
+        self.columns = schema.names
+        self.column_stats = {f.name: ColumnStats(f.name, f.type) for f in schema}
+        self.numeric_columns = [
+            c for c, s in self.column_stats.items() if s.is_numeric
+        ]
+        self.comoments = (
+            CoMoments(len(self.numeric_columns))
+            if 0 < len(self.numeric_columns) <= MATRIX_MAX_COLUMNS
+            else None
+        )
+        self.num_rows = 0
+        self.batches = 0
+        self.head = None
+
+    def update(self, batch: pa.RecordBatch):
+        if self.head is None or len(self.head) < HEAD_ROWS:
+            rows = batch.slice(0, HEAD_ROWS).to_pandas()
+            self.head = rows if self.head is None else pd.concat(
+                [self.head, rows], ignore_index=True
+            ).head(HEAD_ROWS)
+
+        for name, array in zip(batch.schema.names, batch.columns):
+            self.column_stats[name].update(array)
+
+        if self.comoments is not None and batch.num_rows:
+            self.comoments.update(np.column_stack([
+                batch.column(c).to_numpy(zero_copy_only=False).astype(np.float64)
+                for c in self.numeric_columns
+            ]))
+
+        self.num_rows += batch.num_rows
+        self.batches += 1
+
+    # Gives the kept head rows the dtypes of the full columns.
+    def finalize(self):
+        for col, s in self.column_stats.items():
+            if str(self.head[col].dtype) != s.dtype and s.nulls:
+                self.head[col] = self.head[col].astype(s.dtype)
+
+    # Sketches are bounded in size; only the head rows are measured.
+    def memory_bytes(self) -> int:
+        return int(self.head.memory_usage(index=True, deep=True).sum())
+
+    def read(self, columns: list[str]) -> pd.DataFrame:
+        raise RuntimeError("Column data is not kept in memory in streaming mode")
+
+    def slice(self, offset: int, length: int, columns: list[str]) -> pd.DataFrame:
+        if offset + length > HEAD_ROWS:
+            raise RuntimeError(
+                f"Only the first {HEAD_ROWS} rows are kept in streaming mode"
+            )
+        return self.head[columns].iloc[offset:offset + length]
+
+    # Pearson correlation of the numeric columns, like DataFrame.corr.
+    def correlation(self) -> pd.DataFrame:
+        if self.comoments is None:
+            raise RuntimeError(
+                f"Correlations are kept for up to {MATRIX_MAX_COLUMNS} numeric "
+                f"columns in streaming mode"
+            )
+        return pd.DataFrame(
+            self.comoments.correlation(),
+            index=self.numeric_columns,
+            columns=self.numeric_columns,
+        )
+
+    # Which outputs are estimates rather than exact values.
+    def approximations(self) -> dict:
+        return {
+            "quantiles": [
+                c for c in self.numeric_columns
+                if not self.column_stats[c].quantiles.is_exact
+            ],
+            "n_unique": [
+                c for c, s in self.column_stats.items()
+                if s.distinct is not None and not s.distinct.is_exact
+            ],
+            "top_values": [
+                c for c, s in self.column_stats.items()
+                if s.top is not None and not s.top.is_exact
+            ],
+        }
+
+
+def batch_bytes(memory_limit_mb: float) -> int:
+    block = int(memory_limit_mb * 1024 ** 2 * BATCH_MEMORY_FRACTION)
+    return min(max(block, 1024 ** 2), 256 * 1024 ** 2)
+
+
+# Single chunked pass over the file (or its first `end` bytes). Peak memory
+# is bounded by the batch size derived from memory_limit_mb plus the
+# fixed-size sketches per column.
+def stream_stats(
+        path: str,
+        memory_limit_mb: float,
+        progress: bool | None = None,
+        end: int | None = None
+) -> StreamStats:
+
+    block = batch_bytes(memory_limit_mb)
+    byte_range = (0, end) if end is not None else None
+
+    return consume_batches(_stream_pass, path, block, progress, byte_range=byte_range)
+
+
+# Adds the rows in bytes [start, end) of the file to `stats`, parsed with the
+# schema of the rows before them. Raises ArrowInvalid when they do not fit
+# it; `stats` is then partly updated and must be discarded.
+def extend_stats(
+        stats: StreamStats,
+        path: str,
+        start: int,
+        end: int,
+        memory_limit_mb: float,
+        progress: bool | None = None
+) -> StreamStats:
+
+    batches = iter_batches(
+        path, batch_bytes(memory_limit_mb), progress,
+        byte_range=(start, end), schema=stats.schema
+    )
+    return _stream_pass(batches, stats)
+
+
+def _stream_pass(batches, stats: StreamStats | None = None) -> StreamStats:
+    for batch in batches:
+        if stats is None:
+            stats = StreamStats(batch.schema)
+        stats.update(batch)
+
+    if stats is None:
+        raise ValueError("Dataset is empty")
+
+    stats.finalize()
+    return stats
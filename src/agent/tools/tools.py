@@ -1,118 +1,349 @@
+import threading
+import time
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 from pathlib import Path
 
-from src.agent.llm import DATA_CONTEXT
-from src.agent.config import PLOTS_DIR
+from src.agent.llm.data_context import DataContext
+from src.config import ANALYSIS_BACKEND, COMPACT_DTYPES, PLOTS_DIR, PROFILE_WORKERS, STREAM_MEMORY_LIMIT_MB
+
+from . import distribution, groupby, sampling, sql, streaming
+from .cache import fingerprint, is_multi_file
+from .compaction import compact_source
+from .incremental import incremental_stats
+from .loaders import open_dataset, dataset_name, detect_compression, detect_format, peak_rss_mb
+from .correlation import MATRIX_MAX_COLUMNS
+from .profile import APPROX_MIN_ROWS, BACKENDS, attach_profile, get_correlation, get_profile, get_sparse_correlation
+from .registry import REGISTRY
+
+
+_PLOT_LOCK = threading.Lock()
 
 
 # Data load tool
-def load_data(path: str) -> dict:
-    ext = Path(path).suffix.lower()
+# Loads the dataset into `ctx`, the data context of the calling session.
+# `path` is a file, or a directory or glob pattern (data/part-*.parquet)
+# whose files are read as one dataset, see loaders.open_dataset.
+# With streaming, the file is not loaded: dataset_info, basic_statistics,
+# missing_values_report, correlation_matrix and dataset_head are computed in
+# one chunked pass whose memory use is bounded by memory_limit_mb.
+# With incremental (CSV, TSV and JSONL files that are only appended to), the
+# state of that pass is remembered with the byte offset it reached; later
+# loads parse only the rows appended since (see tools.incremental).
+# With sample, one chunked pass draws `sample` random rows (stratified by the
+# `stratify` column if given) and tools report estimates for the full dataset
+# with 95% confidence intervals.
+# With use_cache, statistics computed for the dataset are also persisted to a
+# profile sidecar and reused by later loads of the unchanged file.
+# Datasets stay loaded in the registry: loading one again in the same mode,
+# with the same use_cache (and memory_limit_mb when streaming), while its file
+# is unchanged switches back to it without reading anything.
+# With workers > 1, statistics of wide tables are computed column-parallel in
+# that many processes.
+# `backend` selects the engine computing statistics (tools.profile.BACKENDS);
+# results are the same with either.
+# With compact, columns are stored in the smallest lossless dtypes (see
+# tools.compaction) and the result reports the bytes saved per column. Left
+# as None it follows COMPACT_DTYPES for full loads only.
+def load_data(
+    ctx: DataContext,
+    path: str,
+    progress: bool | None = None,
+    use_cache: bool = True,
+    streaming: bool = False,
+    memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB,
+    sample: int | None = None,
+    stratify: str | None = None,
+    workers: int = PROFILE_WORKERS,
+    backend: str = ANALYSIS_BACKEND,
+    compact: bool | None = None,
+    incremental: bool = False
+) -> dict:
+    if incremental and not use_cache:
+        raise ValueError("Incremental analysis keeps its state in the cache; it needs use_cache")
+    streaming = streaming or incremental
+    if streaming and sample:
+        raise ValueError("Streaming and sample modes cannot be combined")
+    if compact is None:
+        compact = COMPACT_DTYPES and not (streaming or sample)
+    if compact and (streaming or sample):
+        raise ValueError("Dtype compaction applies to full loads, not streaming or sample mode")
+    if (streaming or sample) and is_multi_file(path):
+        raise ValueError("Streaming, incremental and sample modes read a single file, not a directory or glob")
+    if workers < 1:
+        raise ValueError("workers must be a positive integer")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+    detect_format(path)
+    start = time.perf_counter()
+
+    if incremental:
+        key = ("incremental", fingerprint(path), memory_limit_mb)
+    elif streaming:
+        key = ("streaming", fingerprint(path), memory_limit_mb)
+    elif sample:
+        key = ("sample", fingerprint(path), sample, stratify)
+    elif compact:
+        key = ("lazy", fingerprint(path), use_cache, "compact")
+    else:
+        key = ("lazy", fingerprint(path), use_cache)
+
+    result = REGISTRY.activate(ctx, key)
+    if result is not None:
+        ctx.workers = workers
+        ctx.backend = backend
+        return {
+            **result,
+            "load": {
+                **result["load"],
+                "seconds": round(time.perf_counter() - start, 4),
+                "mb_per_s": None,
+                "registry": "hit",
+            }
+        }
+
+    if streaming:
+        result = _load_streaming(ctx, path, progress, memory_limit_mb, incremental)
+    elif sample:
+        result = _load_sample(ctx, path, progress, memory_limit_mb, sample, stratify)
+    else:
+        result = _load_lazy(ctx, path, progress, use_cache, compact)
+
+    ctx.workers = workers
+    ctx.backend = backend
+    result["load"]["registry"] = "miss"
+    REGISTRY.register(ctx, key, path, result)
+
+    return result
+
+
+def _load_lazy(
+    ctx: DataContext,
+    path: str,
+    progress: bool | None,
+    use_cache: bool,
+    compact: bool = False
+) -> dict:
+    source, fmt, stats = open_dataset(path, progress=progress, use_cache=use_cache)
+
+    report = None
+    if compact:
+        start = time.perf_counter()
+        source, report = compact_source(source)
+        report["seconds"] = round(time.perf_counter() - start, 4)
+
+    ctx.attach(source, path, fmt)
+    attach_profile(ctx, path, persist=use_cache, compact=compact)
+
+    return {
+        "status": "ok",
+        "format": fmt,
+        "rows": ctx.n_rows,
+        "columns": len(ctx.columns),
+        "load": stats,
+        **({"compaction": report} if report is not None else {})
+    }
+
+
+def _load_streaming(
+    ctx: DataContext,
+    path: str,
+    progress: bool | None,
+    memory_limit_mb: float,
+    incremental: bool = False
+) -> dict:
+    start = time.perf_counter()
+    report = None
+    if incremental:
+        stats, report = incremental_stats(path, memory_limit_mb, progress=progress)
+    else:
+        stats = streaming.stream_stats(path, memory_limit_mb, progress=progress)
+    seconds = time.perf_counter() - start
 
-    if ext == ".csv":
-        df = pd.read_csv(path)
-        fmt = "csv"
+    if report is None:
+        size = parsed = Path(path).stat().st_size
     else:
-        raise ValueError(f"Unsupported format: {ext}")
+        # Only the bytes appended since the last load were read.
+        size = report["offset"] + report["parsed_bytes"]
+        parsed = report["parsed_bytes"]
 
-    DATA_CONTEXT.df = df
-    DATA_CONTEXT.path = path
-    DATA_CONTEXT.format = fmt
+    fmt = detect_format(path)
+    ctx.attach(stats, path, fmt)
 
     return {
-        "rows": len(df),
-        "columns": len(df.columns)
+        "status": "ok",
+        "format": fmt,
+        "rows": stats.num_rows,
+        "columns": len(stats.columns),
+        "load": {
+            "bytes": size,
+            "seconds": round(seconds, 4),
+            "mb_per_s": round(parsed / 1024 ** 2 / seconds, 2) if seconds > 0 else None,
+            "streaming": True,
+            "batches": stats.batches,
+            "memory_limit_mb": memory_limit_mb,
+            "cache": "disabled" if report is None else report["mode"],
+            "compression": detect_compression(path),
+            "peak_rss_mb": round(peak_rss_mb() or 0, 1),
+            **({"incremental": report} if report is not None else {})
+        },
+        "approximate": stats.approximations()
     }
 
 
+def _load_sample(
+    ctx: DataContext,
+    path: str,
+    progress: bool | None,
+    memory_limit_mb: float,
+    size: int,
+    stratify: str | None
+) -> dict:
+    start = time.perf_counter()
+    source = sampling.draw_sample(path, size, stratify, memory_limit_mb, progress)
+    seconds = time.perf_counter() - start
+
+    fmt = detect_format(path)
+    ctx.attach(source, path, fmt)
+
+    size_bytes = Path(path).stat().st_size
+
+    return {
+        "status": "ok",
+        "format": fmt,
+        "rows": source.population_rows,
+        "columns": len(source.columns),
+        "load": {
+            "bytes": size_bytes,
+            "seconds": round(seconds, 4),
+            "mb_per_s": round(size_bytes / 1024 ** 2 / seconds, 2) if seconds > 0 else None,
+            "memory_limit_mb": memory_limit_mb,
+            "cache": "disabled",
+            "compression": detect_compression(path),
+            "peak_rss_mb": round(peak_rss_mb() or 0, 1),
+        },
+        "approximate": source.info()
+    }
+
+
+# Datasets kept loaded in this process, with hit/miss/eviction counters.
+def registry_info() -> dict:
+    return REGISTRY.info()
+
+
 # Dataset head tool
-def dataset_head(n: int = 5) -> list[dict]:
-    if not DATA_CONTEXT.is_loaded():
+def dataset_head(ctx: DataContext, n: int = 5) -> list[dict]:
+    if not ctx.is_loaded():
         raise RuntimeError("No dataset loaded")
 
-    return DATA_CONTEXT.df.head(n).to_dict(orient="records")
+    return [
+        {col: _json_value(v) for col, v in record.items()}
+        for record in ctx.records(0, n)
+    ]
 
 
 # Dataset info tool
-def dataset_info(max_top_values: int = 5) -> dict:
-    if not DATA_CONTEXT.is_loaded():
+# approximate=None sketches n_unique and top_values of non-numeric columns
+# from APPROX_MIN_ROWS rows on; True/False forces sketched/exact counts.
+def dataset_info(ctx: DataContext, max_top_values: int = 5, approximate: bool | None = None) -> dict:
+    if not ctx.is_loaded():
         raise RuntimeError("No dataset loaded")
 
-    df = DATA_CONTEXT.df
+    if ctx.sampled:
+        return sampling.dataset_info(ctx, max_top_values)
 
-    n_rows = len(df)
-    n_cols = len(df.columns)
-    missed_values = df.isna().sum().sum()
-    missing_pct = round((missed_values / (n_rows * n_cols)) * 100, 2)
-    columns_info = {}
+    if approximate is None:
+        approximate = ctx.n_rows >= APPROX_MIN_ROWS
 
-    for col in df.columns:
-        s = df[col]
+    profile = get_profile(ctx, approximate=approximate)
 
-        n_missing = int(s.isna().sum())
-        col_missing_pct = round(n_missing / n_rows * 100, 2)
-        n_unique = int(s.nunique(dropna=True))
+    n_rows = profile.n_rows
+    n_cols = len(ctx.columns)
+    missed_values = sum(p.n_missing for p in profile.columns.values())
+    missing_pct = round((missed_values / (n_rows * n_cols)) * 100, 2)
+    columns_info = {}
 
-        if pd.api.types.is_numeric_dtype(s):
-            semantic = "numeric"
-            top_values = None
-        else:
-            semantic = "categorical"
-            top_values = (
-                s.value_counts(dropna=True)
-                 .head(max_top_values)
-                 .to_dict()
-            )
+    for col in ctx.columns:
+        p = profile.columns[col]
+        top_values = profile.top_values(ctx, col, max_top_values)
+        if top_values:
+            top_values = {_json_value(v): n for v, n in top_values.items()}
 
         columns_info[col] = {
-            "dtype": str(s.dtype),
-            "n_missing": n_missing,
-            "col_missing_pct": col_missing_pct,
-            "n_unique": n_unique,
-            "semantic_type": semantic,
-            **({"top_values": top_values} if top_values else {})
+            "dtype": p.dtype,
+            "n_missing": p.n_missing,
+            "col_missing_pct": round(p.n_missing / n_rows * 100, 2),
+            "n_unique": p.n_unique,
+            "semantic_type": p.semantic_type,
+            **({"top_values": top_values} if top_values else {}),
+            **({"approximate": p.approximate} if p.approximate else {})
         }
 
     return {
         "rows": n_rows,
-        "n_columns": len(df.columns),
+        "n_columns": n_cols,
         "missing_pct": missing_pct,
         "columns": columns_info
     }
 
 
+# Dates and other values without a JSON form are reported as strings; dates
+# without a time of day as YYYY-MM-DD, the way they are usually written.
+def _json_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        if value == value.normalize():
+            return value.date().isoformat()
+        return value.isoformat(sep=" ")
+    return str(value)
+
+
 # Correlation matrix and correlation heatmap tools
+# Tables with more than MATRIX_MAX_COLUMNS numeric columns get the pairs and a
+# per-feature summary from a blockwise pass instead of the full matrix.
 def correlation_matrix(
+    ctx: DataContext,
     threshold: float = 0.2,
-    label: str = None
+    label: str = None,
+    top_k: int | None = None
 ) -> dict:
 
-    if not DATA_CONTEXT.is_loaded():
+    if not ctx.is_loaded():
         raise RuntimeError("No dataset loaded")
 
-    df = DATA_CONTEXT.df
-    num_df = df.select_dtypes(include="number")
-    corr = num_df.corr()
-
-    pairs = []
-    for i, col1 in enumerate(corr.columns):
-        for col2 in corr.columns[i+1:]:
-            value = corr.loc[col1, col2]
-            if abs(value) >= threshold:
-                pairs.append({
-                    "feature_1": col1,
-                    "feature_2": col2,
-                    "correlation": round(float(value), 3)
-                })
-
-    if label and label in df.columns and pd.api.types.is_numeric_dtype(df[label]):
+    if top_k is not None and top_k < 1:
+        raise ValueError("top_k must be a positive integer")
+
+    if len(ctx.numeric_columns) > MATRIX_MAX_COLUMNS:
+        result = _wide_correlation(ctx, threshold, label, top_k)
+    else:
+        result = _dense_correlation(ctx, threshold, label, top_k)
+
+    if ctx.sampled:
+        # Correlations of the sample rows, with Fisher z intervals.
+        n = ctx.n_rows
+        for pair in result["high_correlation_pairs"]:
+            pair["ci95"] = sampling.correlation_ci(pair["correlation"], n)
+        result["approximate"] = ctx.source.info()
+
+    return result
+
+
+def _dense_correlation(ctx: DataContext, threshold: float, label: str | None, top_k: int | None) -> dict:
+
+    corr = get_correlation(ctx)
+    pairs = high_correlation_pairs(corr, threshold)[:top_k]
+
+    if label and label in ctx.numeric_columns:
         feature_target_corr = (
-            df.select_dtypes(include="number")
-              .drop(columns=[label], errors="ignore")
-              .corrwith(df[label])
+            corr[label]
+              .drop(index=label)
               .sort_values(ascending=False)
               .round(3)
               .to_dict()
@@ -133,32 +364,98 @@ def correlation_matrix(
         }
 
 
-def plot_correlation_heatmap() -> dict:
-    if not DATA_CONTEXT.is_loaded():
-        raise RuntimeError("No dataset loaded")
+def _wide_correlation(ctx: DataContext, threshold: float, label: str | None, top_k: int | None) -> dict:
+    numeric = ctx.numeric_columns
+    result = {
+        "threshold": threshold,
+        "matrix_omitted": (
+            f"{len(numeric)} numeric columns; the full matrix is returned "
+            f"for up to {MATRIX_MAX_COLUMNS}"
+        ),
+        **get_sparse_correlation(ctx, threshold, top_k)
+    }
 
-    path = DATA_CONTEXT.path
-    dataset_name = Path(path).stem
+    if label and label in numeric:
+        num_df = ctx.numeric()
+        target = num_df.drop(columns=[label]).corrwith(num_df[label])
+        # Only the strongest MATRIX_MAX_COLUMNS features by |r|.
+        strongest = target.abs().sort_values(ascending=False).index[:MATRIX_MAX_COLUMNS]
+        result["feature_target_abs_corr"] = (
+            target[strongest]
+              .sort_values(ascending=False)
+              .round(3)
+              .to_dict()
+        )
+
+    return result
 
-    df = DATA_CONTEXT.df
-    num_df = df.select_dtypes(include="number")
-    corr = num_df.corr()
 
-    Path("plots").mkdir(exist_ok=True)
+# Pairs of the upper triangle with |r| >= threshold, strongest first.
+# Pairs with an undefined correlation (constant columns) are left out.
+def high_correlation_pairs(corr, threshold: float) -> list[dict]:
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices(len(values), k=1)
+    r = values[rows, cols]
+
+    with np.errstate(invalid="ignore"):
+        keep = np.flatnonzero(np.abs(r) >= threshold)
+    keep = keep[np.argsort(-np.abs(r[keep]), kind="stable")]
+
+    names = corr.columns
+    return [
+        {
+            "feature_1": names[rows[i]],
+            "feature_2": names[cols[i]],
+            "correlation": round(float(r[i]), 3)
+        }
+        for i in keep
+    ]
+
+
+def plot_correlation_heatmap(ctx: DataContext) -> dict:
+    if not ctx.is_loaded():
+        raise RuntimeError("No dataset loaded")
 
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(
-        corr,
-        annot=True,
-        cmap="coolwarm",
-        center=0,
-    )
-    plt.title(f"Correlation heatmap ({dataset_name})")
+    # Plotting libraries are imported on first use only: they dominate the
+    # import time of this module and most runs never plot.
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    name = dataset_name(ctx.path)
+
+    numeric = ctx.numeric_columns
+    if len(numeric) > MATRIX_MAX_COLUMNS:
+        # Features of the strongest pairs, as many as fit a readable plot.
+        features = []
+        for pair in get_sparse_correlation(ctx, 0.2)["high_correlation_pairs"]:
+            for col in (pair["feature_1"], pair["feature_2"]):
+                if col not in features and len(features) < MATRIX_MAX_COLUMNS:
+                    features.append(col)
+        corr = ctx.select(features or numeric[:MATRIX_MAX_COLUMNS]).corr()
+        title = f"Correlation heatmap ({name}, {len(corr)} of {len(numeric)} features)"
+    else:
+        corr = get_correlation(ctx)
+        title = f"Correlation heatmap ({name})"
+
+    PLOTS_DIR.mkdir(exist_ok=True)
+    heatmap_path = f"{PLOTS_DIR}/correlation_heatmap_{name}.png"
+
+    # pyplot keeps one current figure per process.
+    with _PLOT_LOCK:
+        plt.figure(figsize=(10, 8))
+        sns.heatmap(
+            corr,
+            annot=len(numeric) <= MATRIX_MAX_COLUMNS,
+            cmap="coolwarm",
+            center=0,
+        )
+        plt.title(title)
 
-    heatmap_path = f"{PLOTS_DIR}/correlation_heatmap_{dataset_name}.png"
-    plt.tight_layout()
-    plt.savefig(heatmap_path)
-    plt.close()
+        plt.tight_layout()
+        plt.savefig(heatmap_path)
+        plt.close()
 
     return {
         "type": "heatmap",
@@ -167,51 +464,160 @@ def plot_correlation_heatmap() -> dict:
 
 
 # Analyse missing values
-def missing_values_report() -> dict:
-    if not DATA_CONTEXT.is_loaded():
+def missing_values_report(ctx: DataContext) -> dict:
+    if not ctx.is_loaded():
         raise RuntimeError("No dataset loaded")
 
-    df = DATA_CONTEXT.df
-    total_rows = len(df)
+    if ctx.sampled:
+        return sampling.missing_values_report(ctx)
 
-    missing = df.isna().sum()
-    missing = missing[missing > 0]
+    profile = get_profile(ctx, [])
+    total_rows = profile.n_rows
 
     report = {}
 
-    for col, count in missing.items():
-        report[col] = {
-            "missing": int(count),
-            "percent": round((count / total_rows) * 100, 2)
-        }
+    for col, count in profile.missing_counts(ctx).items():
+        if count > 0:
+            report[col] = {
+                "missing": count,
+                "percent": round((count / total_rows) * 100, 2)
+            }
 
     return report
 
 
 # Basic statistics
-def basic_statistics() -> dict:
-    if not DATA_CONTEXT.is_loaded():
+def basic_statistics(ctx: DataContext) -> dict:
+    if not ctx.is_loaded():
         raise RuntimeError("No dataset loaded")
 
-    df = DATA_CONTEXT.df
-    num_df = df.select_dtypes(include="number")
+    if ctx.sampled:
+        return sampling.basic_statistics(ctx)
 
-    stats = num_df.describe().to_dict()
+    numeric = ctx.numeric_columns
+    profile = get_profile(ctx, numeric)
 
     result = {}
 
-    for col, values in stats.items():
+    for col in numeric:
+        values = profile.columns[col].stats
         result[col] = {
-            "count": int(values.get("count", 0)),
-            "mean": round(values.get("mean", 0), 4),
-            "std": round(values.get("std", 0), 4),
-            "min": round(values.get("min", 0), 4),
-            "25%": round(values.get("25%", 0), 4),
-            "50%": round(values.get("50%", 0), 4),
-            "75%": round(values.get("75%", 0), 4),
-            "max": round(values.get("max", 0), 4),
+            "count": int(values["count"]),
+            "mean": round(values["mean"], 4),
+            "std": round(values["std"], 4),
+            "min": round(values["min"], 4),
+            "25%": round(values["25%"], 4),
+            "50%": round(values["50%"], 4),
+            "75%": round(values["75%"], 4),
+            "max": round(values["max"], 4),
+        }
+
+    return result
+
+
+# Percentiles and histograms of numeric columns from cached quantile sketches
+def distribution_summary(
+    ctx: DataContext,
+    columns: list[str] | None = None,
+    percentiles: list[float] | None = None,
+    bins: int = distribution.DEFAULT_BINS
+) -> dict:
+
+    if not ctx.is_loaded():
+        raise RuntimeError("No dataset loaded")
+
+    numeric = ctx.numeric_columns
+
+    if columns is None:
+        columns = numeric
+    else:
+        invalid = [c for c in columns if c not in numeric]
+        if invalid:
+            raise ValueError(f"Not numeric columns: {invalid}. Numeric: {numeric}")
+
+    if percentiles is None:
+        percentiles = distribution.DEFAULT_PERCENTILES
+    elif any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError("Percentiles must be between 0 and 100")
+
+    if not 1 <= bins <= distribution.MAX_BINS:
+        raise ValueError(f"bins must be between 1 and {distribution.MAX_BINS}")
+
+    if ctx.sampled:
+        return {
+            col: sampling.distribution_summary(ctx, col, percentiles, bins)
+            for col in columns
         }
 
+    return {
+        col: distribution.summarize(ctx, col, percentiles, bins)
+        for col in columns
+    }
+
+
+# SQL query tool
+# One read-only SELECT over the table `data`, run by DuckDB on the loaded
+# dataset without converting it to pandas. Returns at most max_rows rows.
+def run_sql(ctx: DataContext, query: str, max_rows: int = sql.SQL_DEFAULT_ROWS) -> dict:
+    if not ctx.is_loaded():
+        raise RuntimeError("No dataset loaded")
+
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("query must be a non-empty SQL string")
+
+    if not isinstance(max_rows, int) or not 1 <= max_rows <= sql.SQL_MAX_ROWS:
+        raise ValueError(f"max_rows must be between 1 and {sql.SQL_MAX_ROWS}")
+
+    return sql.run_query(ctx, query, max_rows)
+
+
+# Group-by aggregation tool
+# count, mean, std, min, percentiles and max of numeric columns per group of
+# one or more key columns, for the top_k largest groups.
+def group_aggregate(
+    ctx: DataContext,
+    by: str | list[str],
+    columns: list[str] | None = None,
+    percentiles: list[float] | None = None,
+    top_k: int = groupby.DEFAULT_TOP_K
+) -> dict:
+
+    if not ctx.is_loaded():
+        raise RuntimeError("No dataset loaded")
+
+    if ctx.streaming or ctx.sampled:
+        raise RuntimeError("group_aggregate needs the whole dataset; it is not available in streaming or sample mode")
+
+    by = [by] if isinstance(by, str) else list(by or [])
+    if not by:
+        raise ValueError("by must name at least one column")
+    invalid = [c for c in by if c not in ctx.columns]
+    if invalid:
+        raise ValueError(f"Unknown columns: {invalid}")
+
+    numeric = ctx.numeric_columns
+    omitted = 0
+
+    if columns is None:
+        columns = [c for c in numeric if c not in by]
+        omitted = max(len(columns) - groupby.DEFAULT_MAX_COLUMNS, 0)
+        columns = columns[:groupby.DEFAULT_MAX_COLUMNS]
+    else:
+        invalid = [c for c in columns if c not in numeric]
+        if invalid:
+            raise ValueError(f"Not numeric columns: {invalid}. Numeric: {numeric}")
+
+    if percentiles is None:
+        percentiles = groupby.DEFAULT_PERCENTILES
+    elif any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError("Percentiles must be between 0 and 100")
+
+    if not isinstance(top_k, int) or not 1 <= top_k <= groupby.MAX_TOP_K:
+        raise ValueError(f"top_k must be between 1 and {groupby.MAX_TOP_K}")
+
+    result = groupby.aggregate(ctx, by, columns, percentiles, top_k)
+    if omitted:
+        result["columns_omitted"] = omitted
     return result
 
 
@@ -221,6 +627,9 @@ TOOLS = {
         "correlation_matrix": correlation_matrix,
         "plot_correlation_heatmap": plot_correlation_heatmap,
         "missing_values_report": missing_values_report,
-        "basic_statistics": basic_statistics
+        "basic_statistics": basic_statistics,
+        "distribution_summary": distribution_summary,
+        "run_sql": run_sql,
+        "group_aggregate": group_aggregate
 }
 
@@ -5,7 +5,10 @@ from os import getenv
 
 
 load_dotenv()
-MODEL_ID = os.getenv("MODEL_ID")
+MODEL_ID = getenv("MODEL_ID")
+
+# When set, every LLM exchange is appended to this JSONL transcript.
+LLM_RECORD_PATH = getenv("LLM_RECORD_PATH")
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -14,3 +17,30 @@ PLOTS_DIR = BASE_DIR / "plots"
 
 DATA_DIR = BASE_DIR / "temp_data"
 
+# Arrow IPC copies of parsed datasets, memory-mapped on later loads.
+INGEST_CACHE_DIR = DATA_DIR / "ingest"
+
+INGEST_CACHE_MAX_BYTES = int(getenv("INGEST_CACHE_MAX_BYTES", 4 * 1024 ** 3))
+
+# Persisted dataset profiles (tool statistics), one JSON sidecar per dataset.
+PROFILE_DIR = DATA_DIR / "profiles"
+
+# State of incremental (append-only) analyses, one file per source path.
+INCREMENTAL_DIR = DATA_DIR / "incremental"
+
+# Memory budget of the datasets kept loaded in a long-lived process; least
+# recently used ones are dropped beyond it (the active one is always kept).
+DATASET_MEMORY_BUDGET_MB = float(getenv("DATASET_MEMORY_BUDGET_MB", 2048))
+
+# Worker processes for column-parallel profiling of wide tables (1 = off).
+PROFILE_WORKERS = int(getenv("PROFILE_WORKERS", 1))
+
+# Engine computing dataset statistics: "pandas", or "duckdb" (multi-threaded
+# queries over Arrow and Parquet data; needs the duckdb package).
+ANALYSIS_BACKEND = getenv("ANALYSIS_BACKEND", "pandas")
+
+# Store loaded columns in the smallest lossless dtypes (see --compact).
+COMPACT_DTYPES = getenv("COMPACT_DTYPES", "false").lower() in ("1", "true", "yes")
+
+# Memory budget of the streaming (out-of-core) statistics pass.
+STREAM_MEMORY_LIMIT_MB = float(getenv("STREAM_MEMORY_LIMIT_MB", 512))
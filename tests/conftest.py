@@ -0,0 +1,14 @@
+import pytest
+
+from src.agent.tools import cache, incremental, profile
+
+
+# Ingest cache, profile sidecars and incremental states of a test go to its
+# temporary directory instead of temp_data/.
+@pytest.fixture(autouse=True)
+def data_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "INGEST_CACHE_DIR", tmp_path / "ingest")
+    monkeypatch.setattr(cache, "PROFILE_DIR", tmp_path / "profiles")
+    monkeypatch.setattr(cache, "INCREMENTAL_DIR", tmp_path / "incremental")
+    monkeypatch.setattr(profile, "PROFILE_DIR", tmp_path / "profiles")
+    monkeypatch.setattr(incremental, "INCREMENTAL_DIR", tmp_path / "incremental")
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from src.agent.bench import backend_dataset, backend_results
+from src.agent.tools.profile import BACKENDS
+
+
+# Every backend gives the pandas output on a dataset with nulls, NaN,
+# infinite and large values, integers with missing values, constant and empty
+# columns, ties among top values and types DuckDB leaves to pandas.
+@pytest.mark.parametrize("suffix", ["csv", "parquet"])
+def test_backends_match_pandas(tmp_path, suffix):
+    pytest.importorskip("duckdb")
+
+    df = backend_dataset(np.random.default_rng(0), 5_000)
+    path = tmp_path / f"backends.{suffix}"
+    if suffix == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path)
+
+    expected = backend_results(str(path), "pandas")
+    for name in BACKENDS:
+        assert backend_results(str(path), name) == expected, name
@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.agent.bench import concurrency_datasets, scripted_session
+from src.agent.tools.registry import REGISTRY
+
+
+# Sessions running in threads on different datasets, sharing the dataset
+# registry, each see exactly the tool results of a serial run on their own
+# dataset. A zero registry budget reloads every dataset not in use.
+def test_concurrent_sessions_see_their_own_dataset(tmp_path, monkeypatch):
+    monkeypatch.setattr(REGISTRY, "budget_bytes", 0)
+    labels = concurrency_datasets(np.random.default_rng(0), 4, 2_000, str(tmp_path))
+    expected = {path: scripted_session(path, label) for path, label in labels.items()}
+    assert all(expected.values())
+
+    jobs = [list(labels)[i % len(labels)] for i in range(16)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda path: scripted_session(path, labels[path], 0.005), jobs))
+
+    for path, result in zip(jobs, results):
+        assert result == expected[path]
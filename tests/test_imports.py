@@ -0,0 +1,17 @@
+import pytest
+
+from src.agent.bench import IMPORT_TIME_BUDGET_S, cli_help_time, import_time_report
+
+
+# Importing the agent must not load the model or plotting libraries, and stays
+# within the import time budget.
+@pytest.mark.parametrize("module", ["src.agent", "src.agent.tools", "src.agent.cli"])
+def test_import_is_light(module):
+    report = import_time_report(module)
+
+    assert report["heavy_modules"] == []
+    assert report["total_s"] <= IMPORT_TIME_BUDGET_S
+
+
+def test_cli_help_within_budget():
+    assert cli_help_time() <= IMPORT_TIME_BUDGET_S
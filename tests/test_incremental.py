@@ -0,0 +1,75 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from src.agent.tools import incremental
+from src.agent.tools.incremental import IncrementalState, load_state, save_state
+from src.agent.tools.streaming import stream_stats
+
+
+def _write_log(path, rows: int, seed: int, mode: str = "w"):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "x": rng.standard_normal(rows),
+        "n": rng.integers(0, 1000, rows),
+        "id": [f"id{v}" for v in rng.integers(0, 10 ** 9, rows)],
+        "level": rng.choice(["info", "warn", "error", None], rows),
+    })
+    df.loc[df.sample(frac=0.05, random_state=seed).index, "x"] = np.nan
+    df.to_csv(path, mode=mode, header=mode == "w", index=False)
+
+
+def _fields(stats) -> tuple[dict, dict]:
+    arrays = {}
+    return incremental._stats_fields(stats, arrays), arrays
+
+
+def _state(path, stats) -> IncrementalState:
+    return IncrementalState(
+        version=incremental.STATE_VERSION, source=str(path), offset=0, rows=stats.num_rows,
+        signature="", ends_with_newline=True, stats=stats,
+    )
+
+
+# Sketches past their exact limits (compacted quantiles, HyperLogLog
+# distinct counts, pruned heavy hitters) come back from the stored state as
+# they were, and extending the restored statistics gives the same results.
+def test_state_round_trip(tmp_path):
+    path = tmp_path / "log.csv"
+    _write_log(path, 70_000, 0)
+    stats = stream_stats(str(path), 64)
+
+    save_state(_state(path, stats))
+    restored = load_state(str(path)).stats
+
+    fields, arrays = _fields(stats)
+    restored_fields, restored_arrays = _fields(restored)
+    assert restored_fields == fields
+    assert arrays.keys() == restored_arrays.keys()
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(restored_arrays[name], array)
+    pd.testing.assert_frame_equal(restored.head, stats.head)
+
+    size = path.stat().st_size
+    _write_log(path, 5_000, 1, mode="a")
+    for s in (stats, restored):
+        incremental.extend_stats(s, str(path), size, path.stat().st_size, 64)
+        s.finalize()
+    assert _fields(restored)[0] == _fields(stats)[0]
+
+
+# A state file is never unpickled: a pickle planted under the state's name,
+# or an archive holding object arrays, is ignored.
+def test_state_is_not_unpickled(tmp_path):
+    path = tmp_path / "log.csv"
+    _write_log(path, 100, 0)
+    state_path = incremental._state_path(str(path))
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+
+    state_path.write_bytes(pickle.dumps({"version": incremental.STATE_VERSION}))
+    assert load_state(str(path)) is None
+
+    with open(state_path, "wb") as f:
+        np.savez(f, state=np.array([{"version": incremental.STATE_VERSION}], dtype=object))
+    assert load_state(str(path)) is None
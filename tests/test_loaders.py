@@ -0,0 +1,67 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from src.agent.llm import DataContext
+from src.agent.tools import tools
+from src.agent.tools.loaders import _pandas_names
+
+
+HEADERS = [
+    ["x", "x", "y", "x"],
+    ["x", "x", "", "y", "x.1", "x"],
+    ["", "", "a", "Unnamed: 1"],
+    ["x.1", "y", "", "x.2", "Unnamed: 2", ""],
+]
+
+
+@pytest.mark.parametrize("header", HEADERS)
+def test_pandas_names_match_read_csv(header):
+    text = ",".join(header) + "\n" + ",".join("1" * len(header)) + "\n"
+    assert _pandas_names(header) == list(pd.read_csv(io.StringIO(text)).columns)
+
+
+# Duplicate and empty header names are renamed the way pandas.read_csv names
+# them, in every load mode, so tools can select the columns.
+@pytest.mark.parametrize("mode", [{}, {"streaming": True}, {"sample": 2}])
+def test_duplicate_and_empty_header_names(tmp_path, mode):
+    path = tmp_path / "dup.csv"
+    path.write_text("x,x,,y,x.1,x\n1,2,3,a,5,6\n4,5,6,b,8,9\n7,8,9,c,1,2\n")
+    expected = list(pd.read_csv(path).columns)
+
+    ctx = DataContext()
+    tools.load_data(ctx, str(path), progress=False, use_cache=False, **mode)
+
+    assert ctx.columns == expected
+    assert set(tools.dataset_info(ctx)["columns"]) == set(expected)
+    tools.basic_statistics(ctx)
+
+
+# Arrow types JSONL columns from the first block; a column that turns
+# fractional or stops being null further down is widened and the pass rerun,
+# while one that switches between numbers and strings fails with a message
+# naming it.
+@pytest.mark.parametrize("mode", [{"streaming": True}, {"sample": 50}, {"incremental": True, "use_cache": True}])
+def test_jsonl_column_widened_after_first_block(tmp_path, mode):
+    path = tmp_path / "late.jsonl"
+    rows = [{"a": i, "b": None, "c": "x"} for i in range(60000)]
+    rows += [{"a": 0.5, "b": 1, "c": "y"}, {"a": 2, "b": 2.5, "c": "z"}]
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+    ctx = DataContext()
+    tools.load_data(ctx, str(path), progress=False, **{"use_cache": False, "memory_limit_mb": 1, **mode})
+
+    assert ctx.columns == ["a", "b", "c"]
+    columns = tools.dataset_info(ctx)["columns"]
+    assert columns["a"]["dtype"] == columns["b"]["dtype"] == "float64"
+
+
+def test_jsonl_type_change_names_column(tmp_path):
+    path = tmp_path / "mixed.jsonl"
+    rows = [{"a": i, "b": i} for i in range(60000)] + [{"a": 1, "b": "text"}]
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+    with pytest.raises(ValueError, match="Column 'b'"):
+        tools.load_data(DataContext(), str(path), progress=False, use_cache=False, memory_limit_mb=1, streaming=True)
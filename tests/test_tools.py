@@ -0,0 +1,48 @@
+import pytest
+
+from src.agent.llm import DataContext
+from src.agent.tools import tools
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n" + "".join(f"{i},{i % 3}\n" for i in range(100)))
+    return str(path)
+
+
+# COMPACT_DTYPES applies to full loads; streaming and sample loads ignore it,
+# while an explicit compact=True there is an error.
+@pytest.mark.parametrize("mode", [{"streaming": True}, {"sample": 10}])
+def test_compact_default_only_applies_to_full_loads(monkeypatch, csv_path, mode):
+    monkeypatch.setattr(tools, "COMPACT_DTYPES", True)
+
+    result = tools.load_data(DataContext(), csv_path, progress=False, use_cache=False, **mode)
+    assert "compaction" not in result
+
+    with pytest.raises(ValueError):
+        tools.load_data(DataContext(), csv_path, progress=False, use_cache=False, compact=True, **mode)
+
+
+def test_compact_default_applies_to_full_loads(monkeypatch, csv_path):
+    monkeypatch.setattr(tools, "COMPACT_DTYPES", True)
+
+    result = tools.load_data(DataContext(), csv_path, progress=False, use_cache=False)
+    assert "compaction" in result
+
+
+# Registry hits need the same cache setting and, when streaming, the same
+# memory limit as the load that registered the dataset.
+def test_registry_key_includes_cache_and_memory_limit(csv_path):
+    tools.load_data(DataContext(), csv_path, progress=False, use_cache=True)
+    result = tools.load_data(DataContext(), csv_path, progress=False, use_cache=False)
+    assert result["load"]["registry"] == "miss"
+    assert result["load"]["cache"] == "disabled"
+
+    tools.load_data(DataContext(), csv_path, progress=False, streaming=True, memory_limit_mb=64)
+    result = tools.load_data(DataContext(), csv_path, progress=False, streaming=True, memory_limit_mb=32)
+    assert result["load"]["registry"] == "miss"
+    assert result["load"]["memory_limit_mb"] == 32
+
+    result = tools.load_data(DataContext(), csv_path, progress=False, streaming=True, memory_limit_mb=32)
+    assert result["load"]["registry"] == "hit"